@@ -0,0 +1,17 @@
+import shutil
+import tempfile
+
+import pytest
+
+
+@pytest.fixture(scope='session', autouse=True)
+def isolated_cache():
+    """Тесты пишут в свой файл кеша, а не в cache.sqlite3 разработчика."""
+    from core.testing import isolated_caches
+
+    directory = tempfile.mkdtemp()
+    caches = isolated_caches(directory)
+    caches.enable()
+    yield
+    caches.disable()
+    shutil.rmtree(directory, ignore_errors=True)
@@ -0,0 +1,80 @@
+from django.core.files.storage import default_storage
+from posts.models import Group, User
+
+# Поле в ответе -> колонка для values()
+POST_FIELDS = {
+    'id': 'id',
+    'text': 'text',
+    'pub_date': 'pub_date',
+    'image': 'image',
+    'author': 'author_id',
+    'group': 'group_id',
+}
+COMMENT_FIELDS = {
+    'id': 'id',
+    'post': 'post_id',
+    'author': 'author_id',
+    'text': 'text',
+    'created': 'created',
+}
+AUTHOR_FIELDS = ('id', 'username', 'first_name', 'last_name')
+GROUP_FIELDS = ('id', 'slug', 'title')
+
+
+class InvalidFields(ValueError):
+    pass
+
+
+def parse_fields(value, spec):
+    """Разбирает ``?fields=a,b``; пустое значение — все поля."""
+    if not value:
+        return list(spec)
+    names = list(dict.fromkeys(
+        name.strip() for name in value.split(',') if name.strip()))
+    unknown = set(names) - set(spec)
+    if unknown:
+        raise InvalidFields(', '.join(sorted(unknown)))
+    return names
+
+
+def columns(fields, spec, keys=()):
+    """Колонки для values(): только запрошенные поля плюс ключи курсора."""
+    return list(dict.fromkeys([*(spec[name] for name in fields), *keys]))
+
+
+def _embedded(model, ids, fields):
+    ids = set(ids) - {None}
+    if not ids:
+        return {}
+    return {
+        row['id']: row
+        for row in model.objects.filter(pk__in=ids).values(*fields)
+    }
+
+
+def serialize(rows, fields, spec):
+    """Словари из values() в объекты ответа.
+
+    Авторы и группы подставляются из двух запросов на всю страницу, а не
+    по запросу на строку; экземпляры моделей не создаются вовсе.
+    """
+    rows = list(rows)
+    related = {}
+    if 'author' in fields:
+        related['author'] = _embedded(
+            User, (row[spec['author']] for row in rows), AUTHOR_FIELDS)
+    if 'group' in fields:
+        related['group'] = _embedded(
+            Group, (row[spec['group']] for row in rows), GROUP_FIELDS)
+    result = []
+    for row in rows:
+        item = {}
+        for name in fields:
+            value = row[spec[name]]
+            if name in related:
+                value = related[name].get(value)
+            elif name == 'image':
+                value = default_storage.url(value) if value else None
+            item[name] = value
+        result.append(item)
+    return result
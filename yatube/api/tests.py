@@ -0,0 +1,127 @@
+from http import HTTPStatus
+
+from django.contrib.auth import get_user_model
+from django.db import connection
+from django.test import Client, TestCase
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from posts.models import Comment, Follow, Group, Post
+
+User = get_user_model()
+
+POSTS_NUMBER = 13
+
+
+class ApiTests(TestCase):
+    @classmethod
+    def setUpClass(cls) -> None:
+        super().setUpClass()
+        cls.user = User.objects.create_user(username='Reader')
+        cls.author = User.objects.create_user(
+            username='Writer', first_name='Лев', last_name='Толстой')
+        cls.group = Group.objects.create(
+            title='Тестовая группа',
+            slug='test-slug',
+            description='Тестовое описание',
+        )
+        cls.posts = [
+            Post.objects.create(
+                author=cls.author, group=cls.group, text=f'Пост {i}')
+            for i in range(POSTS_NUMBER)
+        ]
+        cls.post = cls.posts[0]
+        for i in range(3):
+            Comment.objects.create(
+                post=cls.post, author=cls.user, text=f'Комментарий {i}')
+
+    def setUp(self) -> None:
+        self.guest_client = Client()
+        self.authorized_client = Client()
+        self.authorized_client.force_login(self.user)
+
+    def get(self, name, client=None, **params):
+        kwargs = params.pop('kwargs', {})
+        return (client or self.guest_client).get(
+            reverse(name, kwargs=kwargs), params).json()
+
+    def test_feed_cursor_pagination(self):
+        """Курсоры обходят всю ленту от новых постов к старым и обратно."""
+        first = self.get('api:posts')
+        self.assertEqual(len(first['results']), 10)
+        self.assertIsNone(first['previous_cursor'])
+        second = self.get('api:posts', cursor=first['next_cursor'])
+        ids = [post['id'] for post in first['results'] + second['results']]
+        self.assertEqual(ids, [post.pk for post in reversed(self.posts)])
+        self.assertIsNone(second['next_cursor'])
+        back = self.get('api:posts', cursor=second['previous_cursor'])
+        self.assertEqual(back['results'], first['results'])
+
+    def test_embedded_author_and_group(self):
+        """Автор и группа встроены в пост и грузятся одним запросом на
+        страницу, а не на каждый пост."""
+        with CaptureQueriesContext(connection) as queries:
+            data = self.get('api:posts', limit=POSTS_NUMBER)
+        self.assertEqual(len(queries), 3)
+        post = data['results'][0]
+        self.assertEqual(post['author']['username'], 'Writer')
+        self.assertEqual(post['author']['last_name'], 'Толстой')
+        self.assertEqual(post['group']['slug'], self.group.slug)
+
+    def test_sparse_fields(self):
+        """?fields= ограничивает и ответ, и выбираемые колонки."""
+        with CaptureQueriesContext(connection) as queries:
+            data = self.get('api:posts', fields='id,text')
+        self.assertEqual(set(data['results'][0]), {'id', 'text'})
+        self.assertEqual(len(queries), 1)
+        self.assertNotIn('"image"', queries[0]['sql'])
+
+    def test_unknown_field(self):
+        """Неизвестное поле — ошибка 400 в JSON."""
+        response = self.guest_client.get(
+            reverse('api:posts'), {'fields': 'id,password'})
+        self.assertEqual(response.status_code, HTTPStatus.BAD_REQUEST)
+        self.assertIn('password', response.json()['error'])
+
+    def test_group_and_profile(self):
+        """Ленты группы и автора; несуществующие — 404 в JSON."""
+        data = self.get(
+            'api:group_posts', kwargs={'slug': self.group.slug}, limit=100)
+        self.assertEqual(len(data['results']), POSTS_NUMBER)
+        data = self.get(
+            'api:profile_posts', kwargs={'username': self.user.username})
+        self.assertEqual(data['results'], [])
+        response = self.guest_client.get(
+            reverse('api:profile_posts', kwargs={'username': 'nobody'}))
+        self.assertEqual(response.status_code, HTTPStatus.NOT_FOUND)
+        self.assertIn('error', response.json())
+
+    def test_post_and_comments(self):
+        """Пост по id и его комментарии в порядке написания."""
+        data = self.get('api:post', kwargs={'post_id': self.post.pk})
+        self.assertEqual(data['text'], self.post.text)
+        comments = self.get(
+            'api:comments', kwargs={'post_id': self.post.pk}, limit=2)
+        self.assertEqual(
+            [comment['text'] for comment in comments['results']],
+            ['Комментарий 0', 'Комментарий 1'],
+        )
+        rest = self.get(
+            'api:comments', kwargs={'post_id': self.post.pk},
+            cursor=comments['next_cursor'],
+        )
+        self.assertEqual(rest['results'][0]['text'], 'Комментарий 2')
+        self.assertEqual(rest['results'][0]['author']['username'], 'Reader')
+
+    def test_follow_feed(self):
+        """Лента подписок только для авторизованных."""
+        response = self.guest_client.get(reverse('api:follow'))
+        self.assertEqual(response.status_code, HTTPStatus.UNAUTHORIZED)
+        Follow.objects.create(user=self.user, author=self.author)
+        data = self.get('api:follow', self.authorized_client, fields='id')
+        self.assertEqual(data['results'][0]['id'], self.posts[-1].pk)
+
+    def test_read_only(self):
+        """API только читает данные."""
+        response = self.authorized_client.post(reverse('api:posts'))
+        self.assertEqual(
+            response.status_code, HTTPStatus.METHOD_NOT_ALLOWED)
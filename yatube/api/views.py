@@ -0,0 +1,149 @@
+from functools import wraps
+from http import HTTPStatus
+
+from django.conf import settings
+from django.db.models import F
+from django.http import Http404, JsonResponse
+from django.views.decorators.http import require_GET
+from posts.conditional import feed_reads
+from posts.models import Comment, Group, Post, User
+from posts.paginator import KeysetPaginator
+
+from .serializers import (COMMENT_FIELDS, POST_FIELDS, InvalidFields,
+                          columns, parse_fields, serialize)
+
+MAX_LIMIT = 100
+
+
+class BadRequest(ValueError):
+    pass
+
+
+def error(message, status):
+    return JsonResponse(
+        {'error': message}, status=status,
+        json_dumps_params={'ensure_ascii': False},
+    )
+
+
+def endpoint(kind=None):
+    """Только GET; ошибки отдаются JSON, а не HTML-страницами.
+
+    Ленты читаются с реплик через ``feed_reads`` по тем же правилам, что и
+    HTML-страницы; без ``kind`` представление читает основную базу.
+    """
+    def decorator(view):
+        reads = feed_reads(kind)(view) if kind else view
+
+        @require_GET
+        @wraps(view)
+        def wrapper(request, *args, **kwargs):
+            try:
+                return reads(request, *args, **kwargs)
+            except InvalidFields as exc:
+                return error(
+                    f'Неизвестные поля: {exc}', HTTPStatus.BAD_REQUEST)
+            except BadRequest as exc:
+                return error(str(exc), HTTPStatus.BAD_REQUEST)
+            except Http404:
+                return error('Не найдено', HTTPStatus.NOT_FOUND)
+        return wrapper
+    return decorator
+
+
+def respond(data):
+    return JsonResponse(data, json_dumps_params={'ensure_ascii': False})
+
+
+def limit_for(request):
+    value = request.GET.get('limit')
+    if not value:
+        return settings.POSTS_NUM1
+    try:
+        limit = int(value)
+    except ValueError:
+        raise BadRequest('limit должен быть числом')
+    if not 1 <= limit <= MAX_LIMIT:
+        raise BadRequest(f'limit должен быть от 1 до {MAX_LIMIT}')
+    return limit
+
+
+def pk_or_404(queryset, **lookup):
+    pk = queryset.filter(**lookup).values_list('pk', flat=True).first()
+    if pk is None:
+        raise Http404
+    return pk
+
+
+def page(request, queryset, spec, keys=('pub_date', 'id'),
+         descending=True):
+    """Страница ленты по курсору: values() -> список словарей -> JSON."""
+    fields = parse_fields(request.GET.get('fields'), spec)
+    paginator = KeysetPaginator(
+        queryset.values(*columns(fields, spec, keys)),
+        limit_for(request),
+        query_params=request.GET.dict(),
+        keys=keys,
+        descending=descending,
+    )
+    current = paginator.get_page(request.GET.get('cursor'))
+    return respond({
+        'results': serialize(current, fields, spec),
+        'next_cursor': current.next_cursor,
+        'previous_cursor': current.previous_cursor,
+    })
+
+
+@endpoint('index')
+def posts(request):
+    return page(request, Post.objects.all(), POST_FIELDS)
+
+
+@endpoint('group')
+def group_posts(request, slug):
+    group_id = pk_or_404(Group.objects, slug=slug)
+    return page(request, Post.objects.filter(group_id=group_id), POST_FIELDS)
+
+
+@endpoint('author')
+def profile_posts(request, username):
+    author_id = pk_or_404(User.objects, username=username)
+    return page(
+        request, Post.objects.filter(author_id=author_id), POST_FIELDS)
+
+
+@endpoint('post')
+def post(request, post_id):
+    fields = parse_fields(request.GET.get('fields'), POST_FIELDS)
+    rows = Post.objects.filter(pk=post_id).values(
+        *columns(fields, POST_FIELDS))
+    result = serialize(rows, fields, POST_FIELDS)
+    if not result:
+        raise Http404
+    return respond(result[0])
+
+
+@endpoint('post')
+def comments(request, post_id):
+    pk_or_404(Post.objects, pk=post_id)
+    return page(
+        request,
+        Comment.objects.filter(post_id=post_id),
+        COMMENT_FIELDS,
+        keys=('created', 'id'),
+        descending=False,
+    )
+
+
+@endpoint()
+def follow(request):
+    if not request.user.is_authenticated:
+        return error('Нужна авторизация', HTTPStatus.UNAUTHORIZED)
+    post_list = Post.objects.filter(
+        timeline_entries__user=request.user,
+    ).annotate(
+        feed_date=F('timeline_entries__pub_date'),
+        feed_post=F('timeline_entries__post_id'),
+    )
+    return page(
+        request, post_list, POST_FIELDS, keys=('feed_date', 'feed_post'))
@@ -0,0 +1,182 @@
+import asyncio
+import sys
+from concurrent.futures import ThreadPoolExecutor
+from io import BytesIO
+
+from django.conf import settings
+from django.core.wsgi import get_wsgi_application
+
+
+class RequestAborted(Exception):
+    """Клиент отключился, не дослав тело запроса."""
+
+
+def build_environ(scope, body):
+    """WSGI-окружение для HTTP-запроса ASGI."""
+    server = scope.get('server') or ('localhost', 80)
+    client = scope.get('client') or ('127.0.0.1', 0)
+    environ = {
+        'REQUEST_METHOD': scope['method'],
+        'SCRIPT_NAME': scope.get('root_path', ''),
+        # WSGI передаёт путь байтами, раскодированными как latin-1.
+        'PATH_INFO': scope['path'].encode().decode('latin-1'),
+        'QUERY_STRING': scope.get('query_string', b'').decode('latin-1'),
+        'SERVER_NAME': server[0],
+        'SERVER_PORT': str(server[1]),
+        'REMOTE_ADDR': client[0],
+        'SERVER_PROTOCOL': f'HTTP/{scope.get("http_version", "1.1")}',
+        'CONTENT_LENGTH': str(len(body)),
+        'wsgi.version': (1, 0),
+        'wsgi.url_scheme': scope.get('scheme', 'http'),
+        'wsgi.input': BytesIO(body),
+        'wsgi.errors': sys.stderr,
+        'wsgi.multithread': True,
+        'wsgi.multiprocess': False,
+        'wsgi.run_once': False,
+    }
+    for name, value in scope.get('headers', []):
+        name = name.decode('latin-1').upper().replace('-', '_')
+        value = value.decode('latin-1')
+        if name == 'CONTENT_LENGTH':
+            continue
+        key = name if name == 'CONTENT_TYPE' else f'HTTP_{name}'
+        if key in environ:
+            separator = '; ' if key == 'HTTP_COOKIE' else ','
+            value = f'{environ[key]}{separator}{value}'
+        environ[key] = value
+    return environ
+
+
+async def read_body(receive):
+    chunks = []
+    while True:
+        message = await receive()
+        if message['type'] == 'http.disconnect':
+            raise RequestAborted
+        chunks.append(message.get('body', b''))
+        if not message.get('more_body'):
+            return b''.join(chunks)
+
+
+class ASGIHandler:
+    """ASGI-приложение поверх обычного WSGI-обработчика Django.
+
+    В Django 2.2 нет асинхронных представлений, поэтому сам запрос
+    обрабатывается синхронно, но в ограниченном пуле из ``ASGI_THREADS``
+    потоков. Поток пула занят только пока Django строит ответ; чтение
+    тела запроса и отправка обычного ответа идут в цикле событий и
+    потоков не держат.
+
+    Тело потокового ответа целиком читается и закрывается в одном потоке
+    второго пула из ``ASGI_STREAM_THREADS``: курсор ``iterator()`` открыт
+    на соединении того потока, где начался, и читать его из других
+    потоков, пока те выполняют чужие транзакции или закрывают
+    соединения, нельзя. Поток ждёт отправки каждого куска, поэтому
+    медленные клиенты занимают потоки этого пула, а лишние потоковые
+    ответы ждут очереди.
+    """
+
+    def __init__(self, wsgi_application=None, max_workers=None,
+                 stream_workers=None):
+        self.wsgi_application = wsgi_application or get_wsgi_application()
+        self.executor = ThreadPoolExecutor(
+            max_workers=max_workers or settings.ASGI_THREADS,
+            thread_name_prefix='asgi',
+        )
+        self.stream_executor = ThreadPoolExecutor(
+            max_workers=stream_workers or settings.ASGI_STREAM_THREADS,
+            thread_name_prefix='asgi-stream',
+        )
+
+    async def __call__(self, scope, receive, send):
+        if scope['type'] == 'lifespan':
+            await self.lifespan(receive, send)
+        elif scope['type'] == 'http':
+            try:
+                body = await read_body(receive)
+            except RequestAborted:
+                return
+            await self.respond(build_environ(scope, body), send)
+        else:
+            raise ValueError(f'Неподдерживаемый тип ASGI: {scope["type"]}')
+
+    async def lifespan(self, receive, send):
+        while True:
+            message = await receive()
+            if message['type'] == 'lifespan.startup':
+                await send({'type': 'lifespan.startup.complete'})
+            elif message['type'] == 'lifespan.shutdown':
+                # shutdown ждёт потоки и не должен блокировать цикл.
+                await asyncio.get_running_loop().run_in_executor(
+                    None, self.shutdown)
+                await send({'type': 'lifespan.shutdown.complete'})
+                return
+
+    def shutdown(self):
+        self.executor.shutdown(wait=True)
+        self.stream_executor.shutdown(wait=True)
+
+    def run(self, environ):
+        """Вызов WSGI-приложения в потоке пула.
+
+        Обычный ответ собирается и закрывается здесь же: close() шлёт
+        request_finished, а его обработчик закрывает соединения с базой
+        своего потока. Потоковый ответ
+        отдаётся итератором и закрывается после отправки в потоке, который
+        его читал.
+        """
+        started = {}
+
+        def start_response(status, headers, exc_info=None):
+            started['status'] = int(status.split(' ', 1)[0])
+            started['headers'] = [
+                (name.lower().encode('latin-1'), value.encode('latin-1'))
+                for name, value in headers
+            ]
+
+        result = self.wsgi_application(environ, start_response)
+        if getattr(result, 'streaming', False):
+            return started, result
+        try:
+            return started, [b''.join(result)]
+        finally:
+            result.close()
+
+    async def respond(self, environ, send):
+        loop = asyncio.get_running_loop()
+        started, result = await loop.run_in_executor(
+            self.executor, self.run, environ)
+        await send({
+            'type': 'http.response.start',
+            'status': started['status'],
+            'headers': started['headers'],
+        })
+        if isinstance(result, list):
+            await send({'type': 'http.response.body', 'body': result[0]})
+            return
+        await loop.run_in_executor(
+            self.stream_executor, stream, result, send, loop)
+
+
+def stream(result, send, loop):
+    """Отправляет тело потокового ответа из потока пула: куски читаются и
+    ответ закрывается в этом же потоке, отправку выполняет цикл событий."""
+    def deliver(message):
+        asyncio.run_coroutine_threadsafe(send(message), loop).result()
+
+    try:
+        # Потоковые ответы могут ходить в базу при каждом next().
+        for chunk in result:
+            if chunk:
+                deliver({
+                    'type': 'http.response.body',
+                    'body': chunk,
+                    'more_body': True,
+                })
+        deliver({'type': 'http.response.body', 'body': b''})
+    finally:
+        result.close()
+
+
+def get_asgi_application():
+    return ASGIHandler()
@@ -0,0 +1,85 @@
+import json
+import resource
+import statistics
+import subprocess
+import time
+
+
+def percentile(samples, share):
+    """Перцентиль по ближайшему рангу; samples должны быть отсортированы."""
+    if not samples:
+        return 0.0
+    index = min(len(samples) - 1, max(0, round(share * len(samples)) - 1))
+    return samples[index]
+
+
+def summarize(durations, elapsed=None):
+    """Сводка по длительностям операций в секундах."""
+    samples = sorted(durations)
+    elapsed = elapsed if elapsed is not None else sum(samples)
+    return {
+        'count': len(samples),
+        'mean_ms': statistics.mean(samples) * 1000 if samples else 0.0,
+        'p50_ms': percentile(samples, 0.50) * 1000,
+        'p95_ms': percentile(samples, 0.95) * 1000,
+        'p99_ms': percentile(samples, 0.99) * 1000,
+        'per_second': len(samples) / elapsed if elapsed else 0.0,
+    }
+
+
+def timed(func, *args, **kwargs):
+    """Возвращает (результат, длительность в секундах)."""
+    started = time.perf_counter()
+    result = func(*args, **kwargs)
+    return result, time.perf_counter() - started
+
+
+def peak_memory_mb():
+    """Пиковый RSS процесса в мегабайтах (ru_maxrss в Linux — в КиБ)."""
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+
+def format_row(name, summary):
+    return (
+        f'{name:<40} {summary["per_second"]:>10.0f}/s '
+        f'p50 {summary["p50_ms"]:>8.3f} ms  '
+        f'p95 {summary["p95_ms"]:>8.3f} ms  '
+        f'p99 {summary["p99_ms"]:>8.3f} ms'
+    )
+
+
+def git_revision():
+    try:
+        return subprocess.run(
+            ['git', 'rev-parse', '--short', 'HEAD'],
+            capture_output=True, text=True, check=True,
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def write_results(path, results, **meta):
+    """Сохраняет результаты в JSON, пригодный для сравнения коммитов."""
+    payload = {
+        'revision': git_revision(),
+        'timestamp': time.time(),
+        **meta,
+        'results': results,
+    }
+    with open(path, 'w', encoding='utf-8') as output:
+        json.dump(payload, output, ensure_ascii=False, indent=2)
+
+
+def compare(baseline, results, metric='p95_ms'):
+    """Строки «имя: было -> стало (изменение)» для общих ключей."""
+    lines = []
+    for name, summary in results.items():
+        before = baseline.get(name, {}).get(metric)
+        if not before:
+            continue
+        after = summary[metric]
+        change = (after - before) / before * 100
+        lines.append(
+            f'{name:<40} {metric} {before:>8.3f} -> {after:>8.3f} '
+            f'({change:+.1f}%)')
+    return lines
@@ -0,0 +1,324 @@
+import os
+import pickle
+import sqlite3
+import threading
+import time
+
+from django.core.cache.backends.base import DEFAULT_TIMEOUT, BaseCache
+
+SCHEMA = (
+    'CREATE TABLE IF NOT EXISTS cache ('
+    ' key TEXT PRIMARY KEY,'
+    ' value BLOB NOT NULL,'
+    ' expires REAL,'
+    ' accessed REAL NOT NULL,'
+    ' size INTEGER NOT NULL'
+    ') WITHOUT ROWID',
+    'CREATE INDEX IF NOT EXISTS cache_accessed ON cache (accessed)',
+    'CREATE TABLE IF NOT EXISTS cache_stats ('
+    ' id INTEGER PRIMARY KEY CHECK (id = 1),'
+    ' entries INTEGER NOT NULL,'
+    ' size INTEGER NOT NULL'
+    ')',
+    'INSERT OR IGNORE INTO cache_stats (id, entries, size) VALUES (1, 0, 0)',
+)
+
+
+class SQLiteCache(BaseCache):
+    """Кеш в файле SQLite, общий для всех процессов на машине.
+
+    В отличие от ``LocMemCache`` каждый воркер видит одни и те же записи,
+    поэтому фрагменты шаблонов и метаданные миниатюр хранятся один раз и
+    сбрасываются сразу для всех. Файл работает в режиме WAL: читатели не
+    блокируют писателя. Вытеснение — приблизительный LRU: время доступа
+    обновляется не чаще раза в ``LRU_RESOLUTION`` секунд, чтобы чтение не
+    превращалось в запись.
+
+    OPTIONS: ``MAX_ENTRIES`` и ``CULL_FREQUENCY`` как у встроенных
+    бэкендов, ``MAX_SIZE`` — предел суммарного размера значений в байтах.
+    """
+
+    LRU_RESOLUTION = 1.0
+    pickle_protocol = pickle.HIGHEST_PROTOCOL
+
+    def __init__(self, location, params):
+        super().__init__(params)
+        options = params.get('OPTIONS', {})
+        self._path = location
+        self._max_size = int(options.get('MAX_SIZE', 64 * 1024 * 1024))
+        self._busy_timeout = float(options.get('BUSY_TIMEOUT', 5.0))
+        self._local = threading.local()
+
+    # Соединения
+
+    def _connection(self):
+        """Своё соединение на поток; после fork открывается заново."""
+        local = self._local
+        if getattr(local, 'pid', None) != os.getpid():
+            connection = sqlite3.connect(
+                self._path,
+                timeout=self._busy_timeout,
+                isolation_level=None,
+                check_same_thread=False,
+            )
+            connection.execute('PRAGMA journal_mode=WAL')
+            connection.execute('PRAGMA synchronous=NORMAL')
+            for statement in SCHEMA:
+                connection.execute(statement)
+            local.connection = connection
+            local.pid = os.getpid()
+        return local.connection
+
+    def _write(self, callback):
+        """Выполняет изменение в отдельной IMMEDIATE-транзакции."""
+        connection = self._connection()
+        connection.execute('BEGIN IMMEDIATE')
+        try:
+            result = callback(connection)
+        except BaseException:
+            connection.execute('ROLLBACK')
+            raise
+        connection.execute('COMMIT')
+        return result
+
+    # Внутренние операции, вызываются внутри транзакции
+
+    def _expiry(self, timeout):
+        """Абсолютное время истечения (None — бессрочно)."""
+        return self.get_backend_timeout(timeout)
+
+    def _delete_row(self, connection, key):
+        row = connection.execute(
+            'SELECT size FROM cache WHERE key = ?', (key,)).fetchone()
+        if row is None:
+            return False
+        connection.execute('DELETE FROM cache WHERE key = ?', (key,))
+        connection.execute(
+            'UPDATE cache_stats SET entries = entries - 1, size = size - ?',
+            (row[0],),
+        )
+        return True
+
+    def _store(self, connection, key, value, timeout):
+        blob = pickle.dumps(value, self.pickle_protocol)
+        self._delete_row(connection, key)
+        connection.execute(
+            'INSERT INTO cache (key, value, expires, accessed, size) '
+            'VALUES (?, ?, ?, ?, ?)',
+            (key, blob, self._expiry(timeout), time.time(), len(blob)),
+        )
+        connection.execute(
+            'UPDATE cache_stats SET entries = entries + 1, size = size + ?',
+            (len(blob),),
+        )
+        self._cull(connection)
+
+    def _cull(self, connection):
+        entries, size = connection.execute(
+            'SELECT entries, size FROM cache_stats').fetchone()
+        if entries <= self._max_entries and size <= self._max_size:
+            return
+        self._purge_expired(connection)
+        entries, size = connection.execute(
+            'SELECT entries, size FROM cache_stats').fetchone()
+        if entries > self._max_entries:
+            # Как встроенные бэкенды: выкидываем долю записей разом.
+            victims = max(1, entries // self._cull_frequency)
+            self._evict(connection, victims)
+        while size > self._max_size:
+            self._evict(connection, max(1, entries // self._cull_frequency))
+            entries, size = connection.execute(
+                'SELECT entries, size FROM cache_stats').fetchone()
+
+    def _evict(self, connection, count):
+        connection.execute(
+            'DELETE FROM cache WHERE key IN ('
+            ' SELECT key FROM cache ORDER BY accessed LIMIT ?)',
+            (count,),
+        )
+        self._recount(connection)
+
+    def _purge_expired(self, connection):
+        connection.execute(
+            'DELETE FROM cache WHERE expires IS NOT NULL AND expires <= ?',
+            (time.time(),),
+        )
+        self._recount(connection)
+
+    def _recount(self, connection):
+        connection.execute(
+            'UPDATE cache_stats SET'
+            ' entries = (SELECT COUNT(*) FROM cache),'
+            ' size = (SELECT COALESCE(SUM(size), 0) FROM cache)'
+        )
+
+    def _fetch(self, connection, key):
+        """Живое значение записи или None. Просроченные записи не удаляются
+        здесь, их вычищает ``_cull`` или перезапись ключа."""
+        row = connection.execute(
+            'SELECT value, expires, accessed FROM cache WHERE key = ?',
+            (key,),
+        ).fetchone()
+        if row is None:
+            return None
+        value, expires, accessed = row
+        now = time.time()
+        if expires is not None and expires <= now:
+            return None
+        if now - accessed > self.LRU_RESOLUTION:
+            self._touch(
+                connection,
+                'UPDATE cache SET accessed = ? WHERE key = ?', (now, key))
+        return value
+
+    def _touch(self, connection, sql, params):
+        """Обновляет время доступа. Это только подсказка для вытеснения:
+        если другой процесс держит запись дольше BUSY_TIMEOUT, чтение всё
+        равно возвращает значение, а не падает с OperationalError."""
+        try:
+            connection.execute(sql, params)
+        except sqlite3.OperationalError:
+            pass
+
+    # Публичный интерфейс BaseCache
+
+    def add(self, key, value, timeout=DEFAULT_TIMEOUT, version=None):
+        key = self.make_key(key, version=version)
+        self.validate_key(key)
+
+        def add(connection):
+            if self._fetch(connection, key) is not None:
+                return False
+            self._store(connection, key, value, timeout)
+            return True
+        return self._write(add)
+
+    def get(self, key, default=None, version=None):
+        key = self.make_key(key, version=version)
+        self.validate_key(key)
+        blob = self._fetch(self._connection(), key)
+        if blob is None:
+            return default
+        return pickle.loads(blob)
+
+    def get_many(self, keys, version=None):
+        keys = {self.make_key(key, version=version): key for key in keys}
+        for key in keys:
+            self.validate_key(key)
+        if not keys:
+            return {}
+        connection = self._connection()
+        now = time.time()
+        rows = connection.execute(
+            'SELECT key, value, expires FROM cache WHERE key IN (%s)'
+            % ', '.join('?' * len(keys)),
+            list(keys),
+        ).fetchall()
+        found = {
+            keys[key]: pickle.loads(value)
+            for key, value, expires in rows
+            if expires is None or expires > now
+        }
+        if found:
+            self._touch(
+                connection,
+                'UPDATE cache SET accessed = ? WHERE accessed < ? AND key IN '
+                '(%s)' % ', '.join('?' * len(found)),
+                [
+                    now,
+                    now - self.LRU_RESOLUTION,
+                    *(key for key in keys if keys[key] in found),
+                ],
+            )
+        return found
+
+    def set(self, key, value, timeout=DEFAULT_TIMEOUT, version=None):
+        key = self.make_key(key, version=version)
+        self.validate_key(key)
+        self._write(
+            lambda connection: self._store(connection, key, value, timeout))
+
+    def set_many(self, data, timeout=DEFAULT_TIMEOUT, version=None):
+        items = [
+            (self.make_key(key, version=version), value)
+            for key, value in data.items()
+        ]
+        for key, _ in items:
+            self.validate_key(key)
+
+        def store_all(connection):
+            for key, value in items:
+                self._store(connection, key, value, timeout)
+        self._write(store_all)
+        return []
+
+    def touch(self, key, timeout=DEFAULT_TIMEOUT, version=None):
+        key = self.make_key(key, version=version)
+        self.validate_key(key)
+
+        def touch(connection):
+            if self._fetch(connection, key) is None:
+                return False
+            connection.execute(
+                'UPDATE cache SET expires = ? WHERE key = ?',
+                (self._expiry(timeout), key),
+            )
+            return True
+        return self._write(touch)
+
+    def delete(self, key, version=None):
+        key = self.make_key(key, version=version)
+        self.validate_key(key)
+        self._write(lambda connection: self._delete_row(connection, key))
+
+    def delete_many(self, keys, version=None):
+        keys = [self.make_key(key, version=version) for key in keys]
+        for key in keys:
+            self.validate_key(key)
+
+        def delete_all(connection):
+            for key in keys:
+                self._delete_row(connection, key)
+        self._write(delete_all)
+
+    def has_key(self, key, version=None):
+        key = self.make_key(key, version=version)
+        self.validate_key(key)
+        row = self._connection().execute(
+            'SELECT expires FROM cache WHERE key = ?', (key,)).fetchone()
+        return row is not None and (row[0] is None or row[0] > time.time())
+
+    def incr(self, key, delta=1, version=None):
+        """Атомарно для всех процессов: чтение и запись идут в одной
+        IMMEDIATE-транзакции, которая берёт блокировку записи сразу."""
+        key = self.make_key(key, version=version)
+        self.validate_key(key)
+
+        def incr(connection):
+            blob = self._fetch(connection, key)
+            if blob is None:
+                raise ValueError("Key '%s' not found" % key)
+            value = pickle.loads(blob) + delta
+            new_blob = pickle.dumps(value, self.pickle_protocol)
+            connection.execute(
+                'UPDATE cache SET value = ?, size = ? WHERE key = ?',
+                (new_blob, len(new_blob), key),
+            )
+            connection.execute(
+                'UPDATE cache_stats SET size = size + ?',
+                (len(new_blob) - len(blob),),
+            )
+            return value
+        return self._write(incr)
+
+    def clear(self):
+        def clear(connection):
+            connection.execute('DELETE FROM cache')
+            connection.execute(
+                'UPDATE cache_stats SET entries = 0, size = 0')
+        self._write(clear)
+
+    def close(self, **kwargs):
+        # Соединения живут всё время работы потока: открывать файл на
+        # каждый запрос дороже, чем держать его открытым.
+        pass
@@ -0,0 +1,56 @@
+import contextvars
+from concurrent.futures import ThreadPoolExecutor
+
+from django.conf import settings
+from django.db import close_old_connections, connections
+
+from . import timing
+
+_executor = None
+
+
+def executor():
+    """Общий пул для независимых запросов к базе внутри одного запроса.
+
+    Отдельный от пула ASGI: запрос, ждущий свои подзапросы, не должен
+    занимать потоки, которые им же и нужны.
+    """
+    global _executor
+    if _executor is None:
+        _executor = ThreadPoolExecutor(
+            max_workers=settings.DB_QUERY_THREADS,
+            thread_name_prefix='db-query',
+        )
+    return _executor
+
+
+def _call(func):
+    # Потоки пула живут долго: закрываем соединения старше CONN_MAX_AGE
+    # и сломанные, как это делает обработчик запроса.
+    close_old_connections()
+    # Соединения потока не обёрнуты ServerTimingMiddleware.
+    with timing.watch_connections():
+        return func()
+
+
+def in_transaction():
+    return any(connection.in_atomic_block for connection in connections.all())
+
+
+def gather(*funcs):
+    """Выполняет независимые функции одновременно и возвращает их
+    результаты по порядку.
+
+    Первая функция выполняется в текущем потоке, остальные — в пуле, со
+    своими соединениями и копией контекста (``replica_reads`` и прочие
+    ContextVar). Внутри транзакции всё выполняется по очереди здесь же:
+    другое соединение не увидит её незакоммиченных изменений.
+    """
+    if len(funcs) < 2 or settings.DB_QUERY_THREADS < 1 or in_transaction():
+        return [func() for func in funcs]
+    futures = [
+        executor().submit(contextvars.copy_context().run, _call, func)
+        for func in funcs[1:]
+    ]
+    first = funcs[0]()
+    return [first, *(future.result() for future in futures)]
@@ -0,0 +1,92 @@
+import random
+from contextvars import ContextVar
+from functools import wraps
+
+from django.conf import settings
+
+# Читать с реплики можно только внутри представлений, помеченных
+# replica_reads, и только если запрос не «прилип» к основной базе.
+_replica_allowed = ContextVar('replica_allowed', default=False)
+# Состояние запроса, которым владеет ReplicaStickinessMiddleware. Вне
+# запроса (команды, фоновые потоки) его нет, и запись ничего не помечает.
+_request = ContextVar('replica_request', default=None)
+
+
+# Сессии и пользователи читаются только из основной базы: реплика может
+# ещё не знать о сессии, созданной при входе, и разлогинить пользователя.
+PRIMARY_APPS = {'auth', 'sessions'}
+
+
+class RequestState:
+    __slots__ = ('pinned', 'wrote')
+
+    def __init__(self, pinned):
+        self.pinned = pinned
+        self.wrote = False
+
+
+def replica_reads(view):
+    """Разрешает представлению читать с реплик из DATABASE_REPLICAS."""
+    @wraps(view)
+    def wrapper(request, *args, **kwargs):
+        token = _replica_allowed.set(True)
+        try:
+            return view(request, *args, **kwargs)
+        finally:
+            _replica_allowed.reset(token)
+    return wrapper
+
+
+def pin_to_primary(pinned=True):
+    """Начинает состояние запроса; ``pinned`` — все чтения идут в
+    основную базу. Возвращает токен для ``release``.
+
+    Потоки ``gather`` получают копию контекста с тем же состоянием, и их
+    запись тоже прикрепляет запрос к основной базе.
+    """
+    return _request.set(RequestState(pinned))
+
+
+def release(token):
+    _request.reset(token)
+
+
+def wrote():
+    """Была ли в текущем запросе запись в основную базу."""
+    state = _request.get()
+    return state is not None and state.wrote
+
+
+class ReplicaRouter:
+    """Записи — в default, чтения — на случайную реплику, если можно.
+
+    Реплика может отставать, поэтому читать с неё можно лишь в явно
+    помеченных представлениях. После записи ``ReplicaStickinessMiddleware``
+    на ``REPLICA_STICKY_SECONDS`` отправляет все чтения пользователя в
+    default, чтобы он сразу видел свой пост или комментарий.
+    """
+
+    def db_for_read(self, model, **hints):
+        replicas = settings.DATABASE_REPLICAS
+        state = _request.get()
+        if (replicas and _replica_allowed.get()
+                and not (state is not None and state.pinned)
+                and model._meta.app_label not in PRIMARY_APPS):
+            return random.choice(replicas)
+        return 'default'
+
+    def db_for_write(self, model, **hints):
+        state = _request.get()
+        if state is not None:
+            state.wrote = True
+            # После записи чтения этого же запроса тоже идут в default.
+            state.pinned = True
+        return 'default'
+
+    def allow_relation(self, obj1, obj2, **hints):
+        # На репликах те же данные, что и в default.
+        return True
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        # Схема попадает на реплики вместе с копией базы.
+        return db == 'default'
@@ -0,0 +1,176 @@
+import asyncio
+import threading
+import time
+
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand
+from django.core.wsgi import get_wsgi_application
+from django.db import connections
+from django.test import Client
+
+from core.asgi import ASGIHandler, build_environ
+from core.benchmark import format_row, summarize, write_results
+from core.management.commands.benchmark_views import (
+    build_url, named_patterns, sample_values,
+)
+
+User = get_user_model()
+
+# Ленты и страницы, которые читают из базы и не меняют данных.
+READ_PATHS = (
+    'posts:index',
+    'posts:group_list',
+    'posts:profile',
+    'posts:post_detail',
+    'posts:follow_index',
+)
+
+
+def make_scope(url, cookie):
+    path, _, query = url.partition('?')
+    headers = [(b'host', b'localhost')]
+    if cookie:
+        headers.append((b'cookie', cookie.encode('latin-1')))
+    return {
+        'type': 'http',
+        'http_version': '1.1',
+        'method': 'GET',
+        'scheme': 'http',
+        'path': path,
+        'query_string': query.encode(),
+        'root_path': '',
+        'headers': headers,
+        'client': ('127.0.0.1', 50000),
+        'server': ('localhost', 80),
+    }
+
+
+def run_wsgi(application, scope, requests, clients, threads, delay):
+    """Многопоточный WSGI-сервер: воркер занят запросом целиком, вместе с
+    чтением запроса и отправкой ответа медленному клиенту."""
+    workers = threading.BoundedSemaphore(threads)
+    durations = []
+    errors = []
+    per_client = max(1, requests // clients)
+
+    def start_response(status, headers, exc_info=None):
+        if int(status.split(' ', 1)[0]) >= 400:
+            errors.append(status)
+
+    def client():
+        try:
+            for _ in range(per_client):
+                started = time.perf_counter()
+                with workers:
+                    time.sleep(delay / 2)
+                    result = application(
+                        build_environ(scope, b''), start_response)
+                    try:
+                        b''.join(result)
+                    finally:
+                        result.close()
+                    time.sleep(delay / 2)
+                durations.append(time.perf_counter() - started)
+        finally:
+            connections.close_all()
+
+    started = time.perf_counter()
+    pool = [threading.Thread(target=client) for _ in range(clients)]
+    for thread in pool:
+        thread.start()
+    for thread in pool:
+        thread.join()
+    return durations, len(errors), time.perf_counter() - started
+
+
+async def run_asgi(application, scope, requests, clients, delay):
+    """ASGI-сервер: ожидание медленного клиента не занимает потоков."""
+    durations = []
+    errors = 0
+    per_client = max(1, requests // clients)
+
+    async def receive():
+        await asyncio.sleep(delay / 2)
+        return {'type': 'http.request', 'body': b'', 'more_body': False}
+
+    async def send(message):
+        nonlocal errors
+        if message['type'] == 'http.response.start':
+            errors += message['status'] >= 400
+        elif not message.get('more_body'):
+            await asyncio.sleep(delay / 2)
+
+    async def client():
+        for _ in range(per_client):
+            started = time.perf_counter()
+            await application(scope, receive, send)
+            durations.append(time.perf_counter() - started)
+
+    started = time.perf_counter()
+    await asyncio.gather(*(client() for _ in range(clients)))
+    return durations, errors, time.perf_counter() - started
+
+
+class Command(BaseCommand):
+    help = (
+        'Сравнивает WSGI и yatube/asgi.py на лентах и странице поста: '
+        'одинаковое число потоков, медленные клиенты.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--requests', type=int, default=400,
+                            help='Запросов на каждый URL и сервер.')
+        parser.add_argument('--clients', type=int, default=32,
+                            help='Одновременных клиентов.')
+        parser.add_argument('--threads', type=int, default=8,
+                            help='Потоков WSGI-сервера и пула ASGI.')
+        parser.add_argument(
+            '--client-delay', type=float, default=20,
+            help='Сколько мс клиент шлёт запрос и получает ответ.')
+        parser.add_argument('--warmup', type=int, default=5,
+                            help='Запросов на прогрев кешей перед замером.')
+        parser.add_argument('--user',
+                            help='Пользователь для follow_index; по '
+                                 'умолчанию — автор свежего поста.')
+        parser.add_argument('--output', help='Файл для JSON-результатов.')
+
+    def handle(self, *args, **options):
+        values = sample_values()
+        client = Client()
+        client.force_login(User.objects.get(
+            username=options['user'] or values['username']))
+        cookie = f'sessionid={client.cookies["sessionid"].value}'
+        wsgi = get_wsgi_application()
+        asgi = ASGIHandler(wsgi, max_workers=options['threads'])
+        delay = options['client_delay'] / 1000
+        results = {}
+        try:
+            for name, pattern in named_patterns():
+                if name not in READ_PATHS:
+                    continue
+                scope = make_scope(build_url(name, pattern, values), cookie)
+                run_wsgi(wsgi, scope, options['warmup'], 1, 1, 0)
+                outcomes = {
+                    'wsgi': run_wsgi(
+                        wsgi, scope, options['requests'], options['clients'],
+                        options['threads'], delay),
+                    'asgi': asyncio.run(run_asgi(
+                        asgi, scope, options['requests'], options['clients'],
+                        delay)),
+                }
+                for server, (durations, errors, elapsed) in outcomes.items():
+                    key = f'{name}:{server}'
+                    results[key] = summarize(durations, elapsed)
+                    results[key]['errors'] = errors
+                    self.stdout.write(
+                        f'{format_row(key, results[key])}  '
+                        f'{errors:>4} errors')
+        finally:
+            asgi.shutdown()
+        if options['output']:
+            write_results(options['output'], results, options={
+                key: options[key]
+                for key in (
+                    'requests', 'clients', 'threads', 'client_delay', 'warmup',
+                )
+            })
@@ -0,0 +1,120 @@
+import os
+import random
+import tempfile
+import time
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+
+from django.core.cache.backends.filebased import FileBasedCache
+from django.core.cache.backends.locmem import LocMemCache
+from django.core.management.base import BaseCommand
+
+from core.benchmark import format_row, summarize, write_results
+from core.cache import SQLiteCache
+
+VALUE = 'x' * 1024
+KEYS = 1000
+
+
+def make_backend(name, directory):
+    params = {'OPTIONS': {'MAX_ENTRIES': KEYS * 10}}
+    if name == 'locmem':
+        return LocMemCache('benchmark', params)
+    if name == 'filebased':
+        return FileBasedCache(os.path.join(directory, 'files'), params)
+    return SQLiteCache(os.path.join(directory, 'cache.sqlite3'), params)
+
+
+def run_workload(name, directory, operations, write_share, seed):
+    """Смесь get/set по общему набору ключей; возвращает длительности."""
+    backend = make_backend(name, directory)
+    rng = random.Random(seed)
+    durations = []
+    for _ in range(operations):
+        key = f'key:{rng.randrange(KEYS)}'
+        started = time.perf_counter()
+        if rng.random() < write_share:
+            backend.set(key, VALUE, 300)
+        else:
+            backend.get(key)
+        durations.append(time.perf_counter() - started)
+    return durations
+
+
+def run_incr(name, directory, operations):
+    backend = make_backend(name, directory)
+    backend.add('counter', 0, None)
+    durations = []
+    for _ in range(operations):
+        started = time.perf_counter()
+        backend.incr('counter')
+        durations.append(time.perf_counter() - started)
+    return durations
+
+
+class Command(BaseCommand):
+    help = (
+        'Сравнивает SQLiteCache с LocMemCache и FileBasedCache '
+        'на смеси чтений и записей в потоках и процессах.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--operations', type=int, default=5000)
+        parser.add_argument('--workers', type=int, default=4)
+        parser.add_argument('--write-share', type=float, default=0.1)
+        parser.add_argument(
+            '--backend', action='append', dest='backends',
+            choices=('locmem', 'filebased', 'sqlite'),
+        )
+        parser.add_argument('--output', help='Файл для JSON-результатов.')
+
+    def handle(self, *args, **options):
+        backends = options['backends'] or ['locmem', 'filebased', 'sqlite']
+        operations = options['operations']
+        workers = options['workers']
+        results = {}
+        with tempfile.TemporaryDirectory() as directory:
+            for name in backends:
+                backend_dir = os.path.join(directory, name)
+                os.makedirs(backend_dir)
+                run_workload(name, backend_dir, KEYS, 1.0, 0)  # прогрев
+                results[f'{name}/single'] = self.measure(
+                    ThreadPoolExecutor, 1, run_workload,
+                    name, backend_dir, operations, options['write_share'])
+                results[f'{name}/threads'] = self.measure(
+                    ThreadPoolExecutor, workers, run_workload,
+                    name, backend_dir, operations, options['write_share'])
+                if name != 'locmem':
+                    # У LocMemCache в каждом процессе своя копия, сравнивать
+                    # его в этом режиме бессмысленно.
+                    results[f'{name}/processes'] = self.measure(
+                        ProcessPoolExecutor, workers, run_workload,
+                        name, backend_dir, operations,
+                        options['write_share'])
+                started = time.perf_counter()
+                durations = run_incr(name, backend_dir, operations)
+                results[f'{name}/incr'] = summarize(
+                    durations, time.perf_counter() - started)
+        for key, summary in results.items():
+            self.stdout.write(format_row(key, summary))
+        if options['output']:
+            write_results(options['output'], results, options={
+                key: options[key]
+                for key in ('operations', 'workers', 'write_share')
+            })
+
+    def measure(self, executor_class, workers, func, name, directory,
+                operations, write_share):
+        per_worker = max(1, operations // workers)
+        started = time.perf_counter()
+        with executor_class(max_workers=workers) as executor:
+            futures = [
+                executor.submit(
+                    func, name, directory, per_worker, write_share, seed)
+                for seed in range(workers)
+            ]
+            durations = [
+                duration
+                for future in futures
+                for duration in future.result()
+            ]
+        return summarize(durations, time.perf_counter() - started)
@@ -0,0 +1,129 @@
+import hashlib
+import os
+import tempfile
+import time
+
+from django.core.management.base import BaseCommand
+from django.test import RequestFactory, override_settings
+from django.views.static import serve as static_serve
+
+from core import media
+from core.benchmark import format_row, summarize, write_results
+
+# Маленькая картинка из ленты и большой файл (оригинал фото, видео).
+SIZES = {'small': 20 * 1024, 'large': 4 * 1024 * 1024}
+RANGE = 'bytes=0-65535'
+
+
+def make_files(directory):
+    """Файлы с именами по хешу, как их сохраняет core/storage.py."""
+    names = {}
+    for label, size in SIZES.items():
+        data = os.urandom(size)
+        digest = hashlib.sha256(data).hexdigest()
+        name = f'posts/{digest[:2]}/{digest}.jpg'
+        path = os.path.join(directory, name)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with open(path, 'wb') as file:
+            file.write(data)
+        names[label] = name
+    return names
+
+
+def send(response, sink, use_sendfile):
+    """Отправляет тело, как WSGI-сервер: через os.sendfile, если сервер
+    умеет wsgi.file_wrapper и ответ — файл, иначе по кускам."""
+    sent = 0
+    filelike = getattr(response, 'file_to_stream', None)
+    try:
+        if use_sendfile and filelike is not None:
+            fileno = filelike.fileno()
+            offset = os.lseek(fileno, 0, os.SEEK_CUR)
+            remaining = int(response['Content-Length'])
+            while remaining:
+                count = os.sendfile(sink, fileno, offset + sent, remaining)
+                if not count:
+                    break
+                sent += count
+                remaining -= count
+        else:
+            for chunk in response:
+                sent += os.write(sink, chunk)
+    finally:
+        response.close()
+    return sent
+
+
+class Command(BaseCommand):
+    help = (
+        'Сравнивает core.media.serve с django.views.static.serve: полный '
+        'файл, повторный запрос с валидаторами и Range, с os.sendfile и '
+        'без него.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--requests', type=int, default=200,
+                            help='Запросов на каждый сценарий.')
+        parser.add_argument('--output', help='Файл для JSON-результатов.')
+
+    def handle(self, *args, **options):
+        factory = RequestFactory()
+        results = {}
+        sink = os.open(os.devnull, os.O_WRONLY)
+        with tempfile.TemporaryDirectory() as directory, override_settings(
+                MEDIA_ROOT=directory, MEDIA_SENDFILE_HEADER=None):
+            views = {
+                'static': lambda request, path: static_serve(
+                    request, path, document_root=directory),
+                'media': media.serve,
+            }
+            try:
+                for label, name in make_files(directory).items():
+                    for view_name, view in views.items():
+                        first = view(factory.get('/'), name)
+                        first.close()
+                        for scenario, headers in self.scenarios(first):
+                            for use_sendfile in (False, True):
+                                mode = 'sendfile' if use_sendfile else 'read'
+                                key = f'{label}:{scenario}:{view_name}:{mode}'
+                                results[key] = self.measure(
+                                    factory, view, name, headers, sink,
+                                    use_sendfile, options['requests'])
+                                self.stdout.write(
+                                    f'{format_row(key, results[key])}  '
+                                    f'{results[key]["kb_per_request"]:>6.0f}'
+                                    ' KB')
+            finally:
+                os.close(sink)
+        if options['output']:
+            write_results(options['output'], results, options={
+                'requests': options['requests'], 'sizes': SIZES,
+            })
+
+    def scenarios(self, first):
+        """Полный файл; повторный запрос с валидаторами из первого ответа,
+        как у браузера с файлом в кеше; первые 64 КБ."""
+        revalidate = {}
+        if first.has_header('ETag'):
+            revalidate['HTTP_IF_NONE_MATCH'] = first['ETag']
+        if first.has_header('Last-Modified'):
+            revalidate['HTTP_IF_MODIFIED_SINCE'] = first['Last-Modified']
+        return (
+            ('full', {}),
+            ('revalidate', revalidate),
+            ('range', {'HTTP_RANGE': RANGE}),
+        )
+
+    def measure(self, factory, view, name, headers, sink, use_sendfile,
+                requests):
+        durations = []
+        sent = 0
+        started = time.perf_counter()
+        for _ in range(requests):
+            request_started = time.perf_counter()
+            response = view(factory.get('/', **headers), name)
+            sent += send(response, sink, use_sendfile)
+            durations.append(time.perf_counter() - request_started)
+        summary = summarize(durations, time.perf_counter() - started)
+        summary['kb_per_request'] = sent / requests / 1024
+        return summary
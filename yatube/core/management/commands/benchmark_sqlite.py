@@ -0,0 +1,188 @@
+import os
+import random
+import tempfile
+import time
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand, CommandError
+from django.db import OperationalError, connection, connections
+from django.test.utils import override_settings
+
+from core.benchmark import format_row, summarize, write_results
+from core.replicas import copy_database
+from posts.models import Comment, Post
+
+User = get_user_model()
+
+# «До»: настройки Django по умолчанию (журнал отката, таймаут модуля
+# sqlite3 в 5 секунд), «после» — SQLITE_PRAGMAS из settings.py.
+PROFILES = ('stock', 'tuned')
+# Кеш ленты на время замера держим в памяти, чтобы мерить только базу.
+LOCAL_CACHE = {
+    'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache'},
+}
+
+
+def is_lock_error(error):
+    return 'locked' in str(error) or 'busy' in str(error)
+
+
+@contextmanager
+def scratch_database(source, profile):
+    """Копия базы, на которую смотрят новые соединения ``default``.
+
+    Соединение текущего потока не трогаем: каждый поток бенчмарка
+    открывает своё и получает PRAGMA от обработчика connection_created.
+    """
+    database = connections.databases['default']
+    saved = {key: database[key] for key in ('NAME', 'CONN_MAX_AGE')}
+    saved_pragmas = database.get('PRAGMAS')
+    with tempfile.TemporaryDirectory() as directory:
+        path = os.path.join(directory, f'{profile}.sqlite3')
+        copy_database(source, path)
+        database.update(NAME=path, CONN_MAX_AGE=None)
+        if profile == 'stock':
+            database['PRAGMAS'] = {}
+        else:
+            database.pop('PRAGMAS', None)
+        try:
+            yield path
+        finally:
+            database.update(saved)
+            if saved_pragmas is None:
+                database.pop('PRAGMAS', None)
+            else:
+                database['PRAGMAS'] = saved_pragmas
+
+
+def write(post_ids, user_ids, rng):
+    """Новый комментарий, а иногда и пост: со всеми сигналами — счётчики,
+    лента подписчиков, сброс кеша."""
+    if rng.random() < 0.2:
+        Post.objects.create(
+            author_id=rng.choice(user_ids), text='Пост из бенчмарка')
+    else:
+        Comment.objects.create(
+            post_id=rng.choice(post_ids),
+            author_id=rng.choice(user_ids),
+            text='Комментарий из бенчмарка',
+        )
+
+
+def read(post_ids, user_ids, rng):
+    """Первая страница главной и комментарии к посту."""
+    list(Post.objects.select_related('author', 'group')
+         .order_by('-pub_date')[:10])
+    list(Comment.objects.filter(post_id=rng.choice(post_ids))
+         .select_related('author')[:50])
+
+
+def run_worker(seed, deadline, write_share, post_ids, user_ids):
+    """Поток бенчмарка: своё соединение, случайная смесь чтений и записей
+    до ``deadline``."""
+    rng = random.Random(seed)
+    durations = {'write': [], 'read': []}
+    errors = {'write': 0, 'read': 0}
+    try:
+        with connection.cursor() as cursor:
+            cursor.execute('PRAGMA journal_mode')
+            journal_mode = cursor.fetchone()[0]
+        while time.perf_counter() < deadline:
+            kind = 'write' if rng.random() < write_share else 'read'
+            operation = write if kind == 'write' else read
+            started = time.perf_counter()
+            try:
+                operation(post_ids, user_ids, rng)
+            except OperationalError as error:
+                if not is_lock_error(error):
+                    raise
+                errors[kind] += 1
+            else:
+                durations[kind].append(time.perf_counter() - started)
+    finally:
+        connections.close_all()
+    return journal_mode, durations, errors
+
+
+class Command(BaseCommand):
+    help = (
+        'Параллельные записи и чтения в копии базы с настройками SQLite '
+        'по умолчанию и с SQLITE_PRAGMAS: операции в секунду, задержки '
+        'и доля ошибок database is locked.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--threads', type=int, default=8)
+        parser.add_argument('--duration', type=float, default=10,
+                            help='Секунд на каждый профиль.')
+        parser.add_argument('--write-share', type=float, default=0.3,
+                            help='Доля операций записи.')
+        parser.add_argument('--seed', type=int, default=0)
+        parser.add_argument(
+            '--source',
+            help='Файл базы для копирования; по умолчанию — default.')
+        parser.add_argument('--profile', action='append', dest='profiles',
+                            choices=PROFILES)
+        parser.add_argument('--output', help='Файл для JSON-результатов.')
+
+    def handle(self, *args, **options):
+        source = options['source'] or settings.DATABASES['default']['NAME']
+        if not os.path.exists(source):
+            raise CommandError(f'Нет файла базы {source}.')
+        post_ids = list(
+            Post.objects.order_by('-pk').values_list('pk', flat=True)[:1000])
+        user_ids = list(User.objects.values_list('pk', flat=True)[:1000])
+        if not post_ids:
+            raise CommandError(
+                'В базе нет постов: сначала запустите generate_dataset.')
+        results = {}
+        with override_settings(CACHES=LOCAL_CACHE):
+            for profile in options['profiles'] or PROFILES:
+                with scratch_database(source, profile):
+                    summary = self.measure(options, post_ids, user_ids)
+                for kind in ('write', 'read'):
+                    name = f'{profile}:{kind}'
+                    results[name] = summary[kind]
+                    self.stdout.write(
+                        f'{format_row(name, summary[kind])}  '
+                        f'{summary[kind]["errors"]:>5} locked '
+                        f'({summary[kind]["error_rate"]:.1%})')
+                self.stdout.write(
+                    f'{profile}: journal_mode={summary["journal_mode"]}, '
+                    f'{summary["per_second"]:.0f} операций/с')
+        if options['output']:
+            write_results(options['output'], results, options={
+                key: options[key]
+                for key in ('threads', 'duration', 'write_share', 'seed')
+            })
+
+    def measure(self, options, post_ids, user_ids):
+        threads = options['threads']
+        started = time.perf_counter()
+        deadline = started + options['duration']
+        with ThreadPoolExecutor(max_workers=threads) as executor:
+            futures = [
+                executor.submit(
+                    run_worker, options['seed'] + number, deadline,
+                    options['write_share'], post_ids, user_ids)
+                for number in range(threads)
+            ]
+            outcomes = [future.result() for future in futures]
+        elapsed = time.perf_counter() - started
+        summary = {'journal_mode': outcomes[0][0]}
+        total = 0
+        for kind in ('write', 'read'):
+            durations = [
+                d for _, by_kind, _ in outcomes for d in by_kind[kind]
+            ]
+            errors = sum(by_kind[kind] for _, _, by_kind in outcomes)
+            summary[kind] = summarize(durations, elapsed)
+            summary[kind]['errors'] = errors
+            attempts = len(durations) + errors
+            summary[kind]['error_rate'] = errors / attempts if attempts else 0
+            total += len(durations)
+        summary['per_second'] = total / elapsed
+        return summary
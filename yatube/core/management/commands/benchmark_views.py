@@ -0,0 +1,193 @@
+import json
+import time
+import tracemalloc
+from concurrent.futures import ThreadPoolExecutor
+
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, connections
+from django.test import Client
+from django.test.utils import CaptureQueriesContext
+from django.urls import URLPattern, reverse
+
+from about import urls as about_urls
+from api import urls as api_urls
+from core.benchmark import compare, format_row, summarize, write_results
+from posts import urls as posts_urls
+from posts.models import Post
+from users import urls as users_urls
+
+User = get_user_model()
+
+NAMESPACES = (
+    (posts_urls, 'posts'),
+    (users_urls, 'users'),
+    (about_urls, 'about'),
+    (api_urls, 'api'),
+)
+# GET на эти адреса меняет данные или завершает сессию.
+UNSAFE = {
+    'posts:profile_follow',
+    'posts:profile_unfollow',
+    'users:logout',
+}
+
+
+def named_patterns():
+    for module, namespace in NAMESPACES:
+        for pattern in module.urlpatterns:
+            if isinstance(pattern, URLPattern) and pattern.name:
+                yield f'{namespace}:{pattern.name}', pattern
+
+
+def sample_values():
+    """Значения параметров URL из реальных данных: самый свежий пост,
+    его автор и группа."""
+    post = (
+        Post.objects.exclude(group=None).order_by('-pk')
+        .values('pk', 'text', 'author__username', 'group__slug').first()
+    )
+    if post is None:
+        raise CommandError(
+            'В базе нет постов с группой: сначала запустите generate_dataset.')
+    return {
+        'post_id': post['pk'],
+        'username': post['author__username'],
+        'slug': post['group__slug'],
+        'format': 'csv',
+        'query': (post['text'].split() or ['пост'])[0],
+    }
+
+
+def build_url(name, pattern, values):
+    url = reverse(name, kwargs={
+        key: values[key] for key in pattern.pattern.converters
+    })
+    if name.startswith('posts:search'):
+        url += f'?q={values["query"]}'
+    return url
+
+
+def make_client(username):
+    client = Client()
+    if username:
+        client.force_login(User.objects.get(username=username))
+    return client
+
+
+def fetch(client, url):
+    response = client.get(url)
+    if response.streaming:
+        for _ in response.streaming_content:
+            pass
+    return response.status_code
+
+
+def run_requests(url, username, count):
+    """Поток бенчмарка: свой клиент и своё соединение с базой."""
+    client = make_client(username)
+    durations = []
+    errors = 0
+    try:
+        for _ in range(count):
+            started = time.perf_counter()
+            status = fetch(client, url)
+            durations.append(time.perf_counter() - started)
+            errors += status >= 400
+    finally:
+        connections.close_all()
+    return durations, errors
+
+
+def profile_request(client, url):
+    """Один запрос под CaptureQueriesContext и tracemalloc: число запросов
+    к базе и пик выделенной памяти. Отдельно от замеров времени, потому
+    что обе обёртки заметно замедляют запрос.
+
+    tracemalloc включается только на этот запрос: считает он лишь
+    выделения после start(), и пик не нужно сбрасывать (reset_peak есть
+    только с Python 3.9)."""
+    tracemalloc.start()
+    try:
+        with CaptureQueriesContext(connection) as queries:
+            fetch(client, url)
+        peak = tracemalloc.get_traced_memory()[1]
+    finally:
+        tracemalloc.stop()
+    return len(queries), peak / 1024
+
+
+class Command(BaseCommand):
+    help = (
+        'Гоняет все именованные URL posts, users, about и api через '
+        'тестовый клиент и печатает задержки, RPS, число запросов к базе '
+        'и пик памяти на запрос.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--requests', type=int, default=200,
+                            help='Запросов на каждый URL.')
+        parser.add_argument('--concurrency', type=int, default=4)
+        parser.add_argument('--warmup', type=int, default=5,
+                            help='Запросов на прогрев кешей перед замером.')
+        parser.add_argument('--user',
+                            help='От чьего имени ходить; без него — аноним.')
+        parser.add_argument('--url', action='append', dest='names',
+                            help='Имя URL, например posts:index.')
+        parser.add_argument('--output', help='Файл для JSON-результатов.')
+        parser.add_argument(
+            '--baseline',
+            help='JSON прошлого прогона: напечатать изменение p95.')
+
+    def handle(self, *args, **options):
+        values = sample_values()
+        patterns = [
+            (name, pattern) for name, pattern in named_patterns()
+            if (name in options['names'] if options['names']
+                else name not in UNSAFE)
+        ]
+        username = options['user']
+        concurrency = options['concurrency']
+        per_worker = max(1, options['requests'] // concurrency)
+        client = make_client(username)
+        results = {}
+        for name, pattern in patterns:
+            url = build_url(name, pattern, values)
+            for _ in range(options['warmup']):
+                fetch(client, url)
+            queries, peak_kb = profile_request(client, url)
+            results[name] = self.measure(
+                url, username, concurrency, per_worker)
+            results[name].update(url=url, queries=queries, peak_kb=peak_kb)
+            self.stdout.write(
+                f'{format_row(name, results[name])}  '
+                f'{queries:>3} SQL  {peak_kb:>8.0f} KiB')
+        if options['output']:
+            write_results(options['output'], results, options={
+                key: options[key]
+                for key in ('requests', 'concurrency', 'warmup', 'user')
+            })
+        if options['baseline']:
+            with open(options['baseline'], encoding='utf-8') as baseline:
+                payload = json.load(baseline)
+            self.stdout.write(
+                f'Сравнение с {payload.get("revision") or "baseline"}:')
+            for line in compare(payload['results'], results):
+                self.stdout.write(line)
+
+    def measure(self, url, username, concurrency, per_worker):
+        started = time.perf_counter()
+        if concurrency == 1:
+            outcomes = [run_requests(url, username, per_worker)]
+        else:
+            with ThreadPoolExecutor(max_workers=concurrency) as executor:
+                futures = [
+                    executor.submit(run_requests, url, username, per_worker)
+                    for _ in range(concurrency)
+                ]
+                outcomes = [future.result() for future in futures]
+        elapsed = time.perf_counter() - started
+        summary = summarize(
+            [d for durations, _ in outcomes for d in durations], elapsed)
+        summary['errors'] = sum(errors for _, errors in outcomes)
+        return summary
@@ -0,0 +1,32 @@
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+from core import replicas
+
+
+class Command(BaseCommand):
+    help = (
+        'Обновляет SQLite-реплики из DATABASE_REPLICAS копией основной '
+        'базы через backup API.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--interval', type=float, default=0,
+            help='Повторять каждые N секунд; по умолчанию один раз.',
+        )
+
+    def handle(self, *args, **options):
+        if not settings.DATABASE_REPLICAS:
+            raise CommandError('DATABASE_REPLICAS пуст.')
+        while True:
+            started = time.perf_counter()
+            aliases = replicas.refresh()
+            self.stdout.write(
+                f'Обновлены {", ".join(aliases)} за '
+                f'{time.perf_counter() - started:.2f} с')
+            if not options['interval']:
+                return
+            time.sleep(options['interval'])
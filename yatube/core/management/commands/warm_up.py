@@ -0,0 +1,25 @@
+from django.core.management.base import BaseCommand
+
+from core import warmup
+
+
+class Command(BaseCommand):
+    help = (
+        'Компилирует шаблоны, собирает URL-резолвер и готовит миниатюры '
+        'свежих постов; печатает время каждого шага.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--step', action='append', dest='steps',
+                            choices=list(warmup.STEPS))
+
+    def handle(self, *args, **options):
+        report = warmup.run(options['steps'])
+        for name, (count, seconds) in report.items():
+            if count is None:
+                self.stderr.write(f'{name:<12} ошибка, см. лог')
+                continue
+            self.stdout.write(
+                f'{name:<12} {count:>6} за {seconds * 1000:>8.1f} мс')
+        total = sum(seconds for _, seconds in report.values())
+        self.stdout.write(f'{"всего":<12} {"":>6}    {total * 1000:>8.1f} мс')
@@ -0,0 +1,182 @@
+"""Раздача файлов из MEDIA_ROOT.
+
+Если перед приложением стоит nginx или Apache (MEDIA_SENDFILE_HEADER),
+view только проверяет путь и условные заголовки, а файл отправляет прокси
+по X-Accel-Redirect или X-Sendfile. Иначе файл отдаёт FileResponse:
+WSGI-сервер с ``wsgi.file_wrapper`` (gunicorn) передаёт его через
+os.sendfile, без чтения в Python. Поддерживаются один диапазон Range,
+ETag и Last-Modified; файлы с именем по хешу содержимого
+(core/storage.py) кешируются клиентами навсегда.
+"""
+import mimetypes
+import os
+import re
+import stat
+from urllib.parse import quote
+
+from django.conf import settings
+from django.core.exceptions import SuspiciousFileOperation
+from django.http import (
+    FileResponse, Http404, HttpResponse, HttpResponseNotAllowed,
+)
+from django.utils._os import safe_join
+from django.utils.cache import get_conditional_response
+from django.utils.http import http_date, parse_http_date_safe
+
+HASHED_NAME = re.compile(r'(?:^|/)([0-9a-f]{64})\.[0-9a-z]+$')
+RANGE = re.compile(r'^bytes=(\d*)-(\d*)$')
+
+
+class RangeNotSatisfiable(ValueError):
+    pass
+
+
+class MediaResponse(FileResponse):
+    # Блоки крупнее стандартных 4 КБ, когда сервер читает файл сам.
+    block_size = 64 * 1024
+
+
+class RangeFile:
+    """Часть файла для FileResponse. ``fileno`` и позиция остаются у
+    исходного файла, поэтому sendfile в gunicorn отправляет ровно
+    Content-Length байт с начала диапазона."""
+
+    def __init__(self, file, start, length):
+        self.file = file
+        self.remaining = length
+        file.seek(start)
+
+    def read(self, size=-1):
+        if size < 0 or size > self.remaining:
+            size = self.remaining
+        data = self.file.read(size)
+        self.remaining -= len(data)
+        return data
+
+    def fileno(self):
+        return self.file.fileno()
+
+    def close(self):
+        self.file.close()
+
+
+def etag_for(path, stats):
+    """Для файла по хешу — сам хеш, для остальных — время изменения и
+    размер, как у nginx."""
+    match = HASHED_NAME.search(path)
+    if match:
+        return f'"{match.group(1)}"'
+    return f'"{stats.st_mtime_ns:x}-{stats.st_size:x}"'
+
+
+def cache_control(path):
+    if HASHED_NAME.search(path):
+        return (f'public, max-age={settings.MEDIA_IMMUTABLE_MAX_AGE}, '
+                'immutable')
+    return f'public, max-age={settings.MEDIA_MAX_AGE}'
+
+
+def parse_range(header, size):
+    """(начало, конец включительно) для заголовка Range.
+
+    None — заголовок нужно игнорировать и отдать файл целиком (нет
+    заголовка, несколько диапазонов, другие единицы);
+    RangeNotSatisfiable — диапазон за концом файла.
+    """
+    match = RANGE.match(header.strip())
+    if not match:
+        return None
+    start, end = match.groups()
+    if not start:
+        if not end:
+            return None
+        suffix = int(end)
+        if not suffix or not size:
+            raise RangeNotSatisfiable
+        return max(0, size - suffix), size - 1
+    start = int(start)
+    if end and int(end) < start:
+        return None
+    if start >= size:
+        raise RangeNotSatisfiable
+    end = min(int(end), size - 1) if end else size - 1
+    return start, end
+
+
+def if_range_matches(request, etag, last_modified):
+    """If-Range: диапазон отдаётся, только если файл не менялся."""
+    value = request.META.get('HTTP_IF_RANGE')
+    if value is None:
+        return True
+    if value.startswith(('"', 'W/')):
+        return value == etag
+    return parse_http_date_safe(value) == last_modified
+
+
+def serve(request, path):
+    if request.method not in ('GET', 'HEAD'):
+        return HttpResponseNotAllowed(['GET', 'HEAD'])
+    try:
+        fullpath = safe_join(settings.MEDIA_ROOT, path)
+        stats = os.stat(fullpath)
+    except (SuspiciousFileOperation, OSError, ValueError):
+        raise Http404
+    if not stat.S_ISREG(stats.st_mode):
+        raise Http404
+    etag = etag_for(path, stats)
+    last_modified = int(stats.st_mtime)
+    headers = {
+        'ETag': etag,
+        'Last-Modified': http_date(last_modified),
+        'Cache-Control': cache_control(path),
+    }
+    response = get_conditional_response(
+        request, etag=etag, last_modified=last_modified)
+    if response is None:
+        response = file_response(request, path, fullpath, stats, etag)
+    for name, value in headers.items():
+        response[name] = value
+    return response
+
+
+def file_response(request, path, fullpath, stats, etag):
+    content_type, encoding = mimetypes.guess_type(fullpath)
+    content_type = content_type or 'application/octet-stream'
+    header = settings.MEDIA_SENDFILE_HEADER
+    if header:
+        # Range и HEAD обрабатывает прокси.
+        response = HttpResponse(content_type=content_type)
+        if header == 'X-Accel-Redirect':
+            response[header] = quote(settings.MEDIA_ACCEL_PREFIX + path)
+        else:
+            response[header] = fullpath
+        return response
+    size = stats.st_size
+    byte_range = None
+    if 'HTTP_RANGE' in request.META and if_range_matches(
+            request, etag, int(stats.st_mtime)):
+        try:
+            byte_range = parse_range(request.META['HTTP_RANGE'], size)
+        except RangeNotSatisfiable:
+            response = HttpResponse(status=416)
+            response['Content-Range'] = f'bytes */{size}'
+            return response
+    start, end = byte_range or (0, size - 1)
+    if request.method == 'HEAD':
+        response = HttpResponse(content_type=content_type)
+    elif byte_range:
+        response = MediaResponse(
+            RangeFile(open(fullpath, 'rb'), start, end - start + 1),
+            content_type=content_type,
+        )
+    else:
+        response = MediaResponse(
+            open(fullpath, 'rb'), content_type=content_type)
+    if byte_range:
+        response.status_code = 206
+        response['Content-Range'] = f'bytes {start}-{end}/{size}'
+    response['Content-Length'] = end - start + 1
+    response['Accept-Ranges'] = 'bytes'
+    if encoding:
+        response['Content-Encoding'] = encoding
+    return response
@@ -0,0 +1,87 @@
+import logging
+
+from django.conf import settings
+
+from . import db_router, timing
+
+logger = logging.getLogger('core.timing')
+
+
+def _ms(seconds):
+    return round(seconds * 1000, 1)
+
+
+class ServerTimingMiddleware:
+    """Время SQL, шаблонов и миниатюр в заголовке ``Server-Timing``.
+
+    Ставится первым в MIDDLEWARE, чтобы ``total`` охватывал весь запрос.
+    Запросы к базе считаются через ``execute_wrapper`` на всех
+    соединениях, в том числе в потоках ``gather``, шаблоны и миниатюры —
+    бэкендами из ``core.timing``.
+    Отрезки пересекаются: SQL и миниатюры, выполненные при рендеринге,
+    входят и в ``tpl``. Тело потоковых ответов в замер не попадает.
+    Кроме заголовка, на каждый запрос пишется строка в лог
+    ``core.timing`` (уровень INFO) с теми же числами в ``extra``.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        current, token = timing.start()
+        try:
+            with timing.watch_connections():
+                response = self.get_response(request)
+        finally:
+            timing.finish(token)
+        total = current.total()
+        response['Server-Timing'] = ', '.join((
+            f'db;dur={_ms(current.sql)};desc="{current.queries} queries"',
+            f'tpl;dur={_ms(current.template)}',
+            f'thumb;dur={_ms(current.thumbnail)}'
+            f';desc="{current.thumbnails} thumbnails"',
+            f'total;dur={_ms(total)}',
+        ))
+        if logger.isEnabledFor(logging.INFO):
+            fields = {
+                'method': request.method,
+                'path': request.path,
+                'status': response.status_code,
+                'total_ms': _ms(total),
+                'db_ms': _ms(current.sql),
+                'db_queries': current.queries,
+                'template_ms': _ms(current.template),
+                'thumbnail_ms': _ms(current.thumbnail),
+                'thumbnails': current.thumbnails,
+            }
+            logger.info(
+                ' '.join(f'{key}={value}' for key, value in fields.items()),
+                extra={'timing': fields},
+            )
+        return response
+
+
+class ReplicaStickinessMiddleware:
+    """После записи в базу ставит короткоживущую cookie; пока она есть,
+    чтения пользователя идут в основную базу, а не на реплики, которые
+    могут ещё не знать о его изменениях."""
+
+    cookie_name = 'use_primary'
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        token = db_router.pin_to_primary(self.cookie_name in request.COOKIES)
+        try:
+            response = self.get_response(request)
+            if settings.DATABASE_REPLICAS and db_router.wrote():
+                response.set_cookie(
+                    self.cookie_name, '1',
+                    max_age=settings.REPLICA_STICKY_SECONDS,
+                    httponly=True,
+                    samesite='Lax',
+                )
+        finally:
+            db_router.release(token)
+        return response
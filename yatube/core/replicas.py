@@ -0,0 +1,37 @@
+import os
+import sqlite3
+
+from django.conf import settings
+from django.db import connections
+
+
+def copy_database(source, target, pages=1024):
+    """Копирует SQLite-базу через backup API и атомарно подменяет файл.
+
+    Копия пишется рядом во временный файл и переводится из WAL в обычный
+    журнал: иначе новый файл реплики встретился бы со старыми -wal/-shm.
+    Открытые соединения дочитывают старую копию, новые видят свежую.
+    """
+    temporary = f'{target}.tmp'
+    if os.path.exists(temporary):
+        os.remove(temporary)
+    src = sqlite3.connect(source)
+    dst = sqlite3.connect(temporary)
+    try:
+        src.backup(dst, pages=pages)
+        dst.execute('PRAGMA journal_mode=DELETE')
+    finally:
+        src.close()
+        dst.close()
+    os.replace(temporary, target)
+
+
+def refresh(aliases=None):
+    """Обновляет реплики из DATABASE_REPLICAS; возвращает их список."""
+    source = settings.DATABASES['default']['NAME']
+    aliases = aliases or settings.DATABASE_REPLICAS
+    for alias in aliases:
+        copy_database(source, settings.DATABASES[alias]['NAME'])
+        # Соединение текущего процесса держит старый файл.
+        connections[alias].close()
+    return aliases
@@ -0,0 +1,20 @@
+from django.conf import settings
+
+
+def pragmas_for(settings_dict):
+    """PRAGMA для базы: ``PRAGMAS`` из её настроек или SQLITE_PRAGMAS."""
+    return settings_dict.get('PRAGMAS', settings.SQLITE_PRAGMAS)
+
+
+def configure_connection(sender, connection, **kwargs):
+    """Обработчик connection_created: настраивает новое соединение SQLite.
+
+    journal_mode=WAL хранится в самом файле базы, остальные PRAGMA
+    действуют только на это соединение, поэтому выполняются каждый раз.
+    С CONN_MAX_AGE соединение живёт дольше запроса, и это случается редко.
+    """
+    if connection.vendor != 'sqlite':
+        return
+    with connection.cursor() as cursor:
+        for name, value in pragmas_for(connection.settings_dict).items():
+            cursor.execute(f'PRAGMA {name} = {value}')
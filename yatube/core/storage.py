@@ -0,0 +1,73 @@
+import hashlib
+import os
+import posixpath
+import uuid
+
+from django.core.files import File
+from django.core.files.storage import FileSystemStorage
+from django.utils.deconstruct import deconstructible
+
+CHUNK_SIZE = 1024 * 1024
+
+
+def content_hash(content):
+    """SHA-256 содержимого файла; читает по кускам, указатель
+    возвращается в начало."""
+    digest = hashlib.sha256()
+    if hasattr(content, 'chunks'):
+        for chunk in content.chunks(CHUNK_SIZE):
+            digest.update(chunk)
+    else:
+        for chunk in iter(lambda: content.read(CHUNK_SIZE), b''):
+            digest.update(chunk)
+    content.seek(0)
+    return digest.hexdigest()
+
+
+def hashed_name(name, digest):
+    """posts/photo.JPG -> posts/3f/3fa4…e1.jpg: каталог из upload_to,
+    подкаталог по первым символам хеша, чтобы каталоги не разрастались."""
+    directory, filename = posixpath.split(name.replace('\\', '/'))
+    extension = os.path.splitext(filename)[1].lower()
+    return posixpath.join(directory, digest[:2], digest + extension)
+
+
+@deconstructible
+class ContentAddressedStorage(FileSystemStorage):
+    """Файловое хранилище, в котором имя файла — хеш его содержимого.
+
+    Одинаковые загрузки получают одно имя и один файл на диске, а с ним
+    и общие варианты и миниатюры. Удалять файл можно, только когда на
+    него не ссылается ни один пост (см. posts/blobs.py).
+    """
+
+    def save(self, name, content, max_length=None):
+        if name is None:
+            name = content.name
+        if not hasattr(content, 'chunks'):
+            content = File(content, name)
+        name = hashed_name(name, content_hash(content))
+        return super().save(name, content, max_length=max_length)
+
+    def get_available_name(self, name, max_length=None):
+        # Файл с тем же именем — это файл с тем же содержимым.
+        return name
+
+    def restore(self, name, content):
+        """Записывает ``content`` под уже готовым именем по хешу, если
+        файла нет; возвращает True, если файл пришлось записать."""
+        if self.exists(name):
+            return False
+        # File без temporary_file_path: временный файл загрузки уже
+        # перемещён первым сохранением, читаем его через дескриптор.
+        self._save(name, File(content, name))
+        return True
+
+    def _save(self, name, content):
+        if self.exists(name):
+            return name
+        # Пишем во временный файл и переименовываем: параллельная
+        # загрузка того же содержимого заменит файл таким же.
+        temporary = super()._save(f'{name}.{uuid.uuid4().hex}.tmp', content)
+        os.replace(self.path(temporary), self.path(name))
+        return name
@@ -0,0 +1,55 @@
+"""Общее для тестов проекта."""
+import shutil
+import tempfile
+from io import BytesIO
+
+from django.conf import settings
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.test import override_settings
+from django.test.runner import DiscoverRunner
+from PIL import Image
+from posts.imaging import ORIENTATION_TAG
+
+
+def isolated_caches(directory):
+    """CACHES из настроек, в которых файлы кеша SQLite лежат в
+    ``directory``: тесты не должны читать и чистить кеш разработчика."""
+    caches = {}
+    for alias, options in settings.CACHES.items():
+        options = dict(options)
+        if options['BACKEND'] == 'core.cache.SQLiteCache':
+            options['LOCATION'] = f'{directory}/{alias}.sqlite3'
+        caches[alias] = options
+    return override_settings(CACHES=caches)
+
+
+def image_bytes(size=(64, 48), color='red', orientation=None):
+    """JPEG-картинка одного цвета; orientation записывается в EXIF."""
+    buffer = BytesIO()
+    options = {}
+    if orientation:
+        exif = Image.Exif()
+        exif[ORIENTATION_TAG] = orientation
+        options['exif'] = exif.tobytes()
+    Image.new('RGB', size, color).save(buffer, 'JPEG', **options)
+    return buffer.getvalue()
+
+
+def make_image(name='photo.jpg', **kwargs):
+    """Загруженный файл с картинкой из ``image_bytes``."""
+    return SimpleUploadedFile(name, image_bytes(**kwargs), 'image/jpeg')
+
+
+class TestRunner(DiscoverRunner):
+    """DiscoverRunner с кешем во временном каталоге."""
+
+    def setup_test_environment(self, **kwargs):
+        super().setup_test_environment(**kwargs)
+        self.cache_directory = tempfile.mkdtemp()
+        self.caches = isolated_caches(self.cache_directory)
+        self.caches.enable()
+
+    def teardown_test_environment(self, **kwargs):
+        self.caches.disable()
+        shutil.rmtree(self.cache_directory, ignore_errors=True)
+        super().teardown_test_environment(**kwargs)
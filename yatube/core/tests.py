@@ -1,5 +1,32 @@
-from django.test import TestCase
+import asyncio
+import hashlib
+import json
+import os
+import shutil
+import sqlite3
+import tempfile
+import threading
+import time
 from http import HTTPStatus
+from io import StringIO
+from unittest import mock
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.core.management import call_command
+from django.db import connection, transaction
+from django.db.backends.sqlite3.base import DatabaseWrapper
+from django.test import TestCase, TransactionTestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from posts import images, resize
+from posts.models import Group, Post
+
+from . import db_router, timing, warmup
+from .asgi import ASGIHandler, build_environ
+from .cache import SQLiteCache
+from .concurrency import gather
+from .replicas import copy_database
+from .testing import make_image
 
 
 class CoreTests(TestCase):
@@ -8,3 +35,677 @@ class CoreTests(TestCase):
         response = self.client.get('/unexisting_page/')
         self.assertEqual(response.status_code, HTTPStatus.NOT_FOUND)
         self.assertTemplateUsed(response, 'core/404.html')
+
+
+class SQLiteCacheTests(TestCase):
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.path = os.path.join(self.directory, 'cache.sqlite3')
+        self.cache = self.make_cache()
+
+    def tearDown(self):
+        shutil.rmtree(self.directory, ignore_errors=True)
+
+    def make_cache(self, **options):
+        return SQLiteCache(self.path, {'OPTIONS': options})
+
+    def test_set_get_delete(self):
+        """Значения сохраняются, читаются и удаляются."""
+        self.cache.set('key', {'value': 1})
+        self.assertEqual(self.cache.get('key'), {'value': 1})
+        self.cache.delete('key')
+        self.assertIsNone(self.cache.get('key'))
+
+    def test_shared_between_instances(self):
+        """Второй экземпляр (как другой воркер) видит те же записи."""
+        self.cache.set('key', 'value')
+        self.assertEqual(self.make_cache().get('key'), 'value')
+
+    def test_expiry_and_add(self):
+        """Просроченная запись не читается, и add снова её записывает."""
+        self.cache.set('key', 'old', 0.01)
+        time.sleep(0.02)
+        self.assertIsNone(self.cache.get('key'))
+        self.assertTrue(self.cache.add('key', 'new'))
+        self.assertFalse(self.cache.add('key', 'newer'))
+        self.assertEqual(self.cache.get('key'), 'new')
+
+    def test_incr(self):
+        """incr увеличивает значение и падает на отсутствующем ключе."""
+        self.cache.set('counter', 1)
+        self.assertEqual(self.cache.incr('counter', 2), 3)
+        self.assertEqual(self.make_cache().get('counter'), 3)
+        with self.assertRaises(ValueError):
+            self.cache.incr('missing')
+
+    def test_get_many_set_many(self):
+        """Пакетные операции работают одним запросом на пачку."""
+        self.cache.set_many({'a': 1, 'b': 2})
+        self.assertEqual(
+            self.cache.get_many(['a', 'b', 'c']), {'a': 1, 'b': 2})
+
+    def test_lru_eviction_by_entries(self):
+        """При переполнении вытесняются давно не читанные записи."""
+        cache = self.make_cache(MAX_ENTRIES=3, CULL_FREQUENCY=3)
+        # Время доступа обновляется при каждом чтении.
+        cache.LRU_RESOLUTION = 0
+        for key in ('a', 'b', 'c'):
+            cache.set(key, key)
+            time.sleep(0.01)
+        # Самая старая запись прочитана и уже не первая на вытеснение.
+        self.assertEqual(cache.get('a'), 'a')
+        time.sleep(0.01)
+        cache.set('d', 'd')
+        self.assertIsNone(cache.get('b'))
+        for key in ('a', 'c', 'd'):
+            self.assertEqual(cache.get(key), key)
+
+    def test_size_limit(self):
+        """Суммарный размер значений не превышает MAX_SIZE."""
+        cache = self.make_cache(MAX_SIZE=4096)
+        for i in range(10):
+            cache.set(f'key{i}', 'x' * 1024)
+        stored = sum(
+            1 for i in range(10) if cache.get(f'key{i}') is not None)
+        self.assertLessEqual(stored, 4)
+        self.assertEqual(cache.get('key9'), 'x' * 1024)
+
+    def test_read_while_locked(self):
+        """Чтение не падает, пока другой процесс держит запись, хотя
+        время доступа обновить не удаётся."""
+        self.cache.set('a', 1)
+        self.cache.set('b', 2)
+        cache = self.make_cache(BUSY_TIMEOUT=0.05)
+        cache.LRU_RESOLUTION = -1
+        # Соединение со схемой открывается до блокировки.
+        cache.get('a')
+        writer = sqlite3.connect(self.path, isolation_level=None)
+        self.addCleanup(writer.close)
+        writer.execute('BEGIN IMMEDIATE')
+        try:
+            self.assertEqual(cache.get('a'), 1)
+            self.assertEqual(cache.get_many(['a', 'b']), {'a': 1, 'b': 2})
+        finally:
+            writer.execute('ROLLBACK')
+
+    def test_clear(self):
+        self.cache.set('key', 'value')
+        self.cache.clear()
+        self.assertFalse(self.cache.has_key('key'))
+
+
+class BenchmarkViewsTests(TestCase):
+    def test_benchmark_writes_results(self):
+        """benchmark_views пишет JSON с задержками, SQL и памятью."""
+        author = get_user_model().objects.create_user(username='Writer')
+        group = Group.objects.create(
+            title='Группа', slug='group', description='Описание')
+        Post.objects.create(author=author, group=group, text='Пост')
+        directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, directory, ignore_errors=True)
+        path = os.path.join(directory, 'results.json')
+        call_command(
+            'benchmark_views', '--url', 'posts:index', '--url', 'about:tech',
+            '--requests', '2', '--concurrency', '1', '--warmup', '0',
+            '--output', path, stdout=StringIO(),
+        )
+        with open(path, encoding='utf-8') as results_file:
+            results = json.load(results_file)['results']
+        self.assertEqual(set(results), {'posts:index', 'about:tech'})
+        self.assertEqual(results['posts:index']['count'], 2)
+        for key in ('p50_ms', 'p99_ms', 'per_second', 'queries', 'peak_kb'):
+            self.assertIn(key, results['posts:index'])
+
+
+class ServerTimingTests(TestCase):
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.directory, ignore_errors=True)
+        cache.clear()
+
+    def timings(self, response):
+        """Заголовок Server-Timing в виде {имя: (dur, desc)}."""
+        result = {}
+        for metric in response['Server-Timing'].split(', '):
+            name, *params = metric.split(';')
+            params = dict(param.split('=', 1) for param in params)
+            result[name] = (float(params['dur']), params.get('desc'))
+        return result
+
+    def test_header_counts_queries_and_templates(self):
+        """Заголовок и строка лога содержат число запросов к базе и время
+        рендеринга."""
+        with self.assertLogs('core.timing', 'INFO') as logs:
+            with CaptureQueriesContext(connection) as queries:
+                response = self.client.get('/')
+        timings = self.timings(response)
+        self.assertEqual(timings['db'][1], f'"{len(queries)} queries"')
+        self.assertGreater(timings['tpl'][0], 0)
+        self.assertGreaterEqual(timings['total'][0], timings['tpl'][0])
+        self.assertIn('path=/ status=200', logs.output[0])
+        self.assertEqual(
+            logs.records[0].timing['db_queries'], len(queries))
+
+    def test_thumbnails_are_timed(self):
+        """Уменьшение картинки по ссылке из ленты попадает в thumb."""
+        with override_settings(MEDIA_ROOT=self.directory,
+                               POST_IMAGE_PROCESSES=0):
+            author = get_user_model().objects.create_user(username='Writer')
+            with mock.patch.object(images, 'schedule'):
+                post = Post.objects.create(
+                    author=author, text='Пост', image=make_image())
+            response = self.client.get(resize.url(post.image.name, 32, 24))
+            response.close()
+        self.assertEqual(self.timings(response)['thumb'][1], '"1 thumbnails"')
+        self.assertGreater(self.timings(response)['thumb'][0], 0)
+
+
+@override_settings(DATABASE_REPLICAS=['replica'])
+class ReplicaRouterTests(TestCase):
+    def setUp(self):
+        self.router = db_router.ReplicaRouter()
+        token = db_router.pin_to_primary(False)
+        self.addCleanup(db_router.release, token)
+
+    def read_in_view(self, model, write_first=False):
+        @db_router.replica_reads
+        def view(request):
+            if write_first:
+                self.router.db_for_write(model)
+            return self.router.db_for_read(model)
+        return view(None)
+
+    def test_only_marked_views_read_from_replica(self):
+        """С реплики читают только помеченные представления, а сессии и
+        пользователи всегда читаются из основной базы."""
+        self.assertEqual(self.router.db_for_read(Post), 'default')
+        self.assertEqual(self.read_in_view(Post), 'replica')
+        self.assertEqual(self.read_in_view(get_user_model()), 'default')
+
+    def test_write_pins_request_to_primary(self):
+        """После записи запрос дочитывает данные из основной базы."""
+        self.assertEqual(self.read_in_view(Post, write_first=True), 'default')
+        self.assertTrue(db_router.wrote())
+
+    def test_write_outside_request_does_not_pin(self):
+        """Запись вне запроса (команды, фоновые потоки) не оставляет
+        состояния, которое прилепило бы следующие чтения к основной базе."""
+        results = []
+
+        def background():
+            self.router.db_for_write(Post)
+            results.append((db_router.wrote(), self.read_in_view(Post)))
+
+        thread = threading.Thread(target=background)
+        thread.start()
+        thread.join()
+        self.assertEqual(results, [(False, 'replica')])
+
+    def test_release_drops_request_state(self):
+        token = db_router.pin_to_primary(False)
+        self.router.db_for_write(Post)
+        db_router.release(token)
+        self.assertFalse(db_router.wrote())
+        self.assertEqual(self.read_in_view(Post), 'replica')
+
+
+@override_settings(DATABASE_REPLICAS=['default'])
+class ReplicaStickinessTests(TestCase):
+    def setUp(self):
+        self.user = get_user_model().objects.create_user(username='Writer')
+        self.client.force_login(self.user)
+
+    def test_write_sets_sticky_cookie(self):
+        """Запись ставит cookie, чтение — нет."""
+        response = self.client.get('/')
+        self.assertNotIn('use_primary', response.cookies)
+        response = self.client.post('/create/', {'text': 'Новый пост'})
+        cookie = response.cookies['use_primary']
+        self.assertEqual(cookie['max-age'], 10)
+
+
+class CopyDatabaseTests(TestCase):
+    def test_copy_database(self):
+        """Копия базы через backup API содержит данные источника."""
+        directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, directory, ignore_errors=True)
+        source = os.path.join(directory, 'source.sqlite3')
+        target = os.path.join(directory, 'replica.sqlite3')
+        with sqlite3.connect(source) as source_db:
+            source_db.execute('PRAGMA journal_mode=WAL')
+            source_db.execute('CREATE TABLE posts (text TEXT)')
+            source_db.execute("INSERT INTO posts VALUES ('пост')")
+        copy_database(source, target)
+        replica = sqlite3.connect(target)
+        self.addCleanup(replica.close)
+        self.assertEqual(
+            replica.execute('SELECT text FROM posts').fetchall(), [('пост',)])
+        self.assertEqual(
+            replica.execute('PRAGMA journal_mode').fetchone(), ('delete',))
+
+
+class SQLitePragmaTests(TestCase):
+    def setUp(self):
+        directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, directory, ignore_errors=True)
+        self.path = os.path.join(directory, 'db.sqlite3')
+
+    def pragmas(self, **database):
+        wrapper = DatabaseWrapper(
+            {**connection.settings_dict, 'NAME': self.path, **database},
+            'pragmas',
+        )
+        self.addCleanup(wrapper.close)
+        with wrapper.cursor() as cursor:
+            values = {}
+            for name in ('journal_mode', 'synchronous', 'busy_timeout',
+                         'temp_store', 'cache_size'):
+                cursor.execute(f'PRAGMA {name}')
+                values[name] = cursor.fetchone()[0]
+        return values
+
+    def test_new_connection_gets_pragmas(self):
+        """Новое соединение получает PRAGMA из SQLITE_PRAGMAS."""
+        self.assertEqual(self.pragmas(), {
+            'journal_mode': 'wal',
+            'synchronous': 1,
+            'busy_timeout': 5000,
+            'temp_store': 2,
+            'cache_size': -64 * 1024,
+        })
+
+    def test_database_overrides_pragmas(self):
+        """Ключ PRAGMAS в настройках базы заменяет SQLITE_PRAGMAS."""
+        values = self.pragmas(PRAGMAS={'busy_timeout': 100})
+        self.assertEqual(values['journal_mode'], 'delete')
+        self.assertEqual(values['busy_timeout'], 100)
+
+
+class BenchmarkSQLiteTests(TransactionTestCase):
+    # Backup API ждёт, пока в исходной базе нет открытой транзакции,
+    # а TestCase держит её на всё время теста.
+    def test_benchmark_compares_profiles(self):
+        """Бенчмарк гоняет записи и чтения в копиях базы с настройками по
+        умолчанию и с SQLITE_PRAGMAS."""
+        user = get_user_model().objects.create_user(username='writer')
+        Post.objects.create(author=user, text='Пост')
+        directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, directory, ignore_errors=True)
+        source = os.path.join(directory, 'source.sqlite3')
+        output = os.path.join(directory, 'results.json')
+        target = sqlite3.connect(source)
+        connection.connection.backup(target)
+        target.close()
+        stdout = StringIO()
+        call_command(
+            'benchmark_sqlite', source=source, threads=2, duration=0.3,
+            output=output, stdout=stdout,
+        )
+        self.assertIn('stock: journal_mode=delete', stdout.getvalue())
+        self.assertIn('tuned: journal_mode=wal', stdout.getvalue())
+        with open(output, encoding='utf-8') as results:
+            payload = json.load(results)
+        self.assertEqual(set(payload['results']), {
+            'stock:write', 'stock:read', 'tuned:write', 'tuned:read',
+        })
+        for summary in payload['results'].values():
+            self.assertEqual(summary['errors'], 0)
+        # Бенчмарк пишет только в копии.
+        self.assertEqual(Post.objects.count(), 1)
+
+
+class GatherTests(TransactionTestCase):
+    def test_runs_in_pool_and_keeps_order(self):
+        """Функции, кроме первой, выполняются в пуле; порядок результатов
+        сохраняется."""
+        Post.objects.create(
+            author=get_user_model().objects.create_user(username='author'),
+            text='Пост',
+        )
+        results = gather(
+            lambda: threading.current_thread().name,
+            Post.objects.count,
+            lambda: threading.current_thread().name,
+        )
+        self.assertEqual(results[0], threading.current_thread().name)
+        self.assertEqual(results[1], 1)
+        self.assertTrue(results[2].startswith('db-query'))
+
+    def test_pool_queries_are_timed(self):
+        """Соединения потоков пула тоже обёрнуты замером запроса."""
+        def wrappers():
+            return [
+                wrapper.__self__ for wrapper in connection.execute_wrappers]
+
+        current, token = timing.start()
+        try:
+            with timing.watch_connections():
+                results = gather(wrappers, wrappers)
+        finally:
+            timing.finish(token)
+        self.assertEqual(results, [[current], [current]])
+
+    def test_inline_inside_transaction(self):
+        """Внутри транзакции всё выполняется в текущем потоке."""
+        with transaction.atomic():
+            results = gather(
+                lambda: threading.current_thread().name,
+                lambda: threading.current_thread().name,
+            )
+        self.assertEqual(set(results), {threading.current_thread().name})
+
+
+class ASGITests(TransactionTestCase):
+    def request(self, path, method='GET', body=b'', headers=()):
+        application = ASGIHandler(max_workers=2)
+        self.addCleanup(application.shutdown)
+        scope = {
+            'type': 'http',
+            'method': method,
+            'path': path,
+            'query_string': b'',
+            'headers': [(b'host', b'localhost'), *headers],
+        }
+        messages = [{'type': 'http.request', 'body': body}]
+        sent = []
+
+        async def receive():
+            return messages.pop(0)
+
+        async def send(message):
+            sent.append(message)
+
+        asyncio.run(application(scope, receive, send))
+        return sent
+
+    def test_page_through_asgi(self):
+        """Страница отдаётся через ASGI теми же ответами Django."""
+        Post.objects.create(
+            author=get_user_model().objects.create_user(username='author'),
+            text='Пост через ASGI',
+        )
+        start, body = self.request('/')
+        self.assertEqual(start['status'], HTTPStatus.OK)
+        self.assertIn((b'content-type', b'text/html; charset=utf-8'),
+                      start['headers'])
+        self.assertIn('Пост через ASGI', body['body'].decode())
+        self.assertEqual(
+            self.request('/unexisting_page/')[0]['status'],
+            HTTPStatus.NOT_FOUND)
+
+    def test_streaming_response(self):
+        """Потоковый ответ уходит кусками, последний — пустой."""
+        author = get_user_model().objects.create_user(username='author')
+        Post.objects.create(author=author, text='Пост')
+        start, *chunks = self.request('/profile/author/export.csv')
+        self.assertEqual(start['status'], HTTPStatus.OK)
+        self.assertTrue(all(chunk['more_body'] for chunk in chunks[:-1]))
+        self.assertEqual(chunks[-1]['body'], b'')
+        self.assertIn(
+            'Пост', b''.join(chunk['body'] for chunk in chunks).decode())
+
+    def test_streaming_body_stays_on_one_thread(self):
+        """Все куски и close() потокового ответа выполняются в одном
+        потоке: курсор базы нельзя читать из разных потоков пула. Потоков
+        для тел не больше ASGI_STREAM_THREADS."""
+        streams = []
+
+        class Stream:
+            streaming = True
+
+            def __init__(self):
+                self.threads = []
+                streams.append(self)
+
+            def __iter__(self):
+                for number in range(10):
+                    self.threads.append(threading.current_thread().name)
+                    yield str(number).encode()
+
+            def close(self):
+                self.threads.append(threading.current_thread().name)
+
+        def application(environ, start_response):
+            start_response('200 OK', [])
+            return Stream()
+
+        handler = ASGIHandler(application, max_workers=2, stream_workers=2)
+        self.addCleanup(handler.shutdown)
+        sent = []
+
+        async def send(message):
+            sent.append(message)
+            # Другие ответы успевают занять потоки пула.
+            await asyncio.sleep(0)
+
+        async def main():
+            await asyncio.gather(
+                *(handler.respond({}, send) for _ in range(4)))
+
+        asyncio.run(main())
+        names = set()
+        for stream in streams:
+            self.assertEqual(len(stream.threads), 11)
+            self.assertEqual(len(set(stream.threads)), 1)
+            names.update(stream.threads)
+        self.assertLessEqual(len(names), 2)
+        self.assertTrue(all(name.startswith('asgi-stream') for name in names))
+        self.assertEqual(
+            sum(1 for message in sent if message.get('more_body')), 40)
+
+    def test_lifespan_shuts_pools_down(self):
+        """На lifespan.shutdown оба пула останавливаются."""
+        handler = ASGIHandler(lambda environ, start_response: [])
+        messages = [
+            {'type': 'lifespan.startup'}, {'type': 'lifespan.shutdown'}]
+        sent = []
+
+        async def receive():
+            return messages.pop(0)
+
+        async def send(message):
+            sent.append(message['type'])
+
+        asyncio.run(handler({'type': 'lifespan'}, receive, send))
+        self.assertEqual(sent, [
+            'lifespan.startup.complete', 'lifespan.shutdown.complete'])
+        for executor in (handler.executor, handler.stream_executor):
+            with self.assertRaises(RuntimeError):
+                executor.submit(print)
+
+    def test_build_environ(self):
+        """Заголовки и тело переходят в WSGI-окружение."""
+        environ = build_environ({
+            'method': 'POST',
+            'path': '/путь/',
+            'query_string': b'q=1',
+            'headers': [
+                (b'content-type', b'text/plain'),
+                (b'cookie', b'a=1'),
+                (b'cookie', b'b=2'),
+            ],
+        }, b'body')
+        self.assertEqual(environ['PATH_INFO'].encode('latin-1').decode(),
+                         '/путь/')
+        self.assertEqual(environ['QUERY_STRING'], 'q=1')
+        self.assertEqual(environ['CONTENT_TYPE'], 'text/plain')
+        self.assertEqual(environ['CONTENT_LENGTH'], '4')
+        self.assertEqual(environ['HTTP_COOKIE'], 'a=1; b=2')
+        self.assertEqual(environ['wsgi.input'].read(), b'body')
+
+
+class BenchmarkASGITests(TransactionTestCase):
+    def test_benchmark_compares_servers(self):
+        """benchmark_asgi меряет каждую ленту под WSGI и под ASGI."""
+        author = get_user_model().objects.create_user(username='Writer')
+        group = Group.objects.create(
+            title='Группа', slug='group', description='Описание')
+        Post.objects.create(author=author, group=group, text='Пост')
+        directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, directory, ignore_errors=True)
+        path = os.path.join(directory, 'results.json')
+        call_command(
+            'benchmark_asgi', '--requests', '2', '--clients', '2',
+            '--threads', '2', '--client-delay', '0', '--warmup', '0',
+            '--output', path, stdout=StringIO(),
+        )
+        with open(path, encoding='utf-8') as results_file:
+            results = json.load(results_file)['results']
+        self.assertEqual(set(results), {
+            f'{name}:{server}'
+            for name in ('posts:index', 'posts:group_list', 'posts:profile',
+                         'posts:post_detail', 'posts:follow_index')
+            for server in ('wsgi', 'asgi')
+        })
+        for summary in results.values():
+            self.assertEqual(summary['count'], 2)
+            self.assertEqual(summary['errors'], 0)
+
+
+class WarmUpTests(TestCase):
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.directory, ignore_errors=True)
+
+    def test_warm_up_command(self):
+        """warm_up компилирует шаблоны, собирает URL и готовит миниатюры
+        свежих постов, печатая время каждого шага."""
+        with override_settings(MEDIA_ROOT=self.directory):
+            author = get_user_model().objects.create_user(username='Writer')
+            Post.objects.create(
+                author=author, text='Пост', image=make_image())
+            report = warmup.run()
+            stdout = StringIO()
+            call_command('warm_up', '--step', 'urls', stdout=stdout)
+        self.assertGreater(report['templates'][0], 20)
+        self.assertGreater(report['urls'][0], 20)
+        self.assertEqual(report['thumbnails'][0], 1)
+        self.assertTrue(os.listdir(os.path.join(self.directory, 'resize')))
+        self.assertRegex(stdout.getvalue(), r'urls +\d+ за +[\d.]+ мс')
+        self.assertNotIn('templates', stdout.getvalue())
+
+    @override_settings(WARMUP_ON_START=False)
+    def test_on_start_respects_setting(self):
+        """Без WARMUP_ON_START импорт wsgi.py ничего не прогревает."""
+        self.assertIsNone(warmup.on_start())
+
+
+class MediaServeTests(TestCase):
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.directory, ignore_errors=True)
+        settings = override_settings(
+            MEDIA_ROOT=self.directory, MEDIA_SENDFILE_HEADER=None)
+        settings.enable()
+        self.addCleanup(settings.disable)
+        self.data = bytes(range(256)) * 40
+        self.digest = hashlib.sha256(self.data).hexdigest()
+        self.hashed = self.write(
+            f'posts/{self.digest[:2]}/{self.digest}.jpg', self.data)
+
+    def write(self, name, data):
+        path = os.path.join(self.directory, name)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with open(path, 'wb') as file:
+            file.write(data)
+        return name
+
+    def get(self, name, **headers):
+        response = self.client.get(f'/media/{name}', **headers)
+        body = b''.join(response.streaming_content) if response.streaming \
+            else response.content
+        response.close()
+        return response, body
+
+    def test_hashed_file_is_immutable(self):
+        """Файл по хешу отдаётся целиком, ETag — хеш, кешируется на год."""
+        response, body = self.get(self.hashed)
+        self.assertEqual(response.status_code, HTTPStatus.OK)
+        self.assertEqual(body, self.data)
+        self.assertEqual(response['Content-Type'], 'image/jpeg')
+        self.assertEqual(response['Content-Length'], str(len(self.data)))
+        self.assertEqual(response['ETag'], f'"{self.digest}"')
+        self.assertEqual(response['Accept-Ranges'], 'bytes')
+        self.assertIn('immutable', response['Cache-Control'])
+
+    def test_other_files_are_revalidated(self):
+        """Остальные файлы кешируются на MEDIA_MAX_AGE и без immutable."""
+        response, _ = self.get(self.write('posts/photo.jpg', b'jpeg'))
+        self.assertNotIn('immutable', response['Cache-Control'])
+        self.assertNotEqual(response['ETag'], f'"{self.digest}"')
+
+    def test_not_modified(self):
+        response, body = self.get(
+            self.hashed, HTTP_IF_NONE_MATCH=f'"{self.digest}"')
+        self.assertEqual(response.status_code, HTTPStatus.NOT_MODIFIED)
+        self.assertEqual(body, b'')
+
+    def test_ranges(self):
+        """Один диапазон даёт 206 и нужные байты, диапазон за концом
+        файла — 416, If-Range с другим ETag — файл целиком."""
+        size = len(self.data)
+        cases = {
+            'bytes=10-19': (10, 19),
+            'bytes=-5': (size - 5, size - 1),
+            f'bytes={size - 3}-': (size - 3, size - 1),
+            f'bytes=0-{size * 2}': (0, size - 1),
+        }
+        for header, (start, end) in cases.items():
+            with self.subTest(header=header):
+                response, body = self.get(self.hashed, HTTP_RANGE=header)
+                self.assertEqual(
+                    response.status_code, HTTPStatus.PARTIAL_CONTENT)
+                self.assertEqual(body, self.data[start:end + 1])
+                self.assertEqual(
+                    response['Content-Range'], f'bytes {start}-{end}/{size}')
+        response, _ = self.get(self.hashed, HTTP_RANGE=f'bytes={size}-')
+        self.assertEqual(
+            response.status_code, HTTPStatus.REQUESTED_RANGE_NOT_SATISFIABLE)
+        self.assertEqual(response['Content-Range'], f'bytes */{size}')
+        response, body = self.get(
+            self.hashed, HTTP_RANGE='bytes=0-9', HTTP_IF_RANGE='"other"')
+        self.assertEqual(response.status_code, HTTPStatus.OK)
+        self.assertEqual(body, self.data)
+
+    def test_missing_and_outside_files(self):
+        for name in ('posts/missing.jpg', '../settings.py', 'posts'):
+            with self.subTest(name=name):
+                response, _ = self.get(name)
+                self.assertEqual(response.status_code, HTTPStatus.NOT_FOUND)
+
+    def test_head(self):
+        response = self.client.head(f'/media/{self.hashed}')
+        self.assertEqual(response.status_code, HTTPStatus.OK)
+        self.assertEqual(response['Content-Length'], str(len(self.data)))
+        self.assertEqual(response.content, b'')
+
+    def test_sendfile_headers(self):
+        """С прокси файл отдаёт nginx или Apache, тело пустое."""
+        cases = {
+            'X-Accel-Redirect': f'/internal-media/{self.hashed}',
+            'X-Sendfile': os.path.join(self.directory, self.hashed),
+        }
+        for header, value in cases.items():
+            with self.subTest(header=header), override_settings(
+                    MEDIA_SENDFILE_HEADER=header):
+                response, body = self.get(self.hashed)
+                self.assertEqual(response[header], value)
+                self.assertEqual(body, b'')
+                self.assertIn('immutable', response['Cache-Control'])
+
+
+class BenchmarkMediaTests(TestCase):
+    def test_benchmark_compares_views(self):
+        """benchmark_media сравнивает static.serve и core.media.serve."""
+        directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, directory, ignore_errors=True)
+        path = os.path.join(directory, 'results.json')
+        call_command(
+            'benchmark_media', requests=2, output=path, stdout=StringIO())
+        with open(path, encoding='utf-8') as results_file:
+            results = json.load(results_file)['results']
+        self.assertEqual(len(results), 24)
+        self.assertEqual(
+            results['large:range:media:sendfile']['kb_per_request'], 64)
+        self.assertEqual(
+            results['large:range:static:read']['kb_per_request'], 4096)
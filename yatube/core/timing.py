@@ -0,0 +1,130 @@
+import threading
+import time
+from contextlib import ExitStack, contextmanager
+from contextvars import ContextVar
+
+from django.db import connections
+from django.template import TemplateDoesNotExist
+from django.template.backends import django as django_backend
+from sorl.thumbnail.base import ThumbnailBackend as BaseThumbnailBackend
+
+_current = ContextVar('request_timing', default=None)
+
+
+class RequestTiming:
+    """Счётчики одного запроса: SQL, шаблоны, миниатюры.
+
+    SQL считают и потоки ``core.concurrency.gather``, поэтому ``sql`` —
+    сумма времени запросов и может быть больше времени всего запроса.
+    """
+
+    __slots__ = (
+        'started', 'queries', 'sql', 'template', 'thumbnails', 'thumbnail',
+        'lock',
+    )
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.started = time.perf_counter()
+        self.queries = 0
+        self.sql = 0.0
+        self.template = 0.0
+        self.thumbnails = 0
+        self.thumbnail = 0.0
+
+    def execute(self, execute, sql, params, many, context):
+        """Обёртка для ``connection.execute_wrapper``."""
+        started = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            elapsed = time.perf_counter() - started
+            with self.lock:
+                self.sql += elapsed
+                self.queries += 1
+
+    def total(self):
+        return time.perf_counter() - self.started
+
+
+def start():
+    timing = RequestTiming()
+    return timing, _current.set(timing)
+
+
+def finish(token):
+    _current.reset(token)
+
+
+@contextmanager
+def watch_connections():
+    """Считает запросы всех соединений текущего потока в замер запроса.
+
+    Соединения у каждого потока свои: потоки пула, которым передан
+    контекст запроса, тоже должны обернуть свои.
+    """
+    timing = _current.get()
+    with ExitStack() as stack:
+        if timing is not None:
+            for connection in connections.all():
+                stack.enter_context(
+                    connection.execute_wrapper(timing.execute))
+        yield
+
+
+@contextmanager
+def measure(name):
+    """Добавляет длительность блока к полю ``name`` текущего запроса.
+    Вне запроса (команды, фоновые потоки) ничего не делает."""
+    timing = _current.get()
+    if timing is None:
+        yield
+        return
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        setattr(timing, name,
+                getattr(timing, name) + time.perf_counter() - started)
+
+
+@contextmanager
+def measure_thumbnail():
+    """Считает миниатюру текущего запроса и время её получения."""
+    timing = _current.get()
+    if timing is not None:
+        timing.thumbnails += 1
+    with measure('thumbnail'):
+        yield
+
+
+class Template(django_backend.Template):
+    def render(self, context=None, request=None):
+        with measure('template'):
+            return super().render(context, request)
+
+
+class DjangoTemplates(django_backend.DjangoTemplates):
+    """Стандартный бэкенд, который замеряет рендеринг шаблонов.
+
+    Сигнал ``template_rendered`` Django шлёт только в тестах, поэтому
+    время считается в обёртке над ``Template.render``. Вложенные
+    ``{% include %}`` идут мимо бэкенда и не считаются дважды.
+    """
+
+    def from_string(self, template_code):
+        return Template(self.engine.from_string(template_code), self)
+
+    def get_template(self, template_name):
+        try:
+            return Template(self.engine.get_template(template_name), self)
+        except TemplateDoesNotExist as exc:
+            django_backend.reraise(exc, self)
+
+
+class ThumbnailBackend(BaseThumbnailBackend):
+    """Бэкенд sorl-thumbnail, который замеряет получение миниатюр."""
+
+    def get_thumbnail(self, file_, geometry_string, **options):
+        with measure_thumbnail():
+            return super().get_thumbnail(file_, geometry_string, **options)
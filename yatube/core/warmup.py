@@ -0,0 +1,137 @@
+"""Прогрев процесса до первых запросов.
+
+Свежий воркер лениво компилирует шаблоны и собирает URL-резолвер, а
+первый запрос ленты ждёт уменьшения картинок. ``run`` делает это
+заранее: из ``yatube/wsgi.py`` до fork (gunicorn --preload), чтобы
+воркеры получили всё готовым, или командой ``warm_up``.
+"""
+import logging
+import os
+import time
+
+from django.conf import settings
+from django.db import DatabaseError, connections
+from django.template import TemplateSyntaxError, engines
+from django.urls import URLResolver, get_resolver, resolve, reverse
+
+from posts import images, thumbnails
+from posts.models import Post
+
+logger = logging.getLogger(__name__)
+
+# Адреса без параметров, с которых начинается большинство визитов.
+HOT_URLS = (
+    'posts:index',
+    'posts:follow_index',
+    'posts:search',
+    'posts:post_create',
+    'api:posts',
+    'users:login',
+)
+
+
+def template_names(engine):
+    """Имена всех шаблонов из каталогов движка: DIRS и, при APP_DIRS,
+    каталогов приложений."""
+    for directory in engine.template_dirs:
+        for root, _, files in os.walk(directory):
+            for filename in files:
+                path = os.path.join(root, filename)
+                yield os.path.relpath(path, directory).replace(os.sep, '/')
+
+
+def warm_templates():
+    """Компилирует все шаблоны. С кешируемым загрузчиком (TEMPLATES_CACHED)
+    они остаются в памяти процесса; без него прогреваются хотя бы
+    импорты библиотек тегов."""
+    compiled = 0
+    for engine in engines.all():
+        for name in sorted(set(template_names(engine))):
+            try:
+                engine.get_template(name)
+            except (TemplateSyntaxError, UnicodeDecodeError):
+                # Фрагменты, которые не собираются сами по себе, и
+                # нешаблонные файлы в каталогах шаблонов.
+                continue
+            compiled += 1
+    return compiled
+
+
+def compile_patterns(resolver):
+    """Регулярные выражения маршрутов компилируются при первом обращении;
+    возвращает число маршрутов."""
+    count = 0
+    for pattern in resolver.url_patterns:
+        pattern.pattern.regex
+        count += 1
+        if isinstance(pattern, URLResolver):
+            count += compile_patterns(pattern)
+    return count
+
+
+def warm_urls():
+    """Компилирует регулярные выражения всех маршрутов, заполняет
+    словари для reverse и разрешает горячие адреса."""
+    resolver = get_resolver()
+    count = compile_patterns(resolver)
+    for name in HOT_URLS:
+        resolve(reverse(name))
+    return count
+
+
+def warm_thumbnails(limit=None):
+    """Кладёт в кеш posts/resize.py миниатюры свежих постов с картинками,
+    для которых ещё нет вариантов (posts/images.py)."""
+    limit = settings.WARMUP_THUMBNAILS if limit is None else limit
+    names = (
+        Post.objects.exclude(image='').filter(image_variants='')
+        .order_by('-pub_date')
+        .values_list('image', flat=True)[:limit]
+    )
+    return sum(thumbnails.generate(name) for name in names)
+
+
+STEPS = {
+    'templates': warm_templates,
+    'urls': warm_urls,
+    'thumbnails': warm_thumbnails,
+}
+
+
+def run(steps=None):
+    """Выполняет шаги прогрева; возвращает {шаг: (сколько, секунд)}.
+
+    Соединения с базой и пулы обработки картинок закрываются в конце:
+    после fork воркеры не должны делить открытые дескрипторы SQLite и
+    процессы пула.
+    """
+    report = {}
+    try:
+        for name in steps or STEPS:
+            started = time.perf_counter()
+            try:
+                count = STEPS[name]()
+            except DatabaseError:
+                # Например, миграции ещё не применены.
+                logger.exception('Прогрев %s не удался', name)
+                count = None
+            report[name] = (count, time.perf_counter() - started)
+    finally:
+        connections.close_all()
+        images.shutdown()
+    return report
+
+
+def on_start():
+    """Прогрев из yatube/wsgi.py, если включён WARMUP_ON_START."""
+    if not settings.WARMUP_ON_START:
+        return None
+    report = run()
+    logger.info(
+        'Прогрев: %s',
+        ', '.join(
+            f'{name} {count} за {seconds * 1000:.0f} мс'
+            for name, (count, seconds) in report.items()
+        ),
+    )
+    return report
@@ -0,0 +1,84 @@
+"""Счётчики ссылок на файлы картинок.
+
+Хранилище картинок (core/storage.py) называет файлы по хешу, поэтому
+одну картинку могут делить много постов. Сигналы поста увеличивают и
+уменьшают ``MediaBlob.refs``; когда ссылок не остаётся, ``collect``
+после фиксации транзакции удаляет оригинал, варианты и миниатюры.
+"""
+import logging
+
+from django.core.files.storage import default_storage
+from django.db import transaction
+from django.db.models import Count
+
+from . import counters, thumbnails
+from .models import MediaBlob, Post
+
+logger = logging.getLogger(__name__)
+
+
+def acquire(name, content=None):
+    """Добавляет ссылку на файл.
+
+    Хранилище не пишет файл, который уже есть, и между сохранением
+    загрузки и этим вызовом collect мог удалить старую копию. Счётчик
+    увеличивается после того, как collect зафиксировал удаление, поэтому
+    здесь достаточно проверить файл и записать его заново из ``content``.
+    """
+    if not name:
+        return
+    counters.change_blob(name, 1)
+    if content is not None:
+        if Post._meta.get_field('image').storage.restore(name, content):
+            logger.info('Файл %s удалён во время загрузки, записан снова',
+                        name)
+
+
+def release(name, variants=()):
+    """Убирает ссылку на файл; ``variants`` — имена его вариантов, которые
+    нужно удалить вместе с ним."""
+    if not name:
+        return
+    counters.change_blob(name, -1)
+    variants = list(variants)
+    transaction.on_commit(lambda: collect(name, variants))
+
+
+def collect(name, variants=()):
+    """Удаляет файл и производные, если на него больше не ссылаются.
+
+    Возвращает True, если файл удалён. Строка и оригинал удаляются в
+    одной транзакции: acquire того же имени ждёт её фиксации и после неё
+    либо найдёт файл на месте, либо запишет его заново.
+    """
+    storage = Post._meta.get_field('image').storage
+    with transaction.atomic():
+        if not MediaBlob.objects.filter(name=name, refs=0).delete()[0]:
+            return False
+        try:
+            storage.delete(name)
+        except Exception:
+            logger.exception('Не удалось удалить файл %s', name)
+            return False
+    try:
+        thumbnails.delete(name)
+        for variant in variants:
+            default_storage.delete(variant)
+    except Exception:
+        logger.exception('Не удалось удалить производные файла %s', name)
+    return True
+
+
+def reconcile():
+    """Пересчитывает ссылки по постам; возвращает число файлов."""
+    refs = (
+        Post.objects.exclude(image='')
+        .order_by()
+        .values_list('image')
+        .annotate(refs=Count('pk'))
+    )
+    with transaction.atomic():
+        MediaBlob.objects.all().delete()
+        MediaBlob.objects.bulk_create(
+            MediaBlob(name=name, refs=count) for name, count in refs)
+        return MediaBlob.objects.count()
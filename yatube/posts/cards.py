@@ -0,0 +1,34 @@
+"""Кеш HTML карточек постов в лентах.
+
+Карточка (``includes/post_adt.html``) кешируется под ключом
+``post:<id>:<updated>``: правка поста меняет ``updated``, и лента сразу
+берёт новую карточку, а старая просто истекает. Сбрасывать ничего не
+нужно, а страница ленты собирается одним ``get_many``.
+"""
+from django.conf import settings
+from django.core.cache import cache
+from django.template.loader import render_to_string
+from django.utils.safestring import mark_safe
+
+TEMPLATE = 'includes/post_adt.html'
+
+
+def key(post):
+    return f'post:{post.pk}:{post.updated:%Y%m%d%H%M%S%f}'
+
+
+def render(posts):
+    """Пары (пост, HTML карточки); недостающие карточки рендерятся и
+    сохраняются одним ``set_many``."""
+    posts = list(posts)
+    keys = {post.pk: key(post) for post in posts}
+    cached = cache.get_many(keys.values())
+    missing = {}
+    for post in posts:
+        if keys[post.pk] not in cached:
+            missing[keys[post.pk]] = render_to_string(
+                TEMPLATE, {'post': post})
+    if missing:
+        cache.set_many(missing, settings.POST_CARD_CACHE_TIMEOUT)
+        cached.update(missing)
+    return [(post, mark_safe(cached[keys[post.pk]])) for post in posts]
@@ -0,0 +1,147 @@
+"""Валидаторы для условных GET-запросов анонимных пользователей.
+
+Валидаторы считаются без рендеринга шаблона: по номеру поколения ленты
+из кеша (см. ``feed_cache``) и по дате последнего поста или комментария,
+которые берутся из индексов. Счётчики на страницах меняются вместе с
+поколением: подписка сбрасывает ленты обоих пользователей, а страница
+поста зависит и от ленты автора. Авторизованным пользователям страницы
+отдаются целиком: в них есть персональные элементы и CSRF-токен.
+
+Валидаторы читают основную базу; ``feed_reads`` отправляет страницу на
+реплику, только когда та уже должна была получить последние изменения
+ленты, и страница совпадает с валидаторами.
+"""
+import hashlib
+from datetime import datetime, timedelta, timezone
+from functools import wraps
+
+from core.db_router import replica_reads
+from django.conf import settings
+from django.db.models import Max
+from django.views.decorators.http import condition
+
+from . import feed_cache
+from .models import Comment, Group, Post, User
+
+
+def _latest(dates):
+    dates = [date for date in dates if date is not None]
+    return max(dates) if dates else None
+
+
+def _latest_pub_date(posts):
+    return posts.order_by('-pub_date').values_list(
+        'pub_date', flat=True).first()
+
+
+def _feed_scope(kind, kwargs):
+    if kind == 'group':
+        pk = Group.objects.filter(
+            slug=kwargs['slug']).values_list('pk', flat=True).first()
+        return feed_cache.scope_for(kind, pk), Post.objects.filter(group=pk)
+    if kind == 'author':
+        pk = User.objects.filter(
+            username=kwargs['username']).values_list('pk', flat=True).first()
+        return feed_cache.scope_for(kind, pk), Post.objects.filter(author=pk)
+    if kind == 'post':
+        pk = kwargs['post_id']
+        return feed_cache.scope_for(kind, pk), Post.objects.filter(pk=pk)
+    return feed_cache.scope_for(kind), Post.objects.all()
+
+
+def _scopes(request, kind, kwargs):
+    """Ленты, от которых зависит страница, и её посты; считается один раз
+    на запрос."""
+    cached = getattr(request, '_feed_scopes', None)
+    if cached is not None:
+        return cached
+    scope, posts = _feed_scope(kind, kwargs)
+    scopes = [scope]
+    if kind == 'post':
+        # На странице поста есть число постов автора: его меняют посты,
+        # которые сбрасывают ленту автора.
+        author_id = posts.values_list('author_id', flat=True).first()
+        scopes.append(feed_cache.scope_for('author', author_id))
+    request._feed_scopes = scopes, posts
+    return request._feed_scopes
+
+
+def _validators(kind):
+    """Пара функций (etag, last_modified) для ``condition``; результат
+    считается один раз на запрос."""
+
+    def compute(request, **kwargs):
+        if request.user.is_authenticated:
+            return None
+        cached = getattr(request, '_conditional_validators', None)
+        if cached is not None:
+            return cached
+        scopes, posts = _scopes(request, kind, kwargs)
+        dates = [
+            _latest_pub_date(posts),
+            *(feed_cache.changed_at(scope) for scope in scopes),
+        ]
+        if kind == 'post':
+            dates.append(
+                Comment.objects.filter(post=kwargs['post_id']).aggregate(
+                    latest=Max('created'))['latest'])
+        last_modified = _latest(dates)
+        raw = '|'.join(str(part) for part in (
+            *scopes,
+            *(feed_cache.version(scope) for scope in scopes),
+            last_modified and last_modified.isoformat(),
+            request.GET.urlencode(),
+        ))
+        etag = hashlib.md5(raw.encode()).hexdigest()
+        request._conditional_validators = (etag, last_modified)
+        return request._conditional_validators
+
+    def etag(request, *args, **kwargs):
+        validators = compute(request, **kwargs)
+        return validators and validators[0]
+
+    def last_modified(request, *args, **kwargs):
+        validators = compute(request, **kwargs)
+        return validators and validators[1]
+
+    return etag, last_modified
+
+
+def conditional(kind):
+    """Декоратор представления: отвечает 304, если валидатор совпал."""
+    etag, last_modified = _validators(kind)
+    return condition(etag_func=etag, last_modified_func=last_modified)
+
+
+def _recently_changed(scopes):
+    since = datetime.now(timezone.utc) - timedelta(
+        seconds=settings.REPLICA_STICKY_SECONDS)
+    return any(
+        changed is not None and changed > since
+        for changed in map(feed_cache.changed_at, scopes)
+    )
+
+
+def feed_reads(kind):
+    """``replica_reads`` для ленты, которую не меняли последние
+    REPLICA_STICKY_SECONDS.
+
+    Поколение ленты в кеше растёт сразу после записи, а реплика получает
+    её позже. Страница, прочитанная с отставшей реплики, легла бы во
+    фрагмент нового поколения на FEED_CACHE_TIMEOUT, а conditional отдавал
+    бы 304 на устаревшее содержимое. Поэтому свежеизменённую ленту
+    читает основная база, как и того, кто сам в неё писал.
+    """
+    def decorator(view):
+        replica_view = replica_reads(view)
+
+        @wraps(view)
+        def wrapper(request, *args, **kwargs):
+            if not settings.DATABASE_REPLICAS:
+                return view(request, *args, **kwargs)
+            scopes, _ = _scopes(request, kind, kwargs)
+            if _recently_changed(scopes):
+                return view(request, *args, **kwargs)
+            return replica_view(request, *args, **kwargs)
+        return wrapper
+    return decorator
@@ -0,0 +1,114 @@
+from django.db import IntegrityError, transaction
+from django.db.models import Count, F, OuterRef, Subquery
+from django.db.models.functions import Coalesce
+
+from .models import (
+    Comment, Follow, MediaBlob, Post, PostCounter, User, UserCounter,
+)
+
+
+def _increment(model, pk, field, delta):
+    """Атомарно меняет счётчик, создавая строку при первом увеличении."""
+    if delta < 0:
+        # Не уходим ниже нуля, даже если счётчик уже разошёлся с данными:
+        # расхождение поправит reconcile_counters.
+        model.objects.filter(
+            pk=pk, **{f'{field}__gte': -delta},
+        ).update(**{field: F(field) + delta})
+        return
+    if model.objects.filter(pk=pk).update(**{field: F(field) + delta}):
+        return
+    try:
+        with transaction.atomic():
+            model.objects.create(pk=pk, **{field: delta})
+    except IntegrityError:
+        model.objects.filter(pk=pk).update(**{field: F(field) + delta})
+
+
+def change_user(user_id, field, delta):
+    _increment(UserCounter, user_id, field, delta)
+
+
+def change_post(post_id, field, delta):
+    _increment(PostCounter, post_id, field, delta)
+
+
+def change_blob(name, delta):
+    _increment(MediaBlob, name, 'refs', delta)
+
+
+def for_user(user):
+    """Счётчики пользователя; без строки в таблице все они равны нулю."""
+    try:
+        return user.counters
+    except UserCounter.DoesNotExist:
+        return UserCounter(user=user)
+
+
+def for_post(post):
+    try:
+        return post.counters
+    except PostCounter.DoesNotExist:
+        return PostCounter(post=post)
+
+
+def _count(model, field):
+    return Coalesce(
+        Subquery(
+            model.objects.filter(**{field: OuterRef('pk')})
+            .order_by()
+            .values(field)
+            .annotate(total=Count('pk'))
+            .values('total')
+        ),
+        0,
+    )
+
+
+def _reconcile(queryset, counter_model, annotations, batch_size):
+    """Сверяет счётчики пачками по первичному ключу; возвращает число
+    исправленных строк."""
+    fields = list(annotations)
+    fixed = 0
+    last_pk = 0
+    while True:
+        batch = list(
+            queryset.filter(pk__gt=last_pk)
+            .order_by('pk')
+            .annotate(**{f'actual_{name}': expr
+                         for name, expr in annotations.items()})
+            .values('pk', *[f'actual_{name}' for name in fields])
+            [:batch_size]
+        )
+        if not batch:
+            return fixed
+        last_pk = batch[-1]['pk']
+        stored = {
+            row['pk']: row
+            for row in counter_model.objects.filter(
+                pk__in=[row['pk'] for row in batch],
+            ).values('pk', *fields)
+        }
+        for row in batch:
+            actual = {name: row[f'actual_{name}'] for name in fields}
+            current = stored.get(row['pk'])
+            if current is None:
+                if any(actual.values()):
+                    counter_model.objects.create(pk=row['pk'], **actual)
+                    fixed += 1
+            elif any(current[name] != actual[name] for name in fields):
+                counter_model.objects.filter(pk=row['pk']).update(**actual)
+                fixed += 1
+
+
+def reconcile(batch_size=1000):
+    """Исправляет расхождения счётчиков с реальными данными."""
+    with_users = _reconcile(User.objects.all(), UserCounter, {
+        'posts_count': _count(Post, 'author'),
+        'followers_count': _count(Follow, 'author'),
+        'following_count': _count(Follow, 'user'),
+    }, batch_size)
+    with_posts = _reconcile(Post.objects.all(), PostCounter, {
+        'comments_count': _count(Comment, 'post'),
+    }, batch_size)
+    return with_users, with_posts
@@ -0,0 +1,239 @@
+import itertools
+import math
+import os
+import random
+from datetime import datetime, timedelta, timezone
+from io import BytesIO
+
+from django.contrib.auth.hashers import make_password
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from django.db import transaction
+from django.db.models import Max
+from faker import Faker
+from PIL import Image
+
+from .importer import insert_rows
+from .models import Comment, Follow, Group, Post, User
+
+# Размер набора при scale=1; 10 млн постов — это scale=1000.
+PER_SCALE = {
+    'users': 100,
+    'groups': 10,
+    'posts': 10000,
+    'comments': 20000,
+    'follows': 2000,
+}
+# Показатель степенного закона: чем больше, тем сильнее активность
+# сосредоточена у немногих авторов.
+ZIPF_EXPONENT = 1.1
+# Доля постов без группы.
+NO_GROUP_SHARE = 0.3
+# Сколько разных предложений и картинок генерирует Faker/Pillow; тексты
+# постов собираются из них, чтобы не звать Faker на каждую строку.
+SENTENCE_POOL = 5000
+IMAGE_POOL = 20
+END_DATE = datetime(2022, 1, 1, tzinfo=timezone.utc)
+SPAN = timedelta(days=365 * 3)
+
+
+def zipf_weights(count, exponent=ZIPF_EXPONENT):
+    """Накопленные веса ранга по закону Ципфа для random.choices."""
+    return list(itertools.accumulate(
+        1 / rank ** exponent for rank in range(1, count + 1)))
+
+
+def sizes(scale):
+    return {
+        name: max(2, round(count * scale))
+        for name, count in PER_SCALE.items()
+    }
+
+
+class DatasetGenerator:
+    """Детерминированный синтетический набор данных заданного масштаба.
+
+    Все случайные величины берутся из ``random.Random(seed)`` и
+    ``Faker`` с тем же зерном, поэтому один и тот же seed и scale дают
+    одинаковые данные. Строки пишутся через ``bulk_create`` пачками по
+    ``batch_size``, каждая пачка в своей транзакции; в памяти держатся
+    только id пользователей и групп.
+    """
+
+    def __init__(self, scale=1.0, seed=0, batch_size=5000, prefix='user',
+                 image_share=0.0, password=None, end_date=END_DATE):
+        self.sizes = sizes(scale)
+        self.random = random.Random(seed)
+        self.faker = Faker('ru_RU')
+        self.faker.seed_instance(seed)
+        self.batch_size = batch_size
+        self.prefix = prefix
+        self.image_share = image_share
+        self.password = password
+        self.end_date = end_date
+        self.sentences = [
+            self.faker.sentence(nb_words=10) for _ in range(SENTENCE_POOL)]
+
+    def _insert(self, model, objects):
+        """Пишет генератор объектов пачками; возвращает число
+        добавленных строк."""
+        objects = iter(objects)
+        total = 0
+        while True:
+            batch = list(itertools.islice(objects, self.batch_size))
+            if not batch:
+                return total
+            with transaction.atomic():
+                total += insert_rows(model, batch)
+
+    def _text(self, low, high):
+        return ' '.join(
+            self.random.choices(self.sentences, k=self.random.randint(
+                low, high)))
+
+    def users(self):
+        # Один хеш на всех: make_password на каждую строку занял бы часы.
+        password = make_password(self.password)
+        usernames = [
+            f'{self.prefix}{number}' for number in range(self.sizes['users'])]
+        self._insert(User, (
+            User(
+                username=username,
+                first_name=self.faker.first_name(),
+                last_name=self.faker.last_name(),
+                password=password,
+            )
+            for username in usernames
+        ))
+        ids = dict(
+            User.objects.filter(username__in=usernames)
+            .values_list('username', 'id'))
+        # Ранг активности не совпадает с порядком создания.
+        self.user_ids = [ids[username] for username in usernames]
+        self.random.shuffle(self.user_ids)
+        return len(self.user_ids)
+
+    def groups(self):
+        slugs = [
+            f'{self.prefix}-group-{number}'
+            for number in range(self.sizes['groups'])
+        ]
+        self._insert(Group, (
+            Group(
+                title=self.faker.catch_phrase()[:200],
+                slug=slug,
+                description=self._text(1, 3),
+            )
+            for slug in slugs
+        ))
+        ids = dict(
+            Group.objects.filter(slug__in=slugs).values_list('slug', 'id'))
+        self.group_ids = [ids[slug] for slug in slugs]
+        return len(self.group_ids)
+
+    def images(self):
+        """Небольшой набор картинок, на которые ссылаются посты."""
+        if not self.image_share:
+            return []
+        names = []
+        for number in range(IMAGE_POOL):
+            color = tuple(self.random.randrange(256) for _ in range(3))
+            buffer = BytesIO()
+            Image.new('RGB', (960, 540), color).save(buffer, 'JPEG')
+            name = os.path.join('posts', f'{self.prefix}-{number}.jpg')
+            if not default_storage.exists(name):
+                name = default_storage.save(
+                    name, ContentFile(buffer.getvalue()))
+            names.append(name)
+        return names
+
+    def post_date(self, index):
+        """Дата поста по его номеру: посты идут равномерно по времени,
+        поэтому id растёт вместе с датой, как в живой базе."""
+        return (
+            self.end_date - SPAN
+            + SPAN * (index / self.sizes['posts'])
+        )
+
+    def posts(self):
+        count = self.sizes['posts']
+        author_weights = zipf_weights(len(self.user_ids))
+        group_weights = zipf_weights(len(self.group_ids))
+        images = self.images()
+        self.first_post_id = (
+            Post.objects.aggregate(last=Max('id'))['last'] or 0) + 1
+
+        def generate():
+            for index in range(count):
+                group_id = None
+                if self.random.random() >= NO_GROUP_SHARE:
+                    group_id = self.random.choices(
+                        self.group_ids, cum_weights=group_weights)[0]
+                image = ''
+                if images and self.random.random() < self.image_share:
+                    image = self.random.choice(images)
+                yield Post(
+                    # id задаём сами: SQLite не возвращает их из bulk_create,
+                    # а комментариям нужно на что-то ссылаться.
+                    id=self.first_post_id + index,
+                    text=self._text(1, 8),
+                    pub_date=self.post_date(index),
+                    author_id=self.random.choices(
+                        self.user_ids, cum_weights=author_weights)[0],
+                    group_id=group_id,
+                    image=image,
+                )
+        return self._insert(Post, generate())
+
+    def comments(self):
+        count = self.sizes['posts']
+        # Обсуждают в основном немногие посты. Ранг берётся из
+        # лог-равномерного распределения (закон Ципфа с показателем 1), а
+        # умножение по модулю на взаимно простое число перемешивает ранги
+        # без списка на все посты.
+        step = 1_000_003
+        while math.gcd(step, count) != 1:
+            step += 2
+
+        def generate():
+            for _ in range(self.sizes['comments']):
+                rank = int(count ** self.random.random()) - 1
+                index = rank * step % count
+                yield Comment(
+                    post_id=self.first_post_id + index,
+                    author_id=self.random.choice(self.user_ids),
+                    text=self._text(1, 3),
+                    created=self.post_date(index) + timedelta(
+                        minutes=self.random.randint(1, 60 * 24 * 3)),
+                )
+        return self._insert(Comment, generate())
+
+    def follows(self):
+        """Подписчики выбираются равномерно, а авторы — по степенному
+        закону, как популярность в соцсетях. Повторы отбрасывает
+        unique_follow."""
+        weights = zipf_weights(len(self.user_ids))
+
+        def generate():
+            for _ in range(self.sizes['follows']):
+                user_id = self.random.choice(self.user_ids)
+                author_id = self.random.choices(
+                    self.user_ids, cum_weights=weights)[0]
+                if user_id != author_id:
+                    yield Follow(user_id=user_id, author_id=author_id)
+        return self._insert(Follow, generate())
+
+    def run(self, progress=None):
+        """Создаёт весь набор; progress(stage, rows) вызывается после
+        каждого этапа."""
+        stages = (
+            ('users', self.users),
+            ('groups', self.groups),
+            ('posts', self.posts),
+            ('comments', self.comments),
+            ('follows', self.follows),
+        )
+        for stage, create in stages:
+            rows = create()
+            if progress is not None:
+                progress(stage, rows)
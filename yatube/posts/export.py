@@ -0,0 +1,78 @@
+import csv
+import json
+
+from django.conf import settings
+from django.core.serializers.json import DjangoJSONEncoder
+
+# Колонки выгрузки: имя в файле -> поле для values()
+FIELDS = {
+    'id': 'id',
+    'pub_date': 'pub_date',
+    'group': 'group__slug',
+    'text': 'text',
+    'image': 'image',
+}
+
+CONTENT_TYPES = {
+    'csv': 'text/csv; charset=utf-8',
+    'jsonl': 'application/x-ndjson; charset=utf-8',
+}
+
+
+class Echo:
+    """Файл для csv.writer, который просто возвращает записанную строку."""
+
+    def write(self, value):
+        return value
+
+
+def rows(author):
+    """Посты автора словарями, без загрузки всех строк в память.
+
+    ``iterator`` читает курсор кусками по ``POSTS_EXPORT_CHUNK_SIZE`` и не
+    наполняет кеш queryset, а ``values`` не создаёт экземпляры моделей.
+    """
+    posts = author.posts.order_by('-pub_date', '-id').values(
+        *FIELDS.values())
+    for row in posts.iterator(chunk_size=settings.POSTS_EXPORT_CHUNK_SIZE):
+        yield {name: row[field] for name, field in FIELDS.items()}
+
+
+def as_csv(author):
+    writer = csv.writer(Echo())
+    # Заголовок уходит клиенту раньше, чем выполнится первый запрос.
+    yield writer.writerow(FIELDS)
+    for row in rows(author):
+        row['pub_date'] = row['pub_date'].isoformat()
+        yield writer.writerow(row.values())
+
+
+def as_jsonl(author):
+    for row in rows(author):
+        yield json.dumps(row, cls=DjangoJSONEncoder, ensure_ascii=False) + '\n'
+
+
+FORMATS = {
+    'csv': as_csv,
+    'jsonl': as_jsonl,
+}
+
+BUFFER_SIZE = 64 * 1024
+
+
+def stream(format, author):
+    """Склеивает строки в куски по ``BUFFER_SIZE``, чтобы сервер не делал
+    отдельную запись в сокет на каждый пост. Первая строка отдаётся сразу."""
+    lines = FORMATS[format](author)
+    for line in lines:
+        yield line
+        break
+    buffer, size = [], 0
+    for line in lines:
+        buffer.append(line)
+        size += len(line)
+        if size >= BUFFER_SIZE:
+            yield ''.join(buffer)
+            buffer, size = [], 0
+    if buffer:
+        yield ''.join(buffer)
@@ -0,0 +1,66 @@
+from datetime import datetime, timezone
+
+from django.conf import settings
+from django.core.cache import cache
+
+VERSION_KEY = 'posts:feed_version:{scope}'
+CHANGED_KEY = 'posts:feed_changed:{scope}'
+
+
+def scope_for(kind, pk=None):
+    return kind if pk is None else f'{kind}:{pk}'
+
+
+def version(scope):
+    """Текущее поколение кеша ленты; новое поколение делает старые
+    фрагменты недостижимыми без перебора ключей."""
+    key = VERSION_KEY.format(scope=scope)
+    current = cache.get(key)
+    if current is None:
+        cache.add(key, 1, None)
+        current = cache.get(key, 1)
+    return current
+
+
+def bump(scope):
+    key = VERSION_KEY.format(scope=scope)
+    try:
+        cache.incr(key)
+    except ValueError:
+        cache.add(key, 1, None)
+    cache.set(
+        CHANGED_KEY.format(scope=scope),
+        datetime.now(timezone.utc).timestamp(),
+        None,
+    )
+
+
+def changed_at(scope):
+    """Когда ленту меняли в последний раз (правка, удаление, комментарий)."""
+    timestamp = cache.get(CHANGED_KEY.format(scope=scope))
+    if timestamp is None:
+        return None
+    return datetime.fromtimestamp(timestamp, timezone.utc)
+
+
+def bump_for_post(post, old_group_id=None):
+    """Сбрасывает ленты, в которых показывается пост."""
+    bump(scope_for('index'))
+    bump(scope_for('author', post.author_id))
+    bump(scope_for('post', post.pk))
+    for group_id in {post.group_id, old_group_id} - {None}:
+        bump(scope_for('group', group_id))
+
+
+def page_key(request):
+    """Часть ключа, различающая страницы одной ленты."""
+    return request.GET.get('cursor') or request.GET.get('page') or '1'
+
+
+def context(request, kind, pk=None):
+    """Переменные для тега {% cache %} в шаблоне ленты."""
+    return {
+        'feed_timeout': settings.FEED_CACHE_TIMEOUT,
+        'feed_version': version(scope_for(kind, pk)),
+        'feed_page': page_key(request),
+    }
@@ -0,0 +1,162 @@
+import json
+import logging
+import multiprocessing
+import os
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+
+from django.conf import settings
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from django.db import close_old_connections, transaction
+from django.utils import timezone
+
+from . import feed_cache
+from .imaging import render_variants
+from .models import Post
+
+logger = logging.getLogger(__name__)
+
+VARIANTS_DIR = 'posts/variants'
+FIELDS = ('image_width', 'image_height', 'image_variants')
+CACHED_PROPERTIES = ('variants', 'image_srcset', 'image_src')
+
+_processes = None
+_threads = None
+
+
+def processes():
+    """Процессы, в которых декодируются и сжимаются картинки: работа
+    с пикселями держит GIL, и в потоках она бы не распараллелилась.
+    spawn, а не fork: форк процесса с потоками и открытыми соединениями
+    с базой небезопасен."""
+    global _processes
+    if _processes is None:
+        _processes = ProcessPoolExecutor(
+            max_workers=settings.POST_IMAGE_PROCESSES,
+            mp_context=multiprocessing.get_context('spawn'),
+        )
+    return _processes
+
+
+def threads():
+    """Потоки, которые ждут процессы и записывают результат в базу."""
+    global _threads
+    if _threads is None:
+        _threads = ThreadPoolExecutor(
+            max_workers=max(1, settings.POST_IMAGE_PROCESSES),
+            thread_name_prefix='images',
+        )
+    return _threads
+
+
+def shutdown():
+    """Останавливает пулы; следующая задача создаст их заново."""
+    global _processes, _threads
+    if _processes is not None:
+        _processes.shutdown()
+        _processes = None
+    if _threads is not None:
+        _threads.shutdown()
+        _threads = None
+
+
+def variant_name(name, width, format):
+    stem = os.path.splitext(os.path.basename(name))[0]
+    extension = 'jpg' if format == 'jpeg' else format
+    return f'{VARIANTS_DIR}/{stem}-{width}w.{extension}'
+
+
+def run(func, *args):
+    """Выполняет функцию из imaging.py в пуле процессов или, если
+    POST_IMAGE_PROCESSES = 0, в текущем потоке."""
+    if settings.POST_IMAGE_PROCESSES:
+        return processes().submit(func, *args).result()
+    return func(*args)
+
+
+def render(path):
+    return run(
+        render_variants,
+        path,
+        settings.POST_IMAGE_WIDTHS,
+        settings.POST_IMAGE_FORMATS,
+        settings.POST_IMAGE_QUALITY,
+    )
+
+
+def process(name):
+    """Готовит варианты файла и записывает их во все посты с этим файлом.
+
+    Возвращает число вариантов; 0, если файла нет или он не читается.
+    ``updated`` меняется, чтобы карточки постов (cards.py) перерисовались.
+    """
+    storage = Post._meta.get_field('image').storage
+    if not storage.exists(name):
+        return 0
+    try:
+        width, height, rendered = render(storage.path(name))
+    except Exception:
+        logger.exception('Не удалось обработать картинку %s', name)
+        return 0
+    variants = []
+    # Варианты лежат в обычном хранилище под именами от хеша оригинала:
+    # их удаляет blobs.collect вместе с оригиналом.
+    for variant_width, variant_height, format, data in rendered:
+        target = variant_name(name, variant_width, format)
+        if default_storage.exists(target):
+            default_storage.delete(target)
+        variants.append({
+            'width': variant_width,
+            'height': variant_height,
+            'format': format,
+            'name': default_storage.save(target, ContentFile(data)),
+        })
+    close_old_connections()
+    try:
+        Post.objects.filter(image=name).update(
+            image_width=width,
+            image_height=height,
+            image_variants=json.dumps(variants),
+            updated=timezone.now(),
+        )
+    finally:
+        close_old_connections()
+    return len(variants)
+
+
+def process_post(post):
+    if process(post.image.name):
+        feed_cache.bump_for_post(post)
+
+
+def share(post):
+    """Берёт готовые варианты у другого поста с тем же файлом: хранилище
+    называет файлы по хешу, и повторная загрузка не обрабатывается заново.
+    Возвращает True, если варианты нашлись."""
+    if not post.image:
+        return False
+    processed = (
+        Post.objects.filter(image=post.image.name)
+        .exclude(pk=post.pk)
+        .exclude(image_variants='')
+        .values(*FIELDS)
+        .first()
+    )
+    if processed is None:
+        return False
+    Post.objects.filter(pk=post.pk).update(**processed)
+    for name, value in processed.items():
+        setattr(post, name, value)
+    for name in CACHED_PROPERTIES:
+        post.__dict__.pop(name, None)
+    return True
+
+
+def schedule(post):
+    """Ставит обработку картинки в пул после фиксации транзакции."""
+    if not post.image:
+        return
+    # Ответ обработки не ждёт: пул доделывает задачи в фоне, а при выходе
+    # процесса concurrent.futures дожидается поставленных задач. Картинки,
+    # оставшиеся без вариантов после сбоя, дообрабатывает process_images.
+    transaction.on_commit(lambda: threads().submit(process_post, post))
@@ -0,0 +1,122 @@
+"""Варианты картинки поста разной ширины.
+
+Модуль не импортирует Django: функции выполняются в отдельных процессах
+(см. images.py), которые запускаются через spawn и не настраивают
+проект.
+"""
+import os
+from io import BytesIO
+
+from PIL import Image, ImageOps
+
+# Значения тега Orientation, при которых картинка повёрнута на 90°.
+ROTATED = {5, 6, 7, 8}
+ORIENTATION_TAG = 0x0112
+SAVE_OPTIONS = {
+    'webp': {'format': 'WEBP', 'method': 4},
+    'jpeg': {'format': 'JPEG', 'optimize': True, 'progressive': True},
+}
+
+
+def target_widths(width, widths):
+    """Ширины вариантов: все из настроек, что меньше исходной, и сама
+    исходная, если она меньше самой большой. Картинки не растягиваются."""
+    targets = {target for target in widths if target < width}
+    if width <= max(widths):
+        targets.add(width)
+    return sorted(targets)
+
+
+def encodable(formats):
+    """Форматы, которые умеет записывать установленный Pillow: без
+    libwebp остаются только JPEG-варианты."""
+    Image.init()
+    return [
+        name for name in formats
+        if SAVE_OPTIONS[name]['format'] in Image.SAVE
+    ]
+
+
+def flatten(image):
+    """RGB на белом фоне: в JPEG нет прозрачности."""
+    if image.mode != 'RGBA':
+        return image
+    background = Image.new('RGB', image.size, 'white')
+    background.paste(image, mask=image.getchannel('A'))
+    return background
+
+
+def normalized(source):
+    """Картинка с применённой ориентацией в RGB или RGBA."""
+    image = ImageOps.exif_transpose(source)
+    if image.mode not in ('RGB', 'RGBA'):
+        transparent = (image.mode in ('LA', 'PA')
+                       or 'transparency' in image.info)
+        image = image.convert('RGBA' if transparent else 'RGB')
+    return image
+
+
+def render_variants(path, widths, formats, quality):
+    """Декодирует файл один раз и готовит варианты.
+
+    Ориентация из EXIF применяется к пикселям, метаданные в варианты не
+    попадают. Возвращает (ширина, высота, [(ширина, высота, формат,
+    байты), ...]) с размерами уже повёрнутой картинки.
+    """
+    with Image.open(path) as source:
+        rotated = source.getexif().get(ORIENTATION_TAG, 1) in ROTATED
+        width, height = source.size
+        if rotated:
+            width, height = height, width
+        targets = target_widths(width, widths)
+        # JPEG можно декодировать сразу в уменьшенном масштабе (1/2, 1/4,
+        # 1/8), если он всё ещё не меньше самого большого варианта.
+        largest = max(targets)
+        scale = largest / width
+        draft = (round(source.width * scale), round(source.height * scale))
+        source.draft('RGB', draft)
+        image = normalized(source)
+        formats = encodable(formats)
+        rendered = []
+        for target in targets:
+            size = (target, max(1, round(height * target / width)))
+            resized = image.resize(
+                size, Image.LANCZOS, reducing_gap=3.0)
+            for name in formats:
+                variant = flatten(resized) if name == 'jpeg' else resized
+                buffer = BytesIO()
+                variant.save(buffer, quality=quality, **SAVE_OPTIONS[name])
+                rendered.append((*size, name, buffer.getvalue()))
+    return width, height, rendered
+
+
+def render_fit(path, width, height, quality):
+    """Картинка ровно width×height: масштаб по меньшей стороне и обрезка
+    по центру, как у миниатюр sorl с crop="center" и upscale. Формат —
+    по расширению файла, для неизвестных — JPEG."""
+    Image.init()
+    extension = os.path.splitext(path)[1].lower()
+    format = Image.registered_extensions().get(extension, 'JPEG')
+    if format not in Image.SAVE:
+        format = 'JPEG'
+    with Image.open(path) as source:
+        rotated = source.getexif().get(ORIENTATION_TAG, 1) in ROTATED
+        source_width, source_height = source.size
+        if rotated:
+            source_width, source_height = source_height, source_width
+        scale = max(width / source_width, height / source_height)
+        if scale < 1:
+            source.draft('RGB', (
+                round(source.width * scale), round(source.height * scale)))
+        image = ImageOps.fit(
+            normalized(source), (width, height), Image.LANCZOS)
+        if format == 'JPEG':
+            image = flatten(image)
+        options = next(
+            (options for options in SAVE_OPTIONS.values()
+             if options['format'] == format),
+            {'format': format},
+        )
+        buffer = BytesIO()
+        image.save(buffer, quality=quality, **options)
+    return buffer.getvalue()
@@ -0,0 +1,115 @@
+import json
+import os
+import posixpath
+import time
+from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor
+
+from django.core.exceptions import SuspiciousFileOperation
+from django.core.files.storage import default_storage
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+
+from core.storage import content_hash, hashed_name
+from posts import blobs, feed_cache, thumbnails
+from posts.images import FIELDS
+from posts.models import Post
+
+
+def digest(storage, name):
+    """Хеш файла или None, если файла нет в хранилище."""
+    try:
+        with storage.open(name) as file:
+            return content_hash(file)
+    except (FileNotFoundError, SuspiciousFileOperation):
+        return None
+
+
+class Command(BaseCommand):
+    help = (
+        'Переименовывает картинки постов по хешу содержимого: одинаковые '
+        'файлы сливаются в один, посты переводятся на него, счётчики '
+        'ссылок пересчитываются.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--workers', type=int, default=None,
+            help='Потоков для хеширования; hashlib отпускает GIL, поэтому '
+                 'потоки читают и хешируют файлы параллельно.',
+        )
+        parser.add_argument(
+            '--dry-run', action='store_true',
+            help='Только посчитать дубликаты, ничего не меняя.',
+        )
+
+    def handle(self, *args, **options):
+        field = Post._meta.get_field('image')
+        storage = field.storage
+        names = list(
+            Post.objects.exclude(image='')
+            .order_by('image')
+            .values_list('image', flat=True)
+            .distinct()
+        )
+        started = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=options['workers']) as pool:
+            digests = pool.map(lambda name: digest(storage, name), names)
+            groups = defaultdict(list)
+            for name, value in zip(names, digests):
+                if value is not None:
+                    target = hashed_name(
+                        posixpath.join(field.upload_to,
+                                       posixpath.basename(name)),
+                        value,
+                    )
+                    groups[target].append(name)
+        changed = {
+            target: sources for target, sources in groups.items()
+            if sources != [target]
+        }
+        duplicates = sum(len(sources) - 1 for sources in changed.values())
+        freed = 0
+        if not options['dry_run']:
+            for target, sources in changed.items():
+                freed += self.merge(storage, target, sources)
+            blobs.reconcile()
+            for post in Post.objects.filter(image__in=changed).only(
+                    'author_id', 'group_id', 'image'):
+                feed_cache.bump_for_post(post)
+        elapsed = time.perf_counter() - started
+        self.stdout.write(self.style.SUCCESS(
+            f'Файлов: {len(names)}, переименовано: {len(changed)}, '
+            f'дубликатов: {duplicates}, освобождено: {freed // 1024} КБ, '
+            f'время: {elapsed:.1f} с'))
+
+    def merge(self, storage, target, sources):
+        """Оставляет один файл под именем ``target`` и переводит на него
+        посты; возвращает, сколько байт занимали удалённые копии."""
+        posts = Post.objects.filter(image__in=sources)
+        kept = posts.exclude(image_variants='').values(*FIELDS).first() or {
+            'image_width': None, 'image_height': None, 'image_variants': '',
+        }
+        keep = {v['name'] for v in json.loads(kept['image_variants'] or '[]')}
+        dropped = {
+            variant['name']
+            for value in posts.exclude(image_variants='').values_list(
+                'image_variants', flat=True).distinct()
+            for variant in json.loads(value)
+        } - keep
+        posts.update(image=target, updated=timezone.now(), **kept)
+        freed = 0
+        if not storage.exists(target):
+            path = storage.path(target)
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            os.replace(storage.path(sources[0]), path)
+        for source in sources:
+            if source == target:
+                continue
+            thumbnails.delete(source)
+            if storage.exists(source):
+                freed += storage.size(source)
+                storage.delete(source)
+        for name in dropped:
+            default_storage.delete(name)
+        return freed
@@ -0,0 +1,39 @@
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from posts import thumbnails
+from posts.models import Post
+
+
+class Command(BaseCommand):
+    help = (
+        'Заранее готовит миниатюры POST_THUMBNAIL_SIZES для картинок '
+        'постов без вариантов.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--workers', type=int, default=None,
+            help='Число потоков; картинки уменьшаются в пуле процессов '
+                 'POST_IMAGE_PROCESSES, потоки только ждут его.',
+        )
+
+    def handle(self, *args, **options):
+        names = list(
+            Post.objects.exclude(image='')
+            .filter(image_variants='')
+            .order_by()
+            .values_list('image', flat=True)
+            .distinct()
+        )
+        started = time.perf_counter()
+        workers = options['workers'] or max(1, settings.POST_IMAGE_PROCESSES)
+        with ThreadPoolExecutor(max_workers=workers) as pool:
+            created = sum(pool.map(thumbnails.generate, names))
+        elapsed = time.perf_counter() - started
+        self.stdout.write(self.style.SUCCESS(
+            f'Картинок: {len(names)}, миниатюр: {created}, '
+            f'время: {elapsed:.1f} с'))
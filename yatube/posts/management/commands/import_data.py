@@ -0,0 +1,67 @@
+import sys
+import time
+
+from core.benchmark import peak_memory_mb
+from django.core.management.base import BaseCommand, CommandError
+
+from posts.importer import KINDS, Importer, InvalidInput, read_rows
+
+
+class Command(BaseCommand):
+    help = (
+        'Массово импортирует посты, комментарии или подписки из JSONL/CSV. '
+        'Авторы и подписчики задаются username, группы — slug, комментарии '
+        'ссылаются на id поста.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('kind', choices=KINDS)
+        parser.add_argument('path', help='Файл или «-» для stdin.')
+        parser.add_argument(
+            '--format', choices=('jsonl', 'csv'), default=None,
+            help='По умолчанию определяется по расширению файла.',
+        )
+        parser.add_argument(
+            '--batch-size', type=int, default=1000,
+            help='Сколько строк вставлять одним bulk_create.',
+        )
+        parser.add_argument(
+            '--skip-rebuild', action='store_true',
+            help='Не пересобирать ленты и счётчики (если файлов несколько, '
+                 'достаточно сделать это после последнего).',
+        )
+
+    def handle(self, *args, **options):
+        path = options['path']
+        format = options['format'] or (
+            'csv' if path.endswith('.csv') else 'jsonl')
+        importer = Importer(options['batch_size'])
+        started = time.perf_counter()
+
+        def progress(importer):
+            if options['verbosity'] > 1:
+                elapsed = time.perf_counter() - started
+                self.stdout.write(
+                    f'{importer.processed} строк, '
+                    f'{importer.processed / elapsed:.0f} строк/с')
+
+        stream = (
+            sys.stdin if path == '-'
+            else open(path, encoding='utf-8', newline='')
+        )
+        try:
+            importer.run(options['kind'], read_rows(stream, format), progress)
+        except InvalidInput as error:
+            raise CommandError(error)
+        finally:
+            if stream is not sys.stdin:
+                stream.close()
+        elapsed = time.perf_counter() - started
+        importer.finish(rebuild=not options['skip_rebuild'])
+        rate = importer.processed / elapsed if elapsed else 0.0
+        self.stdout.write(self.style.SUCCESS(
+            f'Импортировано: {importer.processed}, '
+            f'пропущено: {importer.skipped}, '
+            f'{rate:.0f} строк/с, '
+            f'пик памяти: {peak_memory_mb():.1f} МБ, '
+            f'всего: {time.perf_counter() - started:.1f} с'))
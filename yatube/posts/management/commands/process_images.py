@@ -0,0 +1,39 @@
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from posts import feed_cache, images
+from posts.models import Post
+
+
+class Command(BaseCommand):
+    help = (
+        'Готовит варианты (WebP и JPEG нескольких ширин) для картинок '
+        'постов, у которых их ещё нет.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--all', action='store_true',
+            help='Пересоздать варианты и для уже обработанных постов.',
+        )
+
+    def handle(self, *args, **options):
+        posts = Post.objects.exclude(image='')
+        if not options['all']:
+            posts = posts.filter(image_variants='')
+        names = list(
+            posts.order_by().values_list('image', flat=True).distinct())
+        started = time.perf_counter()
+        # Потоки только ждут пул процессов images.processes(); сжатие идёт
+        # в POST_IMAGE_PROCESSES процессах.
+        created = sum(images.threads().map(images.process, names))
+        for post in Post.objects.filter(image__in=names).only(
+                'author_id', 'group_id', 'image'):
+            feed_cache.bump_for_post(post)
+        elapsed = time.perf_counter() - started
+        self.stdout.write(self.style.SUCCESS(
+            f'Картинок: {len(names)}, вариантов: {created}, '
+            f'процессов: {settings.POST_IMAGE_PROCESSES}, '
+            f'время: {elapsed:.1f} с'))
@@ -0,0 +1,18 @@
+from django.core.management.base import BaseCommand
+
+from posts import timeline
+
+
+class Command(BaseCommand):
+    help = 'Пересобирает материализованные ленты подписок.'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--user', type=int, action='append', dest='users',
+            help='id пользователя; по умолчанию пересобираются все ленты.',
+        )
+
+    def handle(self, *args, **options):
+        follows = timeline.rebuild(options['users'])
+        self.stdout.write(self.style.SUCCESS(
+            f'Ленты пересобраны, обработано подписок: {follows}'))
@@ -0,0 +1,18 @@
+from django.core.management.base import BaseCommand
+
+from posts import counters
+
+
+class Command(BaseCommand):
+    help = 'Сверяет денормализованные счётчики с данными и чинит расхождения.'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--batch-size', type=int, default=1000,
+            help='Сколько строк проверять за один запрос.',
+        )
+
+    def handle(self, *args, **options):
+        users, posts = counters.reconcile(options['batch_size'])
+        self.stdout.write(self.style.SUCCESS(
+            f'Исправлено счётчиков: пользователей {users}, постов {posts}'))
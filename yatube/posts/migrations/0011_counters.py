@@ -0,0 +1,79 @@
+# Generated by Django 2.2.16 on 2026-10-17 06:01
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+from django.db.models import Count
+
+
+def fill_counters(apps, schema_editor):
+    Comment = apps.get_model('posts', 'Comment')
+    Follow = apps.get_model('posts', 'Follow')
+    Post = apps.get_model('posts', 'Post')
+    PostCounter = apps.get_model('posts', 'PostCounter')
+    UserCounter = apps.get_model('posts', 'UserCounter')
+
+    def totals(model, field):
+        return dict(
+            model.objects.order_by().values_list(field)
+            .annotate(total=Count('pk'))
+        )
+
+    posts = totals(Post, 'author')
+    followers = totals(Follow, 'author')
+    following = totals(Follow, 'user')
+    UserCounter.objects.bulk_create(
+        [
+            UserCounter(
+                user_id=user_id,
+                posts_count=posts.get(user_id, 0),
+                followers_count=followers.get(user_id, 0),
+                following_count=following.get(user_id, 0),
+            )
+            for user_id in set(posts) | set(followers) | set(following)
+        ],
+        batch_size=1000,
+    )
+    PostCounter.objects.bulk_create(
+        [
+            PostCounter(post_id=post_id, comments_count=total)
+            for post_id, total in totals(Comment, 'post').items()
+        ],
+        batch_size=1000,
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('auth', '0011_update_proxy_permissions'),
+        ('posts', '0010_timelineentry'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='PostCounter',
+            fields=[
+                ('post', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='counters', serialize=False, to='posts.Post')),
+                ('comments_count', models.PositiveIntegerField(default=0)),
+            ],
+            options={
+                'verbose_name': 'Счётчики поста',
+                'verbose_name_plural': 'Счётчики постов',
+            },
+        ),
+        migrations.CreateModel(
+            name='UserCounter',
+            fields=[
+                ('user', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='counters', serialize=False, to=settings.AUTH_USER_MODEL)),
+                ('posts_count', models.PositiveIntegerField(default=0)),
+                ('followers_count', models.PositiveIntegerField(default=0)),
+                ('following_count', models.PositiveIntegerField(default=0)),
+            ],
+            options={
+                'verbose_name': 'Счётчики пользователя',
+                'verbose_name_plural': 'Счётчики пользователей',
+            },
+        ),
+        migrations.RunPython(fill_counters, migrations.RunPython.noop),
+    ]
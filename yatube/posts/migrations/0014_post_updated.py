@@ -0,0 +1,30 @@
+from django.db import migrations, models
+from django.utils import timezone
+
+
+def install_search(apps, schema_editor):
+    # SQLite пересоздаёт posts_post при добавлении поля, и триггеры
+    # полнотекстового индекса пропадают вместе со старой таблицей.
+    from posts import search
+    search.install(schema_editor.connection)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('posts', '0013_post_search'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='post',
+            name='updated',
+            field=models.DateTimeField(auto_now=True, default=timezone.now, verbose_name='Дата изменения'),
+            preserve_default=False,
+        ),
+        migrations.RunSQL(
+            'UPDATE posts_post SET updated = pub_date',
+            migrations.RunSQL.noop,
+        ),
+        migrations.RunPython(install_search, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,51 @@
+# Generated by Django 2.2.16 on 2026-10-17 06:51
+
+import core.storage
+from django.db import migrations, models
+from django.db.models import Count
+
+
+def count_refs(apps, schema_editor):
+    Post = apps.get_model('posts', 'Post')
+    MediaBlob = apps.get_model('posts', 'MediaBlob')
+    refs = (
+        Post.objects.exclude(image='')
+        .order_by()
+        .values_list('image')
+        .annotate(refs=Count('pk'))
+    )
+    MediaBlob.objects.bulk_create(
+        MediaBlob(name=name, refs=count) for name, count in refs)
+
+
+def install_search(apps, schema_editor):
+    from posts import search
+    search.install(schema_editor.connection)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('posts', '0015_post_image_variants'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='MediaBlob',
+            fields=[
+                ('name', models.CharField(max_length=100, primary_key=True, serialize=False)),
+                ('refs', models.PositiveIntegerField(default=0)),
+            ],
+            options={
+                'verbose_name': 'Файл',
+                'verbose_name_plural': 'Файлы',
+            },
+        ),
+        migrations.AlterField(
+            model_name='post',
+            name='image',
+            field=models.ImageField(blank=True, storage=core.storage.ContentAddressedStorage(), upload_to='posts/', verbose_name='Картинка'),
+        ),
+        migrations.RunPython(count_refs, migrations.RunPython.noop),
+        migrations.RunPython(install_search, migrations.RunPython.noop),
+    ]
@@ -1,5 +1,10 @@
+import json
+
+from core.storage import ContentAddressedStorage
 from django.contrib.auth import get_user_model
+from django.core.files.storage import default_storage
 from django.db import models
+from django.utils.functional import cached_property
 
 User = get_user_model()
 
@@ -12,6 +17,12 @@ class Post(models.Model):
         auto_now_add=True,
         verbose_name='Дата публикации',
     )
+    # Версия поста для кеша карточек (см. cards.py): меняется при каждом
+    # save(), но не при QuerySet.update().
+    updated = models.DateTimeField(
+        auto_now=True,
+        verbose_name='Дата изменения',
+    )
     author = models.ForeignKey(
         User,
         on_delete=models.CASCADE,
@@ -30,12 +41,64 @@ class Post(models.Model):
     image = models.ImageField(
         'Картинка',
         upload_to='posts/',
-        blank=True
+        blank=True,
+        storage=ContentAddressedStorage(),
     )
+    # Заполняются конвейером images.py: размеры с учётом ориентации и
+    # JSON-список вариантов {"width", "height", "format", "name"}.
+    image_width = models.PositiveIntegerField(
+        null=True, blank=True, editable=False)
+    image_height = models.PositiveIntegerField(
+        null=True, blank=True, editable=False)
+    image_variants = models.TextField(blank=True, editable=False)
+
+    class Meta:
+        indexes = [
+            models.Index(
+                fields=['author', '-pub_date', '-id'],
+                name='post_author_pub_date_idx',
+            ),
+            models.Index(
+                fields=['group', '-pub_date', '-id'],
+                name='post_group_pub_date_idx',
+            ),
+            models.Index(
+                fields=['-pub_date', '-id'],
+                name='post_pub_date_idx',
+            ),
+        ]
 
     def __str__(self):
         return self.text[:15]
 
+    @cached_property
+    def variants(self):
+        if not self.image_variants:
+            return []
+        try:
+            return json.loads(self.image_variants)
+        except ValueError:
+            # Например, поле заполнили фикстурой, а не через images.py.
+            return []
+
+    @cached_property
+    def image_srcset(self):
+        """srcset по форматам: {'webp': 'url 320w, url 640w', ...}."""
+        srcset = {}
+        for variant in self.variants:
+            url = default_storage.url(variant['name'])
+            srcset.setdefault(variant['format'], []).append(
+                f'{url} {variant["width"]}w')
+        return {name: ', '.join(urls) for name, urls in srcset.items()}
+
+    @cached_property
+    def image_src(self):
+        """Самый большой JPEG для браузеров без srcset."""
+        jpegs = [v for v in self.variants if v['format'] == 'jpeg']
+        if not jpegs:
+            return None
+        return default_storage.url(jpegs[-1]['name'])
+
 
 class Group(models.Model):
     title = models.CharField(max_length=200)
@@ -66,6 +129,14 @@ class Comment(models.Model):
         verbose_name='Дата публикации комментария',
     )
 
+    class Meta:
+        indexes = [
+            models.Index(
+                fields=['post', 'created'],
+                name='comment_post_created_idx',
+            ),
+        ]
+
     def __str__(self):
         return self.text[:15]
 
@@ -91,3 +162,92 @@ class Follow(models.Model):
                 name='unique_follow',
             )
         ]
+
+
+class TimelineEntry(models.Model):
+    """Материализованная лента подписок: пост в «ящике» подписчика."""
+    user = models.ForeignKey(
+        User,
+        on_delete=models.CASCADE,
+        related_name='timeline',
+    )
+    post = models.ForeignKey(
+        Post,
+        on_delete=models.CASCADE,
+        related_name='timeline_entries',
+    )
+    author = models.ForeignKey(
+        User,
+        on_delete=models.CASCADE,
+        related_name='+',
+    )
+    pub_date = models.DateTimeField()
+
+    class Meta:
+        verbose_name = 'Запись ленты подписок'
+        verbose_name_plural = 'Записи ленты подписок'
+        constraints = [
+            models.UniqueConstraint(
+                fields=['user', 'post'],
+                name='unique_timeline_entry',
+            )
+        ]
+        indexes = [
+            models.Index(
+                fields=['user', '-pub_date', '-post'],
+                name='timeline_user_feed_idx',
+            ),
+            models.Index(
+                fields=['user', 'author'],
+                name='timeline_user_author_idx',
+            ),
+        ]
+
+
+class UserCounter(models.Model):
+    """Денормализованные счётчики пользователя."""
+    user = models.OneToOneField(
+        User,
+        on_delete=models.CASCADE,
+        primary_key=True,
+        related_name='counters',
+    )
+    posts_count = models.PositiveIntegerField(default=0)
+    followers_count = models.PositiveIntegerField(default=0)
+    following_count = models.PositiveIntegerField(default=0)
+
+    class Meta:
+        verbose_name = 'Счётчики пользователя'
+        verbose_name_plural = 'Счётчики пользователей'
+
+
+class PostCounter(models.Model):
+    """Денормализованные счётчики поста."""
+    post = models.OneToOneField(
+        Post,
+        on_delete=models.CASCADE,
+        primary_key=True,
+        related_name='counters',
+    )
+    comments_count = models.PositiveIntegerField(default=0)
+
+    class Meta:
+        verbose_name = 'Счётчики поста'
+        verbose_name_plural = 'Счётчики постов'
+
+
+class MediaBlob(models.Model):
+    """Файл в хранилище по хешу и число постов, которые на него ссылаются.
+
+    Файл и его производные удаляются, когда счётчик доходит до нуля;
+    без строки в таблице файл считается используемым и не удаляется.
+    """
+    name = models.CharField(max_length=100, primary_key=True)
+    refs = models.PositiveIntegerField(default=0)
+
+    class Meta:
+        verbose_name = 'Файл'
+        verbose_name_plural = 'Файлы'
+
+    def __str__(self):
+        return self.name
@@ -0,0 +1,181 @@
+import base64
+import binascii
+
+from django.db.models import Q
+from django.utils.dateparse import parse_datetime
+from django.utils.http import urlencode
+
+
+class InvalidCursor(ValueError):
+    pass
+
+
+def encode_cursor(pub_date, pk, reverse=False):
+    """Упаковывает позицию в ленте в непрозрачную строку для URL."""
+    raw = f'{int(reverse)}|{pub_date.isoformat()}|{pk}'
+    return base64.urlsafe_b64encode(raw.encode()).decode().rstrip('=')
+
+
+def decode_cursor(cursor):
+    """Разбирает строку курсора обратно в (reverse, pub_date, pk)."""
+    try:
+        padded = cursor + '=' * (-len(cursor) % 4)
+        raw = base64.urlsafe_b64decode(padded.encode()).decode()
+        reverse, pub_date, pk = raw.split('|')
+        pub_date = parse_datetime(pub_date)
+        if pub_date is None or reverse not in ('0', '1'):
+            raise ValueError
+        return reverse == '1', pub_date, int(pk)
+    except (binascii.Error, UnicodeDecodeError, ValueError):
+        raise InvalidCursor(cursor)
+
+
+def _key(row, keys):
+    """Значения ключа и для модели, и для словаря из values()."""
+    if isinstance(row, dict):
+        return tuple(row[key] for key in keys)
+    return tuple(getattr(row, key) for key in keys)
+
+
+class KeysetPage:
+    """Страница ленты без номера: вместо него курсоры соседних страниц.
+
+    Повторяет ту часть интерфейса ``django.core.paginator.Page``, которой
+    пользуются шаблоны и тесты: ``len``, итерацию, индексацию,
+    ``has_next``/``has_previous`` и ``has_other_pages``.
+    """
+
+    def __init__(self, object_list, paginator, has_next, has_previous):
+        self.object_list = object_list
+        self.paginator = paginator
+        self._has_next = has_next
+        self._has_previous = has_previous
+
+    def __repr__(self):
+        return f'<KeysetPage of {len(self.object_list)} objects>'
+
+    def __len__(self):
+        return len(self.object_list)
+
+    def __iter__(self):
+        return iter(self.object_list)
+
+    def __getitem__(self, index):
+        return self.object_list[index]
+
+    def __contains__(self, item):
+        return item in self.object_list
+
+    def has_next(self):
+        return self._has_next
+
+    def has_previous(self):
+        return self._has_previous
+
+    def has_other_pages(self):
+        return self._has_next or self._has_previous
+
+    @property
+    def next_cursor(self):
+        if not self._has_next:
+            return None
+        pub_date, pk = _key(self.object_list[-1], self.paginator.keys)
+        return encode_cursor(pub_date, pk)
+
+    @property
+    def previous_cursor(self):
+        if not self._has_previous:
+            return None
+        pub_date, pk = _key(self.object_list[0], self.paginator.keys)
+        return encode_cursor(pub_date, pk, reverse=True)
+
+    @property
+    def next_query(self):
+        return self.paginator.query_for(self.next_cursor)
+
+    @property
+    def previous_query(self):
+        return self.paginator.query_for(self.previous_cursor)
+
+    @property
+    def first_query(self):
+        return self.paginator.first_query()
+
+
+class KeysetPaginator:
+    """Курсорная пагинация по ключу ``(pub_date, id)``.
+
+    Вместо ``COUNT(*)`` и ``OFFSET`` каждая страница выбирается условием
+    по ключу последней показанной записи, поэтому дальние страницы стоят
+    столько же, сколько первая. Лента всегда отсортирована от новых
+    записей к старым (``descending=False`` — наоборот, как комментарии).
+    ``keys`` позволяет взять ключ из аннотаций (например, из даты записи
+    ленты подписок), чтобы условие и сортировка попадали в нужный индекс.
+    """
+
+    is_keyset = True
+
+    def __init__(self, object_list, per_page, cursor_param='cursor',
+                 query_params=None, keys=('pub_date', 'id'),
+                 descending=True):
+        self.object_list = object_list
+        self.per_page = int(per_page)
+        self.cursor_param = cursor_param
+        self.query_params = query_params or {}
+        self.keys = keys
+        self.descending = descending
+        reversed_keys = tuple(f'-{key}' for key in keys)
+        self.ordering = reversed_keys if descending else keys
+        self.reverse_ordering = keys if descending else reversed_keys
+
+    def _other_params(self):
+        """Параметры запроса, кроме номера страницы и курсора: поиск,
+        фильтры и т.п. должны переходить по ссылкам пагинатора."""
+        return {
+            key: value for key, value in self.query_params.items()
+            if key not in (self.cursor_param, 'page')
+        }
+
+    def query_for(self, cursor):
+        """Строка запроса для ссылки на страницу с данным курсором."""
+        if cursor is None:
+            return None
+        params = self._other_params()
+        params[self.cursor_param] = cursor
+        return urlencode(params)
+
+    def first_query(self):
+        """Строка запроса для ссылки на первую страницу."""
+        return urlencode(self._other_params())
+
+    def get_page(self, cursor=None):
+        """Возвращает страницу; битый курсор ведёт на первую страницу."""
+        if cursor:
+            try:
+                return self.page(decode_cursor(cursor))
+            except InvalidCursor:
+                pass
+        return self.page(None)
+
+    def page(self, position):
+        queryset = self.object_list
+        if position is None:
+            rows = list(queryset.order_by(*self.ordering)[:self.per_page + 1])
+            has_next = len(rows) > self.per_page
+            return KeysetPage(rows[:self.per_page], self, has_next, False)
+        reverse, pub_date, pk = position
+        date_key, pk_key = self.keys
+        # Вперёд — к меньшим ключам в убывающей ленте, к большим в
+        # возрастающей; назад — наоборот.
+        lookup = 'lt' if reverse != self.descending else 'gt'
+        queryset = queryset.filter(
+            Q(**{f'{date_key}__{lookup}': pub_date})
+            | Q(**{date_key: pub_date, f'{pk_key}__{lookup}': pk})
+        ).order_by(*(self.reverse_ordering if reverse else self.ordering))
+        rows = list(queryset[:self.per_page + 1])
+        has_more = len(rows) > self.per_page
+        rows = rows[:self.per_page]
+        if reverse:
+            rows.reverse()
+            return KeysetPage(rows, self, True, has_more)
+        return KeysetPage(rows, self, has_more, True)
@@ -0,0 +1,204 @@
+"""Картинки постов любого размера по подписанной ссылке.
+
+``/media/resize/<w>x<h>/<имя>?s=<подпись>`` при первом запросе
+обрезает картинку до размера в пуле процессов images.py и кладёт
+результат в ``MEDIA_ROOT/resize/<w>x<h>/<имя>``; дальше файл отдаёт
+core.media.serve, за nginx — через X-Accel-Redirect. Подпись не даёт
+заполнить кеш произвольными размерами. Одновременные запросы одного
+размера внутри процесса ждут одну задачу. Каталог ограничен
+MEDIA_RESIZE_CACHE_SIZE: при переполнении удаляются файлы, к которым
+дольше всего не обращались.
+
+Каждый запрос должен проходить через это представление: оно проверяет
+подпись и отмечает обращение для вытеснения (``touch``). Если прокси
+отдаёт ``/media/resize/`` с диска сам, atime не меняется (noatime,
+relatime), и вытесняться будут как раз самые запрашиваемые файлы.
+"""
+import logging
+import os
+import threading
+import time
+import uuid
+from concurrent.futures import Future
+from urllib.parse import urlencode
+
+from core import media
+from core.timing import measure_thumbnail
+from django.conf import settings
+from django.core.exceptions import PermissionDenied, SuspiciousFileOperation
+from django.core.files.storage import default_storage
+from django.core.signing import Signer
+from django.http import Http404
+from django.urls import reverse
+from django.utils.crypto import constant_time_compare
+
+from . import images
+from .imaging import render_fit
+from .models import Post
+
+logger = logging.getLogger(__name__)
+
+RESIZE_DIR = 'resize'
+
+signer = Signer(salt='posts.resize')
+
+_lock = threading.Lock()
+_pending = {}
+# Сколько, по мнению этого процесса, занимает каталог; None — не считали.
+_usage = None
+
+
+def signature(width, height, name):
+    return signer.signature(f'{width}x{height}/{name}')
+
+
+def url(name, width, height):
+    path = reverse('media_resize', kwargs={
+        'width': width, 'height': height, 'path': name,
+    })
+    return f'{path}?{urlencode({"s": signature(width, height, name)})}'
+
+
+def cache_name(width, height, name):
+    return f'{RESIZE_DIR}/{width}x{height}/{name}'
+
+
+def touch(path):
+    """Отмечает обращение к файлу в atime: по нему evict выбирает, что
+    удалить. Файловая система atime при чтении обычно не обновляет,
+    поэтому его ставит только этот вызов. mtime не меняется, и
+    Last-Modified остаётся прежним."""
+    try:
+        os.utime(path, (time.time(), os.stat(path).st_mtime))
+        return True
+    except FileNotFoundError:
+        return False
+
+
+def write(path, data):
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    temporary = f'{path}.{uuid.uuid4().hex}.tmp'
+    with open(temporary, 'wb') as file:
+        file.write(data)
+    os.replace(temporary, path)
+
+
+def ensure(name, width, height):
+    """Путь к файлу нужного размера; делает его, если в кеше нет.
+
+    Первый запрос размера становится ведущим и отдаёт работу в пул,
+    остальные ждут его Future. Между процессами задачи не объединяются:
+    в худшем случае файл будет записан дважды одинаковым.
+    """
+    path = default_storage.path(cache_name(width, height, name))
+    if touch(path):
+        return path
+    key = (name, width, height)
+    with _lock:
+        future = _pending.get(key)
+        leader = future is None
+        if leader:
+            future = _pending[key] = Future()
+    if not leader:
+        return future.result(timeout=settings.MEDIA_RESIZE_TIMEOUT)
+    try:
+        # Предыдущий ведущий мог записать файл и убрать задачу между
+        # первой проверкой и блокировкой.
+        if touch(path):
+            future.set_result(path)
+            return path
+        source = Post._meta.get_field('image').storage.path(name)
+        data = images.run(
+            render_fit, source, width, height, settings.POST_IMAGE_QUALITY)
+        write(path, data)
+        future.set_result(path)
+    except BaseException as error:
+        future.set_exception(error)
+        raise
+    finally:
+        with _lock:
+            del _pending[key]
+    account(len(data))
+    return path
+
+
+def scan():
+    """(размер каталога, [(atime, размер, путь), ...])."""
+    total = 0
+    files = []
+    root = default_storage.path(RESIZE_DIR)
+    for directory, _, filenames in os.walk(root):
+        for filename in filenames:
+            path = os.path.join(directory, filename)
+            try:
+                stats = os.stat(path)
+            except FileNotFoundError:
+                continue
+            total += stats.st_size
+            files.append((stats.st_atime, stats.st_size, path))
+    return total, files
+
+
+def evict():
+    """Удаляет давно не запрошенные файлы, пока каталог не станет меньше
+    90% MEDIA_RESIZE_CACHE_SIZE; возвращает число удалённых файлов."""
+    global _usage
+    total, files = scan()
+    removed = 0
+    if total > settings.MEDIA_RESIZE_CACHE_SIZE:
+        limit = settings.MEDIA_RESIZE_CACHE_SIZE * 0.9
+        for _, size, path in sorted(files):
+            if total <= limit:
+                break
+            try:
+                os.remove(path)
+            except FileNotFoundError:
+                pass
+            total -= size
+            removed += 1
+    _usage = total
+    return removed
+
+
+def account(size):
+    """Учитывает новый файл и чистит кеш, когда оценка превысила лимит.
+    Каталог обходится только тогда: другие процессы тоже пишут, и оценка
+    каждого процесса уточняется при обходе."""
+    global _usage
+    with _lock:
+        if _usage is not None:
+            _usage += size
+        full = _usage is None or _usage > settings.MEDIA_RESIZE_CACHE_SIZE
+    if full:
+        evict()
+
+
+def delete(name):
+    """Удаляет все размеры файла; вызывается, когда файл удалён."""
+    root = default_storage.path(RESIZE_DIR)
+    if not os.path.isdir(root):
+        return
+    for size in os.listdir(root):
+        try:
+            os.remove(os.path.join(root, size, name))
+        except FileNotFoundError:
+            pass
+
+
+def serve(request, width, height, path):
+    if not constant_time_compare(
+            request.GET.get('s', ''), signature(width, height, path)):
+        raise PermissionDenied
+    if not (0 < width <= settings.MEDIA_RESIZE_MAX_SIDE
+            and 0 < height <= settings.MEDIA_RESIZE_MAX_SIDE):
+        raise Http404
+    storage = Post._meta.get_field('image').storage
+    try:
+        if not storage.exists(path):
+            raise Http404
+        with measure_thumbnail():
+            ensure(path, width, height)
+    except (SuspiciousFileOperation, OSError) as error:
+        logger.warning('Не удалось уменьшить %s: %s', path, error)
+        raise Http404
+    return media.serve(request, cache_name(width, height, path))
@@ -0,0 +1,178 @@
+import base64
+import binascii
+import re
+
+from django.db import connection
+
+from .models import Post
+
+FTS_TABLE = 'posts_post_fts'
+
+SCHEMA = (
+    f"CREATE VIRTUAL TABLE IF NOT EXISTS {FTS_TABLE} USING fts5("
+    " text, content='posts_post', content_rowid='id',"
+    " tokenize='unicode61 remove_diacritics 2')",
+)
+
+TRIGGERS = {
+    'posts_post_fts_insert': (
+        'AFTER INSERT ON posts_post BEGIN'
+        f' INSERT INTO {FTS_TABLE} (rowid, text) VALUES (new.id, new.text);'
+        ' END'
+    ),
+    'posts_post_fts_delete': (
+        'AFTER DELETE ON posts_post BEGIN'
+        f' INSERT INTO {FTS_TABLE} ({FTS_TABLE}, rowid, text)'
+        " VALUES ('delete', old.id, old.text);"
+        ' END'
+    ),
+    'posts_post_fts_update': (
+        'AFTER UPDATE OF text ON posts_post BEGIN'
+        f' INSERT INTO {FTS_TABLE} ({FTS_TABLE}, rowid, text)'
+        " VALUES ('delete', old.id, old.text);"
+        f' INSERT INTO {FTS_TABLE} (rowid, text) VALUES (new.id, new.text);'
+        ' END'
+    ),
+}
+
+WORD = re.compile(r'\w+')
+
+
+def is_available(using=connection):
+    return using.vendor == 'sqlite'
+
+
+def install(using=connection):
+    """Создаёт индекс FTS5 и триггеры, которые держат его в актуальном
+    состоянии. Когда SQLite пересоздаёт таблицу постов при миграции,
+    триггеры пропадают вместе со старой таблицей; тогда они ставятся
+    заново, а индекс перестраивается из posts_post."""
+    if not is_available(using):
+        return
+    with using.cursor() as cursor:
+        for statement in SCHEMA:
+            cursor.execute(statement)
+        cursor.execute(
+            "SELECT name FROM sqlite_master WHERE type = 'trigger'"
+            " AND tbl_name = 'posts_post'"
+        )
+        existing = {row[0] for row in cursor.fetchall()}
+        missing = set(TRIGGERS) - existing
+        for name in missing:
+            cursor.execute(f'CREATE TRIGGER {name} {TRIGGERS[name]}')
+        if missing:
+            cursor.execute(
+                f"INSERT INTO {FTS_TABLE} ({FTS_TABLE}) VALUES ('rebuild')")
+
+
+def uninstall(using=connection):
+    if not is_available(using):
+        return
+    with using.cursor() as cursor:
+        for name in TRIGGERS:
+            cursor.execute(f'DROP TRIGGER IF EXISTS {name}')
+        cursor.execute(f'DROP TABLE IF EXISTS {FTS_TABLE}')
+
+
+def match_expression(query):
+    """Превращает ввод пользователя в безопасный запрос FTS5: каждое слово
+    в кавычках, последнее ищется по префиксу."""
+    words = WORD.findall(query)
+    if not words:
+        return None
+    terms = [f'"{word}"' for word in words]
+    terms[-1] += '*'
+    return ' '.join(terms)
+
+
+def encode_cursor(score, pk):
+    raw = f'{score!r}|{pk}'
+    return base64.urlsafe_b64encode(raw.encode()).decode().rstrip('=')
+
+
+def decode_cursor(cursor):
+    try:
+        padded = cursor + '=' * (-len(cursor) % 4)
+        score, pk = base64.urlsafe_b64decode(
+            padded.encode()).decode().split('|')
+        return float(score), int(pk)
+    except (binascii.Error, UnicodeDecodeError, ValueError):
+        return None
+
+
+class SearchPage:
+    def __init__(self, object_list, next_cursor):
+        self.object_list = object_list
+        self.next_cursor = next_cursor
+
+    def __len__(self):
+        return len(self.object_list)
+
+    def __iter__(self):
+        return iter(self.object_list)
+
+
+def search(query, group_id=None, author_id=None, cursor=None, limit=20):
+    """Ищет посты по индексу FTS5, лучшие совпадения первыми.
+
+    Порядок задаёт bm25 (меньше — лучше) с id в качестве второго ключа,
+    поэтому следующая страница выбирается курсором ``(score, id)``
+    без OFFSET.
+    """
+    match = match_expression(query)
+    if match is None or not is_available():
+        return SearchPage([], None)
+    filters = []
+    params = [match]
+    if group_id is not None:
+        filters.append('AND post.group_id = %s')
+        params.append(group_id)
+    if author_id is not None:
+        filters.append('AND post.author_id = %s')
+        params.append(author_id)
+    position = cursor and decode_cursor(cursor)
+    after = ''
+    if position:
+        after = 'WHERE score > %s OR (score = %s AND id > %s)'
+        params.extend([position[0], position[0], position[1]])
+    params.append(limit + 1)
+    sql = (
+        'SELECT id, score FROM ('
+        f' SELECT post.id AS id, bm25({FTS_TABLE}) AS score'
+        f' FROM {FTS_TABLE}'
+        f' JOIN posts_post AS post ON post.id = {FTS_TABLE}.rowid'
+        f' WHERE {FTS_TABLE} MATCH %s {" ".join(filters)}'
+        f') {after} ORDER BY score, id LIMIT %s'
+    )
+    with connection.cursor() as db_cursor:
+        db_cursor.execute(sql, params)
+        rows = db_cursor.fetchall()
+    next_cursor = None
+    if len(rows) > limit:
+        rows = rows[:limit]
+        next_cursor = encode_cursor(*rows[-1][::-1])
+    posts = Post.objects.select_related('author', 'group').in_bulk(
+        [pk for pk, _ in rows])
+    found = []
+    for pk, score in rows:
+        post = posts.get(pk)
+        if post is not None:
+            post.score = score
+            found.append(post)
+    return SearchPage(found, next_cursor)
+
+
+def filter_queryset(queryset, query):
+    """Ограничивает queryset постами, найденными в индексе (для админки)."""
+    match = match_expression(query)
+    if match is None:
+        return queryset.none()
+    # RawSQL в pk__in дал бы «IN ((SELECT ...))», а SQLite читает двойные
+    # скобки как скалярный подзапрос и берёт только первую строку.
+    return queryset.extra(
+        where=[
+            f'posts_post.id IN (SELECT rowid FROM {FTS_TABLE}'
+            f' WHERE {FTS_TABLE} MATCH %s)'
+        ],
+        params=[match],
+    )
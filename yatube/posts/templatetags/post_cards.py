@@ -0,0 +1,12 @@
+from django import template
+
+from .. import cards
+
+register = template.Library()
+
+
+@register.simple_tag
+def post_cards(posts):
+    """Карточки страницы ленты из кеша: ``{% post_cards page_obj as cards %}``
+    и дальше ``{% for post, card in cards %}``."""
+    return cards.render(posts)
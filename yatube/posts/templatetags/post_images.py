@@ -0,0 +1,15 @@
+from django import template
+
+from .. import resize
+
+register = template.Library()
+
+
+@register.simple_tag
+def resized_url(image, size):
+    """Подписанная ссылка на картинку размера ``size`` («960x339»):
+    ``{% resized_url post.image "960x339" %}``."""
+    if not image:
+        return ''
+    width, height = (int(side) for side in size.split('x'))
+    return resize.url(image.name, width, height)
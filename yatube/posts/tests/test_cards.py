@@ -0,0 +1,59 @@
+from unittest import mock
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.test import Client, TestCase
+from django.urls import reverse
+
+from .. import cards
+from ..models import Post
+
+User = get_user_model()
+
+
+class CardsTest(TestCase):
+    @classmethod
+    def setUpClass(cls) -> None:
+        super().setUpClass()
+        cls.author = User.objects.create_user(username='Writer')
+
+    def setUp(self):
+        cache.clear()
+        self.post = Post.objects.create(author=self.author, text='Старый')
+
+    def test_card_cached_by_version(self):
+        """Карточка берётся из кеша, пока не изменится updated."""
+        cards.render([self.post])
+        # update() не трогает updated, поэтому карточка прежняя.
+        Post.objects.filter(pk=self.post.pk).update(text='Новый')
+        post = Post.objects.get(pk=self.post.pk)
+        self.assertIn('Старый', cards.render([post])[0][1])
+        post.save()
+        self.assertIn('Новый', cards.render([post])[0][1])
+
+    def test_page_uses_one_get_many(self):
+        """Страница собирается одним get_many, рендерятся только
+        недостающие карточки."""
+        other = Post.objects.create(author=self.author, text='Другой')
+        cards.render([self.post])
+        with mock.patch.object(cache, 'get_many',
+                               wraps=cache.get_many) as get_many, \
+                mock.patch.object(cards, 'render_to_string',
+                                  wraps=cards.render_to_string) as rendered:
+            result = cards.render([self.post, other])
+        get_many.assert_called_once()
+        rendered.assert_called_once_with(cards.TEMPLATE, {'post': other})
+        self.assertEqual([post for post, _ in result], [self.post, other])
+
+    def test_post_edit_updates_card(self):
+        """После правки поста лента показывает новую карточку."""
+        client = Client()
+        client.force_login(self.author)
+        self.assertContains(client.get(reverse('posts:index')), 'Старый')
+        client.post(
+            reverse('posts:post_edit', kwargs={'post_id': self.post.pk}),
+            {'text': 'Исправленный'},
+        )
+        response = client.get(reverse('posts:index'))
+        self.assertContains(response, 'Исправленный')
+        self.assertNotContains(response, 'Старый')
@@ -0,0 +1,129 @@
+from http import HTTPStatus
+
+from core import db_router
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.test import Client, RequestFactory, TestCase, override_settings
+from django.urls import reverse
+
+from .. import feed_cache
+from ..conditional import feed_reads
+from ..models import Comment, Follow, Group, Post
+
+User = get_user_model()
+
+
+class ConditionalGetTest(TestCase):
+    @classmethod
+    def setUpClass(cls) -> None:
+        super().setUpClass()
+        cls.user = User.objects.create_user(username='NoName')
+        cls.group = Group.objects.create(
+            title='Тестовая группа',
+            slug='test-slug',
+            description='Тестовое описание',
+        )
+        cls.post = Post.objects.create(
+            author=cls.user,
+            text='Текст',
+            group=cls.group,
+        )
+
+    def setUp(self) -> None:
+        cache.clear()
+        self.guest_client = Client()
+        self.authorized_client = Client()
+        self.authorized_client.force_login(self.user)
+
+    def public_urls(self):
+        return [
+            reverse('posts:index'),
+            reverse('posts:group_list', kwargs={'slug': self.group.slug}),
+            reverse('posts:profile', kwargs={'username': self.user.username}),
+            reverse('posts:post_detail', kwargs={'post_id': self.post.pk}),
+        ]
+
+    def test_not_modified_for_matching_etag(self):
+        """Совпавший ETag даёт 304 без тела."""
+        for url in self.public_urls():
+            with self.subTest(url=url):
+                response = self.guest_client.get(url)
+                self.assertEqual(response.status_code, HTTPStatus.OK)
+                self.assertTrue(response.has_header('Last-Modified'))
+                response = self.guest_client.get(
+                    url, HTTP_IF_NONE_MATCH=response['ETag'])
+                self.assertEqual(
+                    response.status_code, HTTPStatus.NOT_MODIFIED)
+                self.assertEqual(response.content, b'')
+
+    def test_changes_refresh_validators(self):
+        """Новый пост или комментарий меняет ETag."""
+        urls = self.public_urls()
+        etags = [self.guest_client.get(url)['ETag'] for url in urls]
+        Post.objects.create(author=self.user, text='Ещё', group=self.group)
+        Comment.objects.create(post=self.post, author=self.user, text='Ок')
+        for url, etag in zip(urls, etags):
+            with self.subTest(url=url):
+                response = self.guest_client.get(url, HTTP_IF_NONE_MATCH=etag)
+                self.assertEqual(response.status_code, HTTPStatus.OK)
+
+    def test_counters_refresh_validators(self):
+        """Подписка меняет валидаторы обоих профилей, а новый пост автора —
+        страницы его старых постов с числом постов автора."""
+        reader = User.objects.create_user(username='Reader')
+        urls = [
+            reverse('posts:profile', kwargs={'username': self.user.username}),
+            reverse('posts:profile', kwargs={'username': reader.username}),
+            reverse('posts:post_detail', kwargs={'post_id': self.post.pk}),
+        ]
+        responses = [self.guest_client.get(url) for url in urls[:2]]
+        Follow.objects.create(user=reader, author=self.user)
+        for url, response in zip(urls, responses):
+            with self.subTest(url=url):
+                self.assertEqual(self.guest_client.get(
+                    url, HTTP_IF_NONE_MATCH=response['ETag'],
+                ).status_code, HTTPStatus.OK)
+        response = self.guest_client.get(urls[2])
+        Post.objects.create(author=self.user, text='Ещё')
+        self.assertContains(self.guest_client.get(
+            urls[2], HTTP_IF_NONE_MATCH=response['ETag'],
+        ), 'Всего постов автора:  <span >2</span>')
+
+    def test_pages_have_separate_etags(self):
+        """У разных страниц ленты разные валидаторы."""
+        url = reverse('posts:index')
+        self.assertNotEqual(
+            self.guest_client.get(url)['ETag'],
+            self.guest_client.get(url + '?page=2')['ETag'],
+        )
+
+    def test_authorized_pages_are_not_conditional(self):
+        """Авторизованным пользователям страница отдаётся целиком."""
+        response = self.authorized_client.get(reverse('posts:index'))
+        self.assertFalse(response.has_header('ETag'))
+
+
+@override_settings(DATABASE_REPLICAS=['replica'])
+class FeedReadsTest(TestCase):
+    def setUp(self) -> None:
+        cache.clear()
+        self.request = RequestFactory().get('/')
+
+    def read(self):
+        @feed_reads('index')
+        def view(request):
+            return db_router.ReplicaRouter().db_for_read(Post)
+        token = db_router.pin_to_primary(False)
+        try:
+            return view(self.request)
+        finally:
+            db_router.release(token)
+
+    def test_recent_change_reads_primary(self):
+        """Ленту, изменённую только что, читает основная база: реплика
+        могла ещё не получить изменение, а поколение в кеше уже новое."""
+        self.assertEqual(self.read(), 'replica')
+        feed_cache.bump(feed_cache.scope_for('index'))
+        self.assertEqual(self.read(), 'default')
+        with override_settings(REPLICA_STICKY_SECONDS=0):
+            self.assertEqual(self.read(), 'replica')
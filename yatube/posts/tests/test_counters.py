@@ -0,0 +1,52 @@
+from io import StringIO
+
+from django.contrib.auth import get_user_model
+from django.core.management import call_command
+from django.test import TestCase
+
+from .. import counters
+from ..models import Comment, Follow, Post, UserCounter
+
+User = get_user_model()
+
+
+class CountersTest(TestCase):
+    @classmethod
+    def setUpClass(cls) -> None:
+        super().setUpClass()
+        cls.user = User.objects.create_user(username='Reader')
+        cls.author = User.objects.create_user(username='Writer')
+
+    def test_signals_keep_counters(self):
+        """Сигналы поддерживают счётчики постов, подписок и комментариев."""
+        post = Post.objects.create(author=self.author, text='Текст')
+        Post.objects.create(author=self.author, text='Текст 2')
+        Follow.objects.create(user=self.user, author=self.author)
+        Comment.objects.create(post=post, author=self.user, text='Коммент')
+        author_counters = UserCounter.objects.get(user=self.author)
+        self.assertEqual(author_counters.posts_count, 2)
+        self.assertEqual(author_counters.followers_count, 1)
+        self.assertEqual(
+            UserCounter.objects.get(user=self.user).following_count, 1)
+        self.assertEqual(post.counters.comments_count, 1)
+        post.delete()
+        Follow.objects.all().delete()
+        author_counters.refresh_from_db()
+        self.assertEqual(author_counters.posts_count, 1)
+        self.assertEqual(author_counters.followers_count, 0)
+
+    def test_counters_do_not_go_negative(self):
+        """Уменьшение счётчика без строки в таблице ничего не ломает."""
+        post = Post.objects.create(author=self.author, text='Текст')
+        UserCounter.objects.all().delete()
+        post.delete()
+        self.assertFalse(UserCounter.objects.exists())
+        self.assertEqual(counters.for_user(self.author).posts_count, 0)
+
+    def test_reconcile_counters_command(self):
+        """reconcile_counters чинит счётчики после bulk_create."""
+        Post.objects.bulk_create(
+            [Post(author=self.author, text=f'Пост {i}') for i in range(3)])
+        call_command('reconcile_counters', batch_size=1, stdout=StringIO())
+        self.assertEqual(
+            UserCounter.objects.get(user=self.author).posts_count, 3)
@@ -0,0 +1,64 @@
+from io import StringIO
+
+from django.contrib.auth import get_user_model
+from django.core.management import call_command
+from django.db.models import Count
+from django.test import TestCase
+
+from ..dataset import DatasetGenerator
+from ..models import Comment, Follow, Group, Post, TimelineEntry, UserCounter
+
+User = get_user_model()
+
+
+class DatasetTest(TestCase):
+    def generate(self, **options):
+        call_command(
+            'generate_dataset', scale=0.05, stdout=StringIO(), **options)
+
+    def snapshot(self):
+        return list(
+            Post.objects.order_by('pub_date')
+            .values_list('text', 'author__username', 'group__slug'))
+
+    def test_sizes_and_derived_data(self):
+        """Набор нужного размера; ленты и счётчики пересобраны."""
+        self.generate()
+        self.assertEqual(User.objects.count(), 5)
+        self.assertEqual(Group.objects.count(), 2)
+        self.assertEqual(Post.objects.count(), 500)
+        self.assertEqual(Comment.objects.count(), 1000)
+        self.assertTrue(Follow.objects.exists())
+        self.assertTrue(TimelineEntry.objects.exists())
+        self.assertEqual(
+            sum(UserCounter.objects.values_list('posts_count', flat=True)),
+            500,
+        )
+
+    def test_power_law_activity(self):
+        """Самый активный автор пишет заметно больше среднего."""
+        self.generate()
+        counts = sorted(
+            Post.objects.values('author').annotate(total=Count('id'))
+            .values_list('total', flat=True),
+            reverse=True,
+        )
+        self.assertGreater(counts[0], 2 * sum(counts) / 5)
+
+    def test_same_seed_same_data(self):
+        """Один seed — одни и те же данные."""
+        self.generate(seed=7)
+        first = self.snapshot()
+        Post.objects.all().delete()
+        User.objects.all().delete()
+        Group.objects.all().delete()
+        self.generate(seed=7)
+        self.assertEqual(self.snapshot(), first)
+
+    def test_dates_are_kept(self):
+        """Даты постов растут вместе с id и не равны времени генерации."""
+        DatasetGenerator(scale=0.01).run()
+        dates = list(
+            Post.objects.order_by('id').values_list('pub_date', flat=True))
+        self.assertEqual(dates, sorted(dates))
+        self.assertLess(dates[-1].year, 2022)
@@ -1,3 +1,4 @@
+import hashlib
 import shutil
 import tempfile
 
@@ -75,7 +76,10 @@ class FormsTests(TestCase):
         post_object = Post.objects.latest('pk')
         self.assertEqual(post_object.text, form_data['text'])
         self.assertEqual(post_object.group, self.group)
-        self.assertEqual(post_object.image, f'posts/{uploaded}')
+        # Хранилище называет файлы по хешу содержимого.
+        digest = hashlib.sha256(small_gif).hexdigest()
+        self.assertEqual(
+            post_object.image, f'posts/{digest[:2]}/{digest}.gif')
 
     def test_edit_post_database(self):
         """Изменение поста в базе данных при отправке
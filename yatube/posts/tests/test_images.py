@@ -0,0 +1,118 @@
+import shutil
+import tempfile
+from io import BytesIO
+from unittest import mock
+
+from core.testing import make_image
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.test import TestCase, override_settings
+from django.urls import reverse
+from PIL import Image
+
+from .. import images
+from ..imaging import ORIENTATION_TAG, encodable, render_variants
+from ..models import Post
+
+TEMP_MEDIA_ROOT = tempfile.mkdtemp(dir=settings.BASE_DIR)
+
+User = get_user_model()
+
+# WebP есть не в каждой сборке Pillow.
+FORMATS = encodable(['webp', 'jpeg'])
+
+
+@override_settings(
+    MEDIA_ROOT=TEMP_MEDIA_ROOT,
+    POST_IMAGE_WIDTHS=[320, 640, 960],
+    POST_IMAGE_FORMATS=['webp', 'jpeg'],
+    POST_IMAGE_PROCESSES=0,
+)
+class ImagesTest(TestCase):
+    @classmethod
+    def setUpClass(cls) -> None:
+        super().setUpClass()
+        cls.user = User.objects.create_user(username='NoName')
+
+    @classmethod
+    def tearDownClass(cls):
+        super().tearDownClass()
+        shutil.rmtree(TEMP_MEDIA_ROOT, ignore_errors=True)
+
+    def create_post(self, size=(800, 600), **kwargs):
+        with mock.patch.object(images, 'schedule'):
+            return Post.objects.create(
+                author=self.user, text='Текст',
+                image=make_image(size=size, **kwargs))
+
+    def test_render_variants_applies_orientation(self):
+        """Ориентация из EXIF применяется, метаданные не копируются,
+        картинка не растягивается."""
+        post = self.create_post(orientation=6)
+        width, height, rendered = render_variants(
+            post.image.path, [320, 640, 960], ['webp', 'jpeg'], 80)
+        self.assertEqual((width, height), (600, 800))
+        self.assertEqual(
+            [(w, h, name) for w, h, name, _ in rendered],
+            [(w, h, name) for w, h in ((320, 427), (600, 800))
+             for name in FORMATS],
+        )
+        for _, _, _, data in rendered:
+            with Image.open(BytesIO(data)) as variant:
+                self.assertNotIn(ORIENTATION_TAG, variant.getexif())
+
+    def test_process_stores_variants(self):
+        """process сохраняет файлы вариантов и записывает их в пост."""
+        post = self.create_post()
+        self.assertEqual(images.process(post.image.name), 3 * len(FORMATS))
+        post.refresh_from_db()
+        self.assertEqual((post.image_width, post.image_height), (800, 600))
+        self.assertEqual(
+            [(v['width'], v['format']) for v in post.variants],
+            [(w, name) for w in (320, 640, 800) for name in FORMATS],
+        )
+        for variant in post.variants:
+            self.assertTrue(post.image.storage.exists(variant['name']))
+        self.assertTrue(post.image_src.endswith('-800w.jpg'))
+
+    @override_settings(POST_IMAGE_PROCESSES=1)
+    def test_process_in_worker_process(self):
+        """В отдельном процессе получается то же самое."""
+        post = self.create_post(name='pooled.jpg', size=(400, 300))
+        self.assertEqual(images.process(post.image.name), 2 * len(FORMATS))
+        post.refresh_from_db()
+        self.assertEqual(len(post.variants), 2 * len(FORMATS))
+
+    def test_process_skips_missing_file(self):
+        """Отсутствующий файл пропускается без ошибок."""
+        self.assertEqual(images.process('posts/missing.jpg'), 0)
+
+    def test_new_image_is_scheduled(self):
+        """Сохранение поста с новой картинкой ставит обработку в пул,
+        а смена картинки сбрасывает старые варианты."""
+        with mock.patch.object(images, 'schedule') as schedule:
+            post = Post.objects.create(
+                author=self.user, text='Текст',
+                image=make_image(size=(800, 600)))
+            post.text = 'Другой текст'
+            post.save()
+            schedule.assert_called_once_with(post)
+            images.process(post.image.name)
+            post.refresh_from_db()
+            post.image = make_image(name='other.jpg', size=(800, 600))
+            post.save()
+        self.assertEqual(schedule.call_count, 2)
+        post.refresh_from_db()
+        self.assertEqual(post.image_variants, '')
+        self.assertIsNone(post.image_width)
+
+    def test_detail_renders_srcset(self):
+        """Страница поста отдаёт srcset по форматам и размеры картинки."""
+        post = self.create_post()
+        images.process(post.image.name)
+        response = self.client.get(
+            reverse('posts:post_detail', args=[post.pk]))
+        self.assertContains(response, '-320w.jpg 320w, ')
+        self.assertContains(response, 'width="800" height="600"')
+        if 'webp' in FORMATS:
+            self.assertContains(response, '-320w.webp 320w, ')
@@ -0,0 +1,121 @@
+import json
+import os
+import tempfile
+from datetime import datetime, timezone
+from io import StringIO
+
+from django.contrib.auth import get_user_model
+from django.core.management import CommandError, call_command
+from django.test import TestCase
+
+from ..importer import Importer
+from ..models import Comment, Follow, Group, Post, TimelineEntry, UserCounter
+
+User = get_user_model()
+
+
+class ImportDataTest(TestCase):
+    @classmethod
+    def setUpClass(cls) -> None:
+        super().setUpClass()
+        cls.reader = User.objects.create_user(username='Reader')
+        cls.author = User.objects.create_user(username='Writer')
+        cls.group = Group.objects.create(
+            title='Тестовая группа',
+            slug='test-slug',
+            description='Тестовое описание',
+        )
+
+    def write(self, suffix, content):
+        handle, path = tempfile.mkstemp(suffix=suffix)
+        with os.fdopen(handle, 'w', encoding='utf-8') as output:
+            output.write(content)
+        self.addCleanup(os.remove, path)
+        return path
+
+    def write_jsonl(self, rows):
+        return self.write('.jsonl', '\n'.join(
+            json.dumps(row, ensure_ascii=False) for row in rows))
+
+    def call(self, *args):
+        out = StringIO()
+        call_command('import_data', *args, '--batch-size', '2', stdout=out)
+        return out.getvalue()
+
+    def test_import_posts_keeps_dates(self):
+        """Посты получают дату из файла, а не время импорта."""
+        path = self.write_jsonl([
+            {'id': 100, 'author': 'Writer', 'group': 'test-slug',
+             'text': 'Старый пост', 'pub_date': '2015-03-01T10:00:00'},
+            {'author': 'Writer', 'text': 'Без группы',
+             'pub_date': '2016-03-01T10:00:00+00:00'},
+            {'author': 'Nobody', 'text': 'Неизвестный автор'},
+        ])
+        output = self.call('posts', path)
+        self.assertIn('Импортировано: 2, пропущено: 1', output)
+        post = Post.objects.get(pk=100)
+        self.assertEqual(post.group, self.group)
+        self.assertEqual(
+            post.pub_date, datetime(2015, 3, 1, 10, tzinfo=timezone.utc))
+        self.assertEqual(
+            UserCounter.objects.get(user=self.author).posts_count, 2)
+        self.assertTrue(Post._meta.get_field('pub_date').auto_now_add)
+
+    def test_import_comments_and_csv(self):
+        """Комментарии из CSV; комментарии к чужим id пропускаются."""
+        post = Post.objects.create(author=self.author, text='Пост')
+        path = self.write('.csv', (
+            'post,author,text,created\n'
+            f'{post.pk},Reader,Первый,2020-01-01T00:00:00\n'
+            f'{post.pk},Writer,Второй,\n'
+            f'{post.pk + 1000},Reader,К несуществующему посту,\n'
+        ))
+        output = self.call('comments', path)
+        self.assertIn('Импортировано: 2, пропущено: 1', output)
+        self.assertEqual(Comment.objects.filter(post=post).count(), 2)
+        post.counters.refresh_from_db()
+        self.assertEqual(post.counters.comments_count, 2)
+
+    def test_import_follows_skips_duplicates(self):
+        """Повторные подписки и подписка на себя не создаются."""
+        post = Post.objects.create(author=self.author, text='Пост')
+        rows = [
+            {'user': 'Reader', 'author': 'Writer'},
+            {'user': 'Reader', 'author': 'Writer'},
+            {'user': 'Writer', 'author': 'Writer'},
+        ]
+        output = self.call('follows', self.write_jsonl(rows))
+        self.assertIn('Импортировано: 1, пропущено: 2', output)
+        output = self.call('follows', self.write_jsonl(rows))
+        self.assertIn('Импортировано: 0, пропущено: 3', output)
+        self.assertEqual(Follow.objects.count(), 1)
+        self.assertTrue(
+            TimelineEntry.objects.filter(user=self.reader, post=post).exists())
+        self.assertEqual(
+            UserCounter.objects.get(user=self.author).followers_count, 1)
+
+    def test_import_leaves_fields_alone(self):
+        """Импорт не переключает auto_now_add: посты, созданные во время
+        импорта, получают текущее время."""
+        created = []
+
+        def progress(importer):
+            created.append(Post.objects.create(
+                author=self.author, text='Во время импорта',
+                pub_date=datetime(2000, 1, 1, tzinfo=timezone.utc)))
+
+        importer = Importer(batch_size=1)
+        importer.run('posts', [
+            {'author': 'Writer', 'text': 'Старый',
+             'pub_date': '2015-03-01T10:00:00'},
+        ], progress)
+        self.assertEqual(importer.processed, 1)
+        self.assertEqual(len(created), 1)
+        created[0].refresh_from_db()
+        self.assertGreater(created[0].pub_date.year, 2000)
+
+    def test_broken_jsonl(self):
+        """Битая строка JSONL прерывает импорт с понятной ошибкой."""
+        path = self.write('.jsonl', '{"user": "Reader"\n')
+        with self.assertRaisesMessage(CommandError, 'Строка 1'):
+            self.call('follows', path)
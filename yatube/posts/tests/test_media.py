@@ -0,0 +1,172 @@
+import os
+import shutil
+import tempfile
+from io import StringIO
+from unittest import mock
+
+from core.testing import image_bytes, make_image
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from django.core.management import call_command
+from django.test import TestCase, override_settings
+
+from .. import blobs, images
+from ..importer import Importer
+from ..models import MediaBlob, Post
+
+TEMP_MEDIA_ROOT = tempfile.mkdtemp(dir=settings.BASE_DIR)
+
+User = get_user_model()
+
+
+def storage():
+    return Post._meta.get_field('image').storage
+
+
+@override_settings(MEDIA_ROOT=TEMP_MEDIA_ROOT, POST_IMAGE_PROCESSES=0)
+class ContentAddressedStorageTest(TestCase):
+    @classmethod
+    def setUpClass(cls) -> None:
+        super().setUpClass()
+        cls.user = User.objects.create_user(username='NoName')
+
+    @classmethod
+    def tearDownClass(cls):
+        super().tearDownClass()
+        shutil.rmtree(TEMP_MEDIA_ROOT, ignore_errors=True)
+
+    def create_post(self, **kwargs):
+        return Post.objects.create(
+            author=self.user, text='Текст', image=make_image(**kwargs))
+
+    def test_same_content_shares_file(self):
+        """Одинаковые загрузки под разными именами — один файл и одна
+        строка MediaBlob со счётчиком ссылок."""
+        with mock.patch.object(images, 'schedule'):
+            first = self.create_post(name='first.JPG')
+            second = self.create_post(name='second.jpg')
+            other = self.create_post(name='first.jpg', color='blue')
+        self.assertEqual(first.image.name, second.image.name)
+        self.assertNotEqual(first.image.name, other.image.name)
+        self.assertRegex(
+            first.image.name, r'^posts/[0-9a-f]{2}/[0-9a-f]{64}\.jpg$')
+        directory = os.path.dirname(first.image.path)
+        self.assertEqual(len(os.listdir(directory)), 1)
+        self.assertEqual(MediaBlob.objects.get(name=first.image.name).refs, 2)
+
+    def test_duplicate_reuses_variants(self):
+        """Повторная загрузка берёт готовые варианты, а не обрабатывает
+        файл заново."""
+        first = self.create_post()
+        images.process(first.image.name)
+        with mock.patch.object(images, 'schedule') as schedule:
+            second = self.create_post(name='again.jpg')
+        schedule.assert_not_called()
+        first.refresh_from_db()
+        self.assertEqual(second.image_variants, first.image_variants)
+        second.refresh_from_db()
+        self.assertEqual(second.image_width, 64)
+
+    def test_release_keeps_shared_file(self):
+        """Файл удаляется только вместе с последней ссылкой на него."""
+        with mock.patch.object(images, 'schedule'):
+            first = self.create_post()
+            second = self.create_post()
+        name = first.image.name
+        images.process(name)
+        variants = [variant['name'] for variant in Post.objects.get(
+            pk=first.pk).variants]
+        # В TestCase транзакция не фиксируется, и collect, который
+        # release ставит на on_commit, вызывается вручную.
+        first.delete()
+        self.assertFalse(blobs.collect(name, variants))
+        self.assertTrue(storage().exists(name))
+        Post.objects.get(pk=second.pk).delete()
+        self.assertTrue(blobs.collect(name, variants))
+        self.assertFalse(storage().exists(name))
+        self.assertFalse(MediaBlob.objects.filter(name=name).exists())
+        for variant in variants:
+            self.assertFalse(default_storage.exists(variant))
+
+    def test_imported_post_keeps_shared_file(self):
+        """Импортированный пост с тем же файлом учитывается в ссылках, и
+        удаление оригинала файл не трогает."""
+        with mock.patch.object(images, 'schedule'):
+            original = self.create_post()
+        name = original.image.name
+        importer = Importer()
+        importer.run('posts', [
+            {'author': self.user.username, 'text': 'Копия', 'image': name},
+        ])
+        importer.finish(rebuild=False)
+        self.assertEqual(MediaBlob.objects.get(name=name).refs, 2)
+        original.delete()
+        self.assertFalse(blobs.collect(name))
+        self.assertTrue(storage().exists(name))
+
+    def test_collect_during_upload_keeps_new_file(self):
+        """collect, успевший удалить файл между сохранением загрузки и
+        acquire, не оставляет новый пост без картинки."""
+        with mock.patch.object(images, 'schedule'):
+            old = self.create_post()
+        name = old.image.name
+        old.delete()
+        acquire = blobs.acquire
+
+        def collect_first(*args):
+            blobs.collect(name)
+            acquire(*args)
+
+        with mock.patch.object(images, 'schedule'), mock.patch.object(
+                blobs, 'acquire', side_effect=collect_first):
+            post = self.create_post(name='again.jpg')
+        self.assertEqual(post.image.name, name)
+        self.assertTrue(storage().exists(name))
+        self.assertEqual(MediaBlob.objects.get(name=name).refs, 1)
+
+    def test_replaced_image_is_released(self):
+        """Смена картинки отпускает старый файл."""
+        with mock.patch.object(images, 'schedule'):
+            post = self.create_post()
+            old = post.image.name
+            post.image = make_image(color='green')
+            post.save()
+        self.assertEqual(MediaBlob.objects.get(name=old).refs, 0)
+        self.assertTrue(blobs.collect(old))
+        self.assertFalse(storage().exists(old))
+        self.assertEqual(MediaBlob.objects.get(name=post.image.name).refs, 1)
+
+    def test_unknown_blob_is_kept(self):
+        """Без строки MediaBlob (посты до миграции) файл не удаляется."""
+        name = storage().save('posts/legacy.jpg', ContentFile(image_bytes()))
+        self.assertFalse(blobs.collect(name))
+        self.assertTrue(storage().exists(name))
+
+    def test_dedupe_media(self):
+        """dedupe_media переименовывает старые файлы по хешу, сливает
+        одинаковые и пересчитывает ссылки."""
+        names = [
+            default_storage.save(name, ContentFile(image_bytes(color=color)))
+            for name, color in (
+                ('posts/a.jpg', 'red'),
+                ('posts/b.jpg', 'red'),
+                ('posts/c.jpg', 'blue'),
+            )
+        ]
+        with mock.patch.object(images, 'schedule'):
+            posts = [
+                Post.objects.create(author=self.user, text='Текст', image=name)
+                for name in names + names[:1]
+            ]
+        call_command('dedupe_media', stdout=StringIO())
+        renamed = [Post.objects.get(pk=post.pk).image.name for post in posts]
+        self.assertEqual(len(set(renamed)), 2)
+        self.assertEqual(renamed[0], renamed[1])
+        for name in names:
+            self.assertFalse(storage().exists(name))
+        self.assertEqual(
+            dict(MediaBlob.objects.values_list('name', 'refs')),
+            {renamed[0]: 3, renamed[2]: 1},
+        )
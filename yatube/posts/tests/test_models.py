@@ -1,6 +1,7 @@
 from django.contrib.auth import get_user_model
 from django.test import TestCase
 
+from .. import feed_cache
 from ..models import Group, Post
 
 User = get_user_model()
@@ -32,3 +33,20 @@ class PostModelTest(TestCase):
         group = PostModelTest.group
         result = str(group)
         self.assertEqual(result, group.title)
+
+    def test_deferred_fields_load(self):
+        """Пост загружается с отложенными полями, а смена группы у такого
+        поста сбрасывает кеш старой группы."""
+        post = PostModelTest.post
+        self.assertEqual(
+            Post.objects.only('text').get(pk=post.pk).text, post.text)
+        self.assertEqual(
+            Post.objects.defer('image').get(pk=post.pk).group_id, None)
+        scope = feed_cache.scope_for('group', self.group.pk)
+        Post.objects.filter(pk=post.pk).update(group=self.group)
+        version = feed_cache.version(scope)
+        deferred = Post.objects.only('text').get(pk=post.pk)
+        deferred.group = None
+        deferred.save()
+        self.assertNotEqual(feed_cache.version(scope), version)
+        self.assertIsNone(Post.objects.get(pk=post.pk).group_id)
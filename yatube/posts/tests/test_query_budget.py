@@ -0,0 +1,153 @@
+import difflib
+import re
+
+from about import urls as about_urls
+from api import urls as api_urls
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.db import connection
+from django.test import Client, TestCase
+from django.test.utils import CaptureQueriesContext
+from django.urls import URLPattern, reverse
+from users import urls as users_urls
+
+from .. import urls as posts_urls
+from ..models import Comment, Follow, Group, Post
+
+User = get_user_model()
+
+AUTHORS_NUMBER = 5
+POSTS_PER_AUTHOR = 15
+COMMENTS_PER_POST = 3
+
+# Максимум запросов на страницу. Ни одно число не должно зависеть от
+# объёма данных: N+1 проявится как превышение бюджета.
+QUERY_BUDGETS = {
+    'posts:index': 4,
+    'posts:group_list': 5,
+    'posts:profile': 6,
+    'posts:profile_export': 3,
+    'posts:post_detail': 4,
+    'posts:search': 4,
+    'posts:search_json': 2,
+    'posts:post_create': 3,
+    'posts:post_edit': 5,
+    'posts:add_comment': 3,
+    'posts:follow_index': 4,
+    'posts:profile_follow': 4,
+    'posts:profile_unfollow': 7,
+    'users:signup': 2,
+    'users:logout': 4,
+    'users:login': 2,
+    'about:author': 2,
+    'about:tech': 2,
+    'api:posts': 3,
+    'api:post': 3,
+    'api:comments': 3,
+    'api:group_posts': 4,
+    'api:profile_posts': 4,
+    'api:follow': 5,
+}
+
+LITERALS = re.compile(r"'[^']*'|\b\d+\b")
+
+
+def normalize(sql):
+    """Убирает литералы, чтобы одинаковые по форме запросы совпадали."""
+    return LITERALS.sub('?', sql)
+
+
+def query_diff(queries):
+    """Diff «каждый запрос по разу» против реально выполненных:
+    строки с плюсом — повторы, то есть кандидаты в N+1."""
+    actual = [normalize(query['sql']) for query in queries]
+    expected = list(dict.fromkeys(actual))
+    return '\n'.join(difflib.unified_diff(
+        expected, actual, 'unique queries', 'executed queries', lineterm='',
+    ))
+
+
+def named_patterns():
+    for module, namespace in (
+        (posts_urls, 'posts'),
+        (users_urls, 'users'),
+        (about_urls, 'about'),
+        (api_urls, 'api'),
+    ):
+        for pattern in module.urlpatterns:
+            if isinstance(pattern, URLPattern) and pattern.name:
+                yield f'{namespace}:{pattern.name}', pattern
+
+
+class QueryBudgetTest(TestCase):
+    @classmethod
+    def setUpClass(cls) -> None:
+        super().setUpClass()
+        cls.user = User.objects.create_user(username='Reader')
+        cls.group = Group.objects.create(
+            title='Тестовая группа',
+            slug='test-slug',
+            description='Тестовое описание',
+        )
+        authors = [
+            User.objects.create_user(
+                username=f'author{i}', first_name='Имя', last_name='Фамилия')
+            for i in range(AUTHORS_NUMBER)
+        ]
+        commenters = authors + [cls.user]
+        for author in authors:
+            Follow.objects.create(user=cls.user, author=author)
+            for i in range(POSTS_PER_AUTHOR):
+                post = Post.objects.create(
+                    author=author, group=cls.group, text=f'Текст поста {i}')
+                for commenter in commenters[:COMMENTS_PER_POST]:
+                    Comment.objects.create(
+                        post=post, author=commenter, text='Комментарий')
+        cls.author = authors[0]
+        cls.post = Post.objects.create(
+            author=cls.user, group=cls.group, text='Свой пост')
+        for commenter in commenters:
+            Comment.objects.create(
+                post=cls.post, author=commenter, text='Комментарий')
+
+    def setUp(self) -> None:
+        self.authorized_client = Client()
+
+    def url_for(self, pattern_name, pattern):
+        values = {
+            'slug': self.group.slug,
+            'username': self.author.username,
+            'post_id': self.post.pk,
+            'format': 'csv',
+        }
+        kwargs = {
+            name: values[name] for name in pattern.pattern.converters
+        }
+        url = reverse(pattern_name, kwargs=kwargs)
+        if pattern_name.startswith('posts:search'):
+            url += '?q=текст'
+        return url
+
+    def test_every_url_has_budget(self):
+        """У каждого именованного URL есть бюджет запросов."""
+        names = {name for name, _ in named_patterns()}
+        self.assertEqual(names - set(QUERY_BUDGETS), set())
+
+    def test_query_budgets(self):
+        """Число запросов на страницу не превышает бюджет."""
+        for name, pattern in named_patterns():
+            url = self.url_for(name, pattern)
+            with self.subTest(url=url):
+                cache.clear()
+                # Выход из аккаунта среди проверяемых URL: входим заново.
+                self.authorized_client.force_login(self.user)
+                with CaptureQueriesContext(connection) as queries:
+                    response = self.authorized_client.get(url)
+                    if response.streaming:
+                        b''.join(response.streaming_content)
+                budget = QUERY_BUDGETS[name]
+                self.assertLessEqual(
+                    len(queries), budget,
+                    f'{url}: {len(queries)} запросов при бюджете {budget}\n'
+                    f'{query_diff(queries.captured_queries)}',
+                )
@@ -0,0 +1,97 @@
+import re
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.db import connection
+from django.test import Client, TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from ..models import Comment, Follow, Group, Post
+
+User = get_user_model()
+
+POSTS_NUMBER = 25
+
+# Полный проход таблицы без индекса или сортировка во временном B-дереве.
+# Проход по уже отобранному подзапросу (COUNT поверх ленты) допустим.
+BAD_PLAN = re.compile(r'^SCAN (TABLE )?(?!subquery)\w+$|USE TEMP B-TREE')
+
+
+class QueryPlanTest(TestCase):
+    """Каждый запрос лент должен идти по индексу, без полного прохода
+    таблицы и без сортировки во временном B-дереве."""
+
+    @classmethod
+    def setUpClass(cls) -> None:
+        super().setUpClass()
+        cls.user = User.objects.create_user(username='Reader')
+        cls.author = User.objects.create_user(username='Writer')
+        cls.group = Group.objects.create(
+            title='Тестовая группа',
+            slug='test-slug',
+            description='Тестовое описание',
+        )
+        for i in range(POSTS_NUMBER):
+            cls.post = Post.objects.create(
+                author=cls.author,
+                text=f'Текст поста №{i}',
+                group=cls.group,
+            )
+        Comment.objects.create(post=cls.post, author=cls.user, text='Текст')
+        Follow.objects.create(user=cls.user, author=cls.author)
+
+    def setUp(self) -> None:
+        self.authorized_client = Client()
+        self.authorized_client.force_login(self.user)
+        cache.clear()
+
+    def explain(self, sql):
+        """В лог попадает SQL с уже подставленными параметрами."""
+        with connection.cursor() as cursor:
+            cursor.execute(f'EXPLAIN QUERY PLAN {sql}')
+            return [row[-1] for row in cursor.fetchall()]
+
+    def assert_plans_use_indexes(self, url):
+        """Повторяет запросы страницы с EXPLAIN QUERY PLAN."""
+        with CaptureQueriesContext(connection) as queries:
+            response = self.authorized_client.get(url)
+        self.assertEqual(response.status_code, 200)
+        for query in queries.captured_queries:
+            if not query['sql'].startswith('SELECT'):
+                continue
+            plan = self.explain(query['sql'])
+            bad = [step for step in plan if BAD_PLAN.search(step)]
+            self.assertFalse(
+                bad, f'{url}: {query["sql"]}\n' + '\n'.join(plan))
+
+    def feed_urls(self):
+        return [
+            reverse('posts:index'),
+            reverse('posts:group_list', kwargs={'slug': self.group.slug}),
+            reverse('posts:profile',
+                    kwargs={'username': self.author.username}),
+            reverse('posts:follow_index'),
+            reverse('posts:post_detail', kwargs={'post_id': self.post.pk}),
+        ]
+
+    def test_page_number_plans(self):
+        """Ленты с номерами страниц не сканируют таблицы целиком."""
+        for url in self.feed_urls():
+            for page in ('', '?page=2'):
+                with self.subTest(url=url + page):
+                    self.assert_plans_use_indexes(url + page)
+
+    @override_settings(POSTS_KEYSET_PAGINATION=True)
+    def test_keyset_plans(self):
+        """Курсорные страницы тоже идут по индексам."""
+        for url in self.feed_urls():
+            response = self.authorized_client.get(url)
+            page = response.context['page_obj'] if (
+                'page_obj' in response.context) else None
+            pages = [url]
+            if page is not None and page.has_next():
+                pages.append(f'{url}?{page.next_query}')
+            for address in pages:
+                with self.subTest(url=address):
+                    self.assert_plans_use_indexes(address)
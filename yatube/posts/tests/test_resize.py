@@ -0,0 +1,164 @@
+import os
+import shutil
+import tempfile
+import threading
+from http import HTTPStatus
+from io import BytesIO
+from unittest import mock
+
+from core.testing import make_image
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.test import TestCase, override_settings
+from django.urls import reverse
+from PIL import Image
+
+from .. import images, resize
+from ..imaging import render_fit
+from ..models import Post
+
+TEMP_MEDIA_ROOT = tempfile.mkdtemp(dir=settings.BASE_DIR)
+
+User = get_user_model()
+
+
+@override_settings(MEDIA_ROOT=TEMP_MEDIA_ROOT, POST_IMAGE_PROCESSES=0)
+class ResizeTest(TestCase):
+    @classmethod
+    def setUpClass(cls) -> None:
+        super().setUpClass()
+        cls.user = User.objects.create_user(username='NoName')
+
+    @classmethod
+    def tearDownClass(cls):
+        super().tearDownClass()
+        shutil.rmtree(TEMP_MEDIA_ROOT, ignore_errors=True)
+
+    def setUp(self):
+        shutil.rmtree(
+            os.path.join(TEMP_MEDIA_ROOT, 'resize'), ignore_errors=True)
+        with mock.patch.object(images, 'schedule'):
+            self.post = Post.objects.create(
+                author=self.user, text='Текст',
+                image=make_image(size=(400, 300)))
+        self.name = self.post.image.name
+
+    def get(self, url):
+        response = self.client.get(url)
+        body = b''.join(response.streaming_content) if response.streaming \
+            else response.content
+        response.close()
+        return response, body
+
+    def test_signed_url_resizes_once(self):
+        """Первый запрос уменьшает картинку, следующие берут её из кеша."""
+        url = resize.url(self.name, 120, 90)
+        with mock.patch.object(
+                images, 'run', wraps=images.run) as run:
+            response, body = self.get(url)
+            self.assertEqual(response.status_code, HTTPStatus.OK)
+            with Image.open(BytesIO(body)) as image:
+                self.assertEqual(image.size, (120, 90))
+            self.assertIn('immutable', response['Cache-Control'])
+            self.get(url)
+        self.assertEqual(run.call_count, 1)
+
+    def test_hit_behind_proxy_is_marked(self):
+        """За nginx файл отдаёт прокси, но запрос проходит через
+        представление и отмечает обращение для вытеснения."""
+        url = resize.url(self.name, 120, 90)
+        path = resize.ensure(self.name, 120, 90)
+        os.utime(path, (1, os.stat(path).st_mtime))
+        with override_settings(MEDIA_SENDFILE_HEADER='X-Accel-Redirect'):
+            response, _ = self.get(url)
+        self.assertEqual(
+            response['X-Accel-Redirect'],
+            settings.MEDIA_ACCEL_PREFIX + resize.cache_name(
+                120, 90, self.name))
+        self.assertGreater(os.stat(path).st_atime, 1)
+
+    def test_bad_requests(self):
+        """Без подписи — 403, слишком большой размер и чужой файл — 404."""
+        unsigned = reverse('media_resize', kwargs={
+            'width': 120, 'height': 90, 'path': self.name})
+        forged = resize.url(self.name, 120, 90).replace('120x90', '121x90')
+        response, _ = self.get(unsigned)
+        self.assertEqual(response.status_code, HTTPStatus.FORBIDDEN)
+        response, _ = self.get(forged)
+        self.assertEqual(response.status_code, HTTPStatus.FORBIDDEN)
+        for name, width in (
+            (self.name, settings.MEDIA_RESIZE_MAX_SIDE + 1),
+            ('posts/missing.jpg', 120),
+            ('../settings.py', 120),
+        ):
+            with self.subTest(name=name, width=width):
+                response, _ = self.get(resize.url(name, width, 90))
+                self.assertEqual(response.status_code, HTTPStatus.NOT_FOUND)
+
+    def test_render_fit_crops_center(self):
+        """Картинка масштабируется по меньшей стороне и обрезается."""
+        data = render_fit(self.post.image.path, 100, 100, 80)
+        with Image.open(BytesIO(data)) as image:
+            self.assertEqual(image.size, (100, 100))
+            self.assertEqual(image.format, 'JPEG')
+
+    def test_concurrent_requests_coalesce(self):
+        """Одновременные запросы одного размера ждут одну задачу."""
+        started = threading.Event()
+        release = threading.Event()
+
+        def slow_run(func, *args):
+            started.set()
+            release.wait(5)
+            return func(*args)
+
+        results = []
+        with mock.patch.object(images, 'run', side_effect=slow_run) as run:
+            leader = threading.Thread(target=lambda: results.append(
+                resize.ensure(self.name, 64, 64)))
+            leader.start()
+            started.wait(5)
+            followers = [
+                threading.Thread(target=lambda: results.append(
+                    resize.ensure(self.name, 64, 64)))
+                for _ in range(3)
+            ]
+            for thread in followers:
+                thread.start()
+            release.set()
+            for thread in [leader, *followers]:
+                thread.join(5)
+        self.assertEqual(run.call_count, 1)
+        self.assertEqual(len(results), 4)
+        self.assertEqual(len(set(results)), 1)
+
+    def test_late_request_reuses_written_file(self):
+        """Запрос, не заставший задачу ведущего, но промахнувшийся мимо
+        файла до его записи, не уменьшает картинку ещё раз."""
+        path = resize.ensure(self.name, 64, 64)
+        with mock.patch.object(resize, 'touch', side_effect=[False, True]), \
+                mock.patch.object(images, 'run') as run:
+            self.assertEqual(resize.ensure(self.name, 64, 64), path)
+        run.assert_not_called()
+
+    def test_eviction_removes_least_recently_used(self):
+        """При переполнении удаляются давно не запрошенные размеры."""
+        old = resize.ensure(self.name, 60, 60)
+        recent = resize.ensure(self.name, 60, 61)
+        os.utime(old, (1, os.stat(old).st_mtime))
+        # Места на два с половиной файла: третий вытесняет ровно один.
+        size = (os.path.getsize(old) + os.path.getsize(recent)) * 5 // 4
+        with override_settings(MEDIA_RESIZE_CACHE_SIZE=size), \
+                mock.patch.object(resize, '_usage', None):
+            newest = resize.ensure(self.name, 61, 60)
+        self.assertFalse(os.path.exists(old))
+        self.assertTrue(os.path.exists(recent))
+        self.assertTrue(os.path.exists(newest))
+
+    def test_template_uses_resize_url(self):
+        """Пока вариантов нет, шаблон берёт миниатюру по подписанной
+        ссылке."""
+        response = self.client.get(
+            reverse('posts:post_detail', args=[self.post.pk]))
+        self.assertContains(
+            response, resize.url(self.name, 960, 339).replace('&', '&amp;'))
@@ -0,0 +1,94 @@
+from http import HTTPStatus
+
+from django.contrib.auth import get_user_model
+from django.test import Client, TestCase
+from django.urls import reverse
+
+from .. import search
+from ..models import Group, Post
+
+User = get_user_model()
+
+
+class SearchTest(TestCase):
+    @classmethod
+    def setUpClass(cls) -> None:
+        super().setUpClass()
+        cls.user = User.objects.create_user(username='NoName')
+        cls.other = User.objects.create_user(username='Other')
+        cls.group = Group.objects.create(
+            title='Тестовая группа',
+            slug='test-slug',
+            description='Тестовое описание',
+        )
+        cls.best = Post.objects.create(
+            author=cls.user, group=cls.group,
+            text='Котики котики котики',
+        )
+        cls.weak = Post.objects.create(
+            author=cls.other,
+            text='Про котиков и собак, а ещё немного про погоду и море',
+        )
+        Post.objects.create(author=cls.user, text='Совсем про другое')
+
+    def setUp(self) -> None:
+        self.guest_client = Client()
+
+    def test_ranked_results(self):
+        """Лучшее совпадение идёт первым, посторонние посты не находятся."""
+        found = list(search.search('котик'))
+        self.assertEqual(found, [self.best, self.weak])
+
+    def test_filters(self):
+        """Фильтры по группе и автору сужают выдачу."""
+        self.assertEqual(
+            list(search.search('котик', group_id=self.group.pk)),
+            [self.best])
+        self.assertEqual(
+            list(search.search('котик', author_id=self.other.pk)),
+            [self.weak])
+
+    def test_cursor_pagination(self):
+        """Курсор продолжает выдачу с того места, где она закончилась."""
+        first = search.search('котик', limit=1)
+        self.assertEqual(list(first), [self.best])
+        second = search.search('котик', cursor=first.next_cursor, limit=1)
+        self.assertEqual(list(second), [self.weak])
+        self.assertIsNone(second.next_cursor)
+
+    def test_index_follows_updates(self):
+        """Триггеры обновляют индекс при правке и удалении поста."""
+        post = Post.objects.get(pk=self.best.pk)
+        post.text = 'Теперь про попугаев'
+        post.save()
+        self.assertEqual(list(search.search('попуга')), [post])
+        self.assertEqual(list(search.search('котик')), [self.weak])
+        Post.objects.filter(pk=self.weak.pk).delete()
+        self.assertEqual(list(search.search('котик')), [])
+
+    def test_user_input_is_escaped(self):
+        """Спецсимволы FTS5 в запросе не ломают поиск."""
+        self.assertEqual(len(search.search('"котик" OR (* NEAR')), 0)
+        self.assertEqual(len(search.search('котик*')), 2)
+
+    def test_search_pages(self):
+        """HTML-страница и JSON-эндпоинт поиска отдают результаты."""
+        response = self.guest_client.get(
+            reverse('posts:search'), {'q': 'котики', 'group': 'test-slug'})
+        self.assertEqual(response.status_code, HTTPStatus.OK)
+        self.assertEqual(list(response.context['page_obj']), [self.best])
+        response = self.guest_client.get(
+            reverse('posts:search_json'), {'q': 'котик', 'author': 'Other'})
+        self.assertEqual(
+            [row['id'] for row in response.json()['results']],
+            [self.weak.pk])
+
+    def test_admin_uses_index(self):
+        """Поиск в админке идёт через тот же индекс."""
+        admin = User.objects.create_superuser(
+            username='admin', email='admin@example.com', password='pass')
+        client = Client()
+        client.force_login(admin)
+        response = client.get(
+            reverse('admin:posts_post_changelist'), {'q': 'котик'})
+        self.assertEqual(response.context['cl'].result_count, 2)
@@ -0,0 +1,45 @@
+import os
+import shutil
+import tempfile
+
+from core.testing import make_image
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.test import TestCase, override_settings
+from PIL import Image
+
+from .. import thumbnails
+from ..models import Post
+
+TEMP_MEDIA_ROOT = tempfile.mkdtemp(dir=settings.BASE_DIR)
+
+User = get_user_model()
+
+
+@override_settings(MEDIA_ROOT=TEMP_MEDIA_ROOT, POST_IMAGE_PROCESSES=0)
+class ThumbnailsTest(TestCase):
+    @classmethod
+    def setUpClass(cls) -> None:
+        super().setUpClass()
+        cls.user = User.objects.create_user(username='NoName')
+
+    @classmethod
+    def tearDownClass(cls):
+        super().tearDownClass()
+        shutil.rmtree(TEMP_MEDIA_ROOT, ignore_errors=True)
+
+    def test_generate_creates_thumbnails(self):
+        """generate готовит по миниатюре на каждую спецификацию."""
+        post = Post.objects.create(
+            author=self.user, text='Текст', image=make_image())
+        created = thumbnails.generate(post.image.name)
+        self.assertEqual(created, len(settings.POST_THUMBNAIL_SIZES))
+        for width, height in settings.POST_THUMBNAIL_SIZES:
+            path = os.path.join(TEMP_MEDIA_ROOT, 'resize',
+                                f'{width}x{height}', post.image.name)
+            with Image.open(path) as thumbnail:
+                self.assertEqual(thumbnail.size, (width, height))
+
+    def test_generate_skips_missing_file(self):
+        """Отсутствующий файл пропускается без ошибок."""
+        self.assertEqual(thumbnails.generate('posts/missing.jpg'), 0)
@@ -1,15 +1,22 @@
+import csv
+import json
 import shutil
 import tempfile
+from io import StringIO
 
 from django import forms
 from django.conf import settings
 from django.contrib.auth import get_user_model
 from django.core.cache import cache
 from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management import call_command
+from django.db import connection
 from django.test import Client, TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
 from django.urls import reverse
 
-from ..models import Follow, Group, Post
+from .. import timeline
+from ..models import Follow, Group, Post, TimelineEntry
 
 TEMP_MEDIA_ROOT = tempfile.mkdtemp(dir=settings.BASE_DIR)
 
@@ -169,18 +176,46 @@ class ViewsTests(TestCase):
     def test_cache_index(self):
         """Проверка работы кеша на главной страницы сайта"""
         cache.clear()
-        Post.objects.create(
+        post = Post.objects.create(
             author=self.user,
             text='Текст закешированного поста',
         )
         response_01 = self.authorized_client.get(reverse('posts:index'))
-        Post.objects.latest('pk').delete()
+        # update() не шлёт сигналов, поэтому кеш остаётся прежним.
+        Post.objects.filter(pk=post.pk).update(text='Новый текст')
         response_02 = self.authorized_client.get(reverse('posts:index'))
         self.assertEqual(response_02.content, response_01.content)
         cache.clear()
         response_03 = self.authorized_client.get(reverse('posts:index'))
         self.assertNotEqual(response_03.content, response_01.content)
 
+    def test_cache_index_invalidated_by_post_changes(self):
+        """Новые и удалённые посты сразу видны на главной странице."""
+        cache.clear()
+        response_01 = self.authorized_client.get(reverse('posts:index'))
+        post = Post.objects.create(
+            author=self.user,
+            text='Текст свежего поста',
+        )
+        response_02 = self.authorized_client.get(reverse('posts:index'))
+        self.assertNotEqual(response_02.content, response_01.content)
+        self.assertContains(response_02, post.text)
+        post.delete()
+        response_03 = self.authorized_client.get(reverse('posts:index'))
+        self.assertNotContains(response_03, post.text)
+
+    def test_cache_index_per_page(self):
+        """Каждая страница главной кешируется под своим ключом."""
+        cache.clear()
+        Post.objects.bulk_create([
+            Post(author=self.user, text=f'Текст поста №{i}')
+            for i in range(POSTS_NUMBER)
+        ])
+        response_01 = self.authorized_client.get(reverse('posts:index'))
+        response_02 = self.authorized_client.get(
+            reverse('posts:index') + '?page=2')
+        self.assertNotEqual(response_02.content, response_01.content)
+
     def test_auth_client_follow(self):
         '''Авторизованный пользователь может подписываться на автора'''
         self.authorized_client.get(
@@ -267,3 +302,203 @@ class PaginatorViewsTest(TestCase):
             response = self.authorized_client.get(
                 page + '?page=2')
             self.assertEqual(len(response.context['page_obj']), POSTS_SEC_PAGE)
+
+
+@override_settings(POSTS_KEYSET_PAGINATION=True)
+class KeysetPaginatorViewsTest(TestCase):
+    @classmethod
+    def setUpClass(cls) -> None:
+        super().setUpClass()
+        cls.user = User.objects.create_user(username='NoName')
+        cls.group = Group.objects.create(
+            title='Тестовая группа',
+            slug='test-slug',
+            description='Тестовое описание',
+        )
+        posts = [Post(
+            author=cls.user,
+            text=f'Текст поста №{i}',
+            group=cls.group,)
+            for i in range(POSTS_NUMBER)]
+        Post.objects.bulk_create(posts)
+
+    def setUp(self) -> None:
+        self.authorized_client = Client()
+        self.authorized_client.force_login(self.user)
+        cache.clear()
+
+    def test_correct_keyset_paginator(self):
+        """Курсорная пагинация листает ленты вперёд и назад без повторов."""
+        page_names = [
+            reverse('posts:index'),
+            reverse('posts:group_list', kwargs={'slug': self.group.slug}),
+            reverse('posts:profile', kwargs={'username': self.user.username}),
+        ]
+        for page in page_names:
+            with self.subTest(page=page):
+                response = self.authorized_client.get(page)
+                first_page = response.context['page_obj']
+                self.assertEqual(len(first_page), POSTS_FIRST_PAGE)
+                self.assertFalse(first_page.has_previous())
+                response = self.authorized_client.get(
+                    f'{page}?{first_page.next_query}')
+                second_page = response.context['page_obj']
+                self.assertEqual(len(second_page), POSTS_SEC_PAGE)
+                self.assertFalse(second_page.has_next())
+                self.assertFalse(
+                    set(first_page.object_list)
+                    & set(second_page.object_list)
+                )
+                response = self.authorized_client.get(
+                    f'{page}?{second_page.previous_query}')
+                self.assertEqual(
+                    list(response.context['page_obj']),
+                    list(first_page),
+                )
+
+    def test_keyset_paginator_skips_count(self):
+        """Курсорная страница не выполняет COUNT-запрос."""
+        with CaptureQueriesContext(connection) as queries:
+            self.authorized_client.get(reverse('posts:index'))
+        self.assertFalse(
+            any('COUNT(' in query['sql'] for query in queries))
+
+    def test_broken_cursor_returns_first_page(self):
+        """Битый курсор открывает первую страницу."""
+        response = self.authorized_client.get(
+            reverse('posts:index') + '?cursor=broken')
+        self.assertEqual(
+            len(response.context['page_obj']), POSTS_FIRST_PAGE)
+
+    def test_first_page_link_keeps_params(self):
+        """Ссылка на первую страницу сохраняет параметры запроса, кроме
+        курсора."""
+        page = reverse('posts:index')
+        response = self.authorized_client.get(f'{page}?ref=feed')
+        next_query = response.context['page_obj'].next_query
+        response = self.authorized_client.get(f'{page}?{next_query}')
+        self.assertEqual(response.context['page_obj'].first_query, 'ref=feed')
+        self.assertContains(response, 'href="?ref=feed"')
+
+
+class TimelineTest(TestCase):
+    @classmethod
+    def setUpClass(cls) -> None:
+        super().setUpClass()
+        cls.user = User.objects.create_user(username='Reader')
+        cls.author = User.objects.create_user(username='Writer')
+        cls.post = Post.objects.create(author=cls.author, text='Старый пост')
+
+    def setUp(self) -> None:
+        self.authorized_client = Client()
+        self.authorized_client.force_login(self.user)
+
+    def test_follow_fills_timeline(self):
+        """Подписка переносит в ленту уже опубликованные посты автора."""
+        self.authorized_client.get(
+            reverse('posts:profile_follow',
+                    kwargs={'username': self.author.username}))
+        self.assertTrue(
+            TimelineEntry.objects.filter(
+                user=self.user, post=self.post).exists())
+
+    def test_new_post_fans_out(self):
+        """Новый пост автора попадает в ленты подписчиков."""
+        Follow.objects.create(user=self.user, author=self.author)
+        post = Post.objects.create(author=self.author, text='Новый пост')
+        self.assertTrue(
+            TimelineEntry.objects.filter(user=self.user, post=post).exists())
+
+    def test_unfollow_prunes_timeline(self):
+        """Отписка убирает посты автора из ленты."""
+        Follow.objects.create(user=self.user, author=self.author)
+        self.authorized_client.get(
+            reverse('posts:profile_unfollow',
+                    kwargs={'username': self.author.username}))
+        self.assertFalse(TimelineEntry.objects.filter(user=self.user).exists())
+
+    def test_rebuild_timeline_command(self):
+        """Команда rebuild_timeline восстанавливает потерянные записи."""
+        Follow.objects.create(user=self.user, author=self.author)
+        TimelineEntry.objects.all().delete()
+        call_command('rebuild_timeline', stdout=StringIO())
+        response = self.authorized_client.get(reverse('posts:follow_index'))
+        self.assertIn(self.post, response.context['page_obj'])
+
+    @override_settings(TIMELINE_BACKFILL_LIMIT=2)
+    def test_rebuild_keeps_backfill_limit(self):
+        """Пересборка кладёт в ленту только последние посты автора и не
+        трогает ленты других пользователей."""
+        other = User.objects.create_user(username='Other')
+        posts = [
+            Post.objects.create(author=self.author, text=f'Пост {i}')
+            for i in range(3)
+        ]
+        Follow.objects.create(user=self.user, author=self.author)
+        Follow.objects.create(user=other, author=self.author)
+        TimelineEntry.objects.all().delete()
+        self.assertEqual(timeline.rebuild([self.user.pk]), 1)
+        self.assertEqual(
+            set(TimelineEntry.objects.values_list('user', 'post')),
+            {(self.user.pk, posts[2].pk), (self.user.pk, posts[1].pk)},
+        )
+
+    def test_follow_author_with_many_posts(self):
+        """Подписка на автора с сотнями постов переносит их все в ленту."""
+        Post.objects.bulk_create(
+            Post(author=self.author, text=f'Пост {i}') for i in range(600))
+        Follow.objects.create(user=self.user, author=self.author)
+        self.assertEqual(
+            TimelineEntry.objects.filter(user=self.user).count(), 601)
+
+
+class ExportViewsTest(TestCase):
+    @classmethod
+    def setUpClass(cls) -> None:
+        super().setUpClass()
+        cls.author = User.objects.create_user(username='Writer')
+        cls.group = Group.objects.create(
+            title='Тестовая группа',
+            slug='test-slug',
+            description='Тестовое описание',
+        )
+        cls.posts = [
+            Post.objects.create(
+                author=cls.author, group=cls.group, text=f'Пост, "№{i}"')
+            for i in range(3)
+        ]
+
+    def setUp(self) -> None:
+        self.guest_client = Client()
+
+    def export(self, format):
+        return self.guest_client.get(reverse(
+            'posts:profile_export',
+            kwargs={'username': self.author.username, 'format': format},
+        ))
+
+    @override_settings(POSTS_EXPORT_CHUNK_SIZE=2)
+    def test_export_csv(self):
+        """CSV отдаётся потоком, со всеми постами и заголовком."""
+        response = self.export('csv')
+        self.assertTrue(response.streaming)
+        self.assertIn('attachment', response['Content-Disposition'])
+        content = b''.join(response.streaming_content).decode()
+        rows = list(csv.DictReader(StringIO(content)))
+        self.assertEqual(
+            [int(row['id']) for row in rows],
+            [post.pk for post in reversed(self.posts)],
+        )
+        self.assertEqual(rows[0]['text'], self.posts[-1].text)
+        self.assertEqual(rows[0]['group'], self.group.slug)
+
+    def test_export_jsonl(self):
+        """JSONL: по объекту на строку."""
+        response = self.export('jsonl')
+        lines = b''.join(response.streaming_content).decode().splitlines()
+        self.assertEqual(len(lines), len(self.posts))
+        self.assertEqual(json.loads(lines[-1])['text'], self.posts[0].text)
+
+    def test_export_unknown_format(self):
+        """Неизвестный формат — 404."""
+        self.assertEqual(self.export('xml').status_code, 404)
@@ -0,0 +1,35 @@
+import logging
+
+from django.conf import settings
+from sorl.thumbnail import delete as delete_thumbnails
+
+from . import resize
+from .models import Post
+
+logger = logging.getLogger(__name__)
+
+
+def generate(name):
+    """Заранее кладёт в кеш resize.py все размеры из POST_THUMBNAIL_SIZES
+    для файла поста, чтобы первый запрос ленты не ждал уменьшения.
+
+    Новые картинки обрабатывает images.py; миниатюры нужны постам, для
+    которых вариантов ещё нет.
+    """
+    if not Post._meta.get_field('image').storage.exists(name):
+        return 0
+    created = 0
+    try:
+        for width, height in settings.POST_THUMBNAIL_SIZES:
+            resize.ensure(name, width, height)
+            created += 1
+    except Exception:
+        logger.exception('Не удалось подготовить миниатюры для %s', name)
+    return created
+
+
+def delete(name):
+    """Удаляет миниатюры файла: уменьшенные копии resize.py и миниатюры
+    sorl, оставшиеся с тех пор, как шаблоны брали их из sorl."""
+    resize.delete(name)
+    delete_thumbnails(Post(image=name).image, delete_file=False)
@@ -0,0 +1,110 @@
+from django.conf import settings
+from django.db import connection, transaction
+
+from .models import Follow, Post, TimelineEntry
+
+BATCH_SIZE = 1000
+
+
+def _entries_for(user_ids, post):
+    return [
+        TimelineEntry(
+            user_id=user_id,
+            post_id=post.pk,
+            author_id=post.author_id,
+            pub_date=post.pub_date,
+        )
+        for user_id in user_ids
+    ]
+
+
+def fan_out_post(post):
+    """Раскладывает новый пост по лентам всех подписчиков автора."""
+    followers = Follow.objects.filter(
+        author_id=post.author_id,
+    ).values_list('user_id', flat=True)
+    batch = []
+    for user_id in followers.iterator():
+        batch.append(user_id)
+        if len(batch) >= BATCH_SIZE:
+            TimelineEntry.objects.bulk_create(
+                _entries_for(batch, post), ignore_conflicts=True)
+            batch = []
+    if batch:
+        TimelineEntry.objects.bulk_create(
+            _entries_for(batch, post), ignore_conflicts=True)
+
+
+def backfill_follow(user_id, author_id, limit=None):
+    """Добавляет в ленту подписчика последние посты автора."""
+    if limit is None:
+        limit = settings.TIMELINE_BACKFILL_LIMIT
+    posts = Post.objects.filter(
+        author_id=author_id,
+    ).order_by('-pub_date').values_list('id', 'pub_date')
+    if limit:
+        posts = posts[:limit]
+    TimelineEntry.objects.bulk_create(
+        [
+            TimelineEntry(
+                user_id=user_id,
+                post_id=post_id,
+                author_id=author_id,
+                pub_date=pub_date,
+            )
+            for post_id, pub_date in posts
+        ],
+        # Явный batch_size в Django 2.2 не ограничивается лимитом SQLite на
+        # число SELECT в составном INSERT, размер пачки выберет сам бэкенд.
+        ignore_conflicts=True,
+    )
+
+
+def prune_follow(user_id, author_id):
+    """Убирает из ленты подписчика посты автора, от которого он отписался."""
+    TimelineEntry.objects.filter(user_id=user_id, author_id=author_id).delete()
+
+
+def rebuild(user_ids=None):
+    """Пересобирает ленты с нуля; возвращает число подписок.
+
+    Записи создаются одним INSERT ... SELECT: посты каждого автора
+    нумеруются оконной функцией, и в ленту подписчика попадают первые
+    ``TIMELINE_BACKFILL_LIMIT`` из них. По запросу на подписку это заняло
+    бы часы на большой базе.
+    """
+    entries = TimelineEntry.objects.all()
+    follows = Follow.objects.all()
+    where, params = '', []
+    if user_ids is not None:
+        user_ids = list(user_ids)
+        entries = entries.filter(user_id__in=user_ids)
+        follows = follows.filter(user_id__in=user_ids)
+        where = 'WHERE follow.user_id IN (%s)' % ', '.join(
+            ['%s'] * len(user_ids))
+        params = user_ids
+    limit = settings.TIMELINE_BACKFILL_LIMIT
+    ranked = 'posts_post'
+    if limit:
+        ranked = (
+            '(SELECT id, author_id, pub_date, ROW_NUMBER() OVER ('
+            ' PARTITION BY author_id ORDER BY pub_date DESC, id DESC'
+            ' ) AS position FROM posts_post)'
+        )
+        where = f'{where} {"AND" if where else "WHERE"} post.position <= %s'
+        params = [*params, limit]
+    with transaction.atomic():
+        entries.delete()
+        with connection.cursor() as cursor:
+            cursor.execute(
+                'INSERT INTO posts_timelineentry'
+                ' (user_id, post_id, author_id, pub_date)'
+                ' SELECT follow.user_id, post.id, post.author_id,'
+                ' post.pub_date'
+                ' FROM posts_follow AS follow'
+                f' JOIN {ranked} AS post'
+                ' ON post.author_id = follow.author_id'
+                f' {where}',
+                params,
+            )
+        return follows.count()
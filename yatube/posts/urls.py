@@ -1,5 +1,3 @@
-from django.conf import settings
-from django.conf.urls.static import static
 from django.urls import path
 
 from . import views
@@ -10,7 +8,14 @@ urlpatterns = [
     path('', views.index, name='index'),
     path('group/<slug:slug>/', views.group_posts, name='group_list'),
     path('profile/<str:username>/', views.profile, name='profile'),
+    path(
+        'profile/<str:username>/export.<str:format>',
+        views.profile_export,
+        name='profile_export'
+    ),
     path('posts/<int:post_id>/', views.post_detail, name='post_detail'),
+    path('search/', views.post_search, name='search'),
+    path('search/json/', views.post_search_json, name='search_json'),
     path('create/', views.post_create, name='post_create'),
     path('posts/<int:post_id>/edit/', views.post_edit, name='post_edit'),
     path(
@@ -29,8 +34,3 @@ urlpatterns = [
         name='profile_unfollow'
     ),
 ]
-
-if settings.DEBUG:
-    urlpatterns += static(
-        settings.MEDIA_URL, document_root=settings.MEDIA_ROOT
-    )
@@ -1,73 +1,190 @@
+from functools import partial
+
+from core.concurrency import gather
 from django.conf import settings
 from django.contrib.auth.decorators import login_required
 from django.core.paginator import Paginator
+from django.db.models import F
+from django.http import Http404, JsonResponse, StreamingHttpResponse
 from django.shortcuts import get_object_or_404, redirect, render
 
+from . import counters, export, feed_cache, search
+from .conditional import conditional, feed_reads
 from .forms import CommentForm, PostForm
 from .models import Follow, Group, Post, User
+from .paginator import KeysetPaginator
 
 
-def page_object(post_list, request):
+def page_object(post_list, request, keys=('pub_date', 'id')):
+    if settings.POSTS_KEYSET_PAGINATION:
+        paginator = KeysetPaginator(
+            post_list, settings.POSTS_NUM1, query_params=request.GET,
+            keys=keys,
+        )
+        return paginator.get_page(request.GET.get('cursor'))
     paginator = Paginator(post_list, settings.POSTS_NUM1)
     page_number = request.GET.get('page')
     return paginator.get_page(page_number)
 
 
+@conditional('index')
+@feed_reads('index')
 def index(request):
-    post_list = Post.objects.select_related('group').order_by('-pub_date')
+    post_list = Post.objects.select_related(
+        'author', 'group',
+    ).order_by('-pub_date')
+    page, feed = gather(
+        partial(page_object, post_list, request),
+        partial(feed_cache.context, request, 'index'),
+    )
     context = {
-        'page_obj': page_object(post_list, request),
+        'page_obj': page,
+        **feed,
     }
     return render(request, 'posts/index.html', context)
 
 
+@conditional('group')
+@feed_reads('group')
 def group_posts(request, slug):
     group = get_object_or_404(Group, slug=slug)
-    posts = group.posts.order_by('-pub_date')
+    posts = group.posts.select_related('author').order_by('-pub_date')
+    page, feed = gather(
+        partial(page_object, posts, request),
+        partial(feed_cache.context, request, 'group', group.pk),
+    )
     context = {
         'group': group,
-        'page_obj': page_object(posts, request),
+        'page_obj': page,
+        **feed,
     }
     return render(request, 'posts/group_list.html', context)
 
 
+def is_following(user, author):
+    return user is not None and Follow.objects.filter(
+        user=user,
+        author=author,
+    ).exists()
+
+
+@conditional('author')
+@feed_reads('author')
 def profile(request, username):
-    author = get_object_or_404(User, username=username)
+    author = get_object_or_404(
+        User.objects.select_related('counters'),
+        username=username,
+    )
     posts = author.posts.order_by('-pub_date')
-    posts_count = author.posts.count()
-    following = (
-        request.user.is_authenticated
-        and Follow.objects.filter(
-            user=request.user,
-            author=author,
-        ).exists()
+    author_counters = counters.for_user(author)
+    # Пользователь из сессии загружается здесь, а не в потоке пула.
+    user = request.user if request.user.is_authenticated else None
+    page, following, feed = gather(
+        partial(page_object, posts, request),
+        partial(is_following, user, author),
+        partial(feed_cache.context, request, 'author', author.pk),
     )
     context = {
         'author': author,
-        'posts_count': posts_count,
-        'page_obj': page_object(posts, request),
+        'posts_count': author_counters.posts_count,
+        'counters': author_counters,
+        'page_obj': page,
         'following': following,
+        **feed,
     }
     return render(request, 'posts/profile.html', context)
 
 
+def profile_export(request, username, format):
+    """Все посты автора одним файлом CSV или JSONL, потоком."""
+    if format not in export.FORMATS:
+        raise Http404
+    author = get_object_or_404(User, username=username)
+    response = StreamingHttpResponse(
+        export.stream(format, author),
+        content_type=export.CONTENT_TYPES[format],
+    )
+    response['Content-Disposition'] = (
+        f'attachment; filename="{author.username}-posts.{format}"')
+    return response
+
+
+@conditional('post')
+@feed_reads('post')
 def post_detail(request, post_id):
-    post = get_object_or_404(Post, pk=post_id)
+    post = get_object_or_404(
+        Post.objects.select_related('group', 'author__counters', 'counters'),
+        pk=post_id,
+    )
     group = post.group
     author = post.author
-    posts_count = author.posts.count()
-    comments = post.comments.all()
+    comments = post.comments.select_related('author').order_by('created')
     form = CommentForm(request.POST or None)
     context = {
         'post': post,
         'group': group,
-        'posts_count': posts_count,
+        'posts_count': counters.for_user(author).posts_count,
+        'comments_count': counters.for_post(post).comments_count,
         'comments': comments,
         'form': form,
     }
     return render(request, 'posts/post_detail.html', context)
 
 
+def search_posts(request):
+    """Общая часть HTML- и JSON-поиска: разбирает фильтры запроса."""
+    query = request.GET.get('q', '').strip()
+    group = request.GET.get('group')
+    author = request.GET.get('author')
+    group_id = author_id = None
+    if group:
+        group_id = get_object_or_404(Group, slug=group).pk
+    if author:
+        author_id = get_object_or_404(User, username=author).pk
+    page = search.search(
+        query,
+        group_id=group_id,
+        author_id=author_id,
+        cursor=request.GET.get('cursor'),
+        limit=settings.POSTS_NUM1,
+    )
+    return query, page
+
+
+def post_search(request):
+    query, page = search_posts(request)
+    next_query = None
+    if page.next_cursor:
+        params = request.GET.copy()
+        params['cursor'] = page.next_cursor
+        next_query = params.urlencode()
+    context = {
+        'query': query,
+        'page_obj': page,
+        'next_query': next_query,
+    }
+    return render(request, 'posts/search.html', context)
+
+
+def post_search_json(request):
+    query, page = search_posts(request)
+    return JsonResponse({
+        'query': query,
+        'results': [
+            {
+                'id': post.pk,
+                'text': post.text,
+                'pub_date': post.pub_date,
+                'author': post.author.username,
+                'group': post.group and post.group.slug,
+                'score': post.score,
+            }
+            for post in page
+        ],
+        'next_cursor': page.next_cursor,
+    }, json_dumps_params={'ensure_ascii': False})
+
+
 @login_required
 def post_create(request):
     form = PostForm(
@@ -121,10 +238,18 @@ def add_comment(request, post_id):
 
 @login_required
 def follow_index(request):
-    following_authors = request.user.follower.values_list('author')
-    post_list = Post.objects.filter(author__id__in=following_authors)
+    post_list = Post.objects.filter(
+        timeline_entries__user=request.user,
+    ).annotate(
+        feed_date=F('timeline_entries__pub_date'),
+        feed_post=F('timeline_entries__post_id'),
+    ).select_related(
+        'author', 'group',
+    ).order_by('-feed_date', '-feed_post')
     context = {
-        'page_obj': page_object(post_list, request),
+        'page_obj': page_object(
+            post_list, request, keys=('feed_date', 'feed_post'),
+        ),
     }
     return render(request, 'posts/follow.html', context)
 
@@ -0,0 +1,20 @@
+"""
+ASGI config for yatube project.
+
+It exposes the ASGI callable as a module-level variable named ``application``.
+
+Django 2.2 has no ASGI support of its own: requests go through the WSGI
+handler in a bounded thread pool, see ``core.asgi``.
+"""
+
+import os
+
+from core.asgi import get_asgi_application
+
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'yatube.settings')
+
+application = get_asgi_application()
+
+from core import warmup  # noqa: E402
+
+warmup.on_start()
@@ -41,15 +41,75 @@ ALLOWED_HOSTS = [
 
 # Constants
 POSTS_NUM1: int = 10
+# Курсорная пагинация лент вместо номеров страниц (без COUNT и OFFSET)
+POSTS_KEYSET_PAGINATION: bool = False
+# Сколько последних постов автора попадает в ленту при подписке (0 - все)
+TIMELINE_BACKFILL_LIMIT: int = 1000
+# Сколько строк за раз читать из базы при выгрузке постов автора
+POSTS_EXPORT_CHUNK_SIZE: int = 2000
+# Потоков, в которых yatube/asgi.py выполняет запросы
+ASGI_THREADS: int = 8
+# Потоков, которые отдают тела потоковых ответов ASGI (выгрузки, файлы)
+ASGI_STREAM_THREADS: int = 8
+# Потоков для независимых запросов к базе внутри одного запроса (0 - по
+# очереди в потоке запроса), см. core/concurrency.py
+DB_QUERY_THREADS: int = 4
 
 MEDIA_URL = '/media/'
 MEDIA_ROOT = os.path.join(BASE_DIR, 'media')
+# Раздача MEDIA_ROOT (core/media.py). За nginx — 'X-Accel-Redirect' и
+# internal location MEDIA_ACCEL_PREFIX с alias на MEDIA_ROOT, за Apache с
+# mod_xsendfile — 'X-Sendfile'; None — файлы отдаёт само приложение.
+MEDIA_SENDFILE_HEADER = None
+MEDIA_ACCEL_PREFIX = '/internal-media/'
+# Сколько секунд клиенты кешируют файлы; имена по хешу содержимого
+# (core/storage.py) не меняются и кешируются на год.
+MEDIA_MAX_AGE = 24 * 60 * 60
+MEDIA_IMMUTABLE_MAX_AGE = 365 * 24 * 60 * 60
+
+# Варианты загруженной картинки (posts/images.py): ширины в пикселях,
+# форматы и качество сжатия. Шаблоны отдают их через srcset.
+POST_IMAGE_WIDTHS = [320, 640, 960, 1280]
+POST_IMAGE_FORMATS = ['webp', 'jpeg']
+POST_IMAGE_QUALITY: int = 80
+# Процессов для обработки картинок (0 - в потоке пула, без процессов)
+POST_IMAGE_PROCESSES: int = 2
+
+# Размеры {% resized_url %} из шаблонов, которые warm_up и
+# generate_thumbnails готовят заранее для постов без вариантов картинки.
+POST_THUMBNAIL_SIZES = [(960, 339)]
+# Кеш уменьшенных картинок posts/resize.py в MEDIA_ROOT/resize: предел
+# размера в байтах, наибольшая сторона и сколько секунд ждать задачу,
+# которую уже выполняет другой запрос. /media/resize/ прокси должен
+# передавать приложению, а не отдавать с диска: иначе не проверяется
+# подпись и не отмечаются обращения, по которым кеш вытесняется.
+MEDIA_RESIZE_CACHE_SIZE = 512 * 1024 * 1024
+MEDIA_RESIZE_MAX_SIDE = 2000
+MEDIA_RESIZE_TIMEOUT = 30
+# Бэкенд sorl-thumbnail, который замеряет время получения миниатюр
+THUMBNAIL_BACKEND = 'core.timing.ThumbnailBackend'
 
 # Cache
 
+# Сколько живут фрагменты лент; сбрасываются они раньше, при изменении постов
+FEED_CACHE_TIMEOUT: int = 60 * 5
+# Сколько живёт HTML карточки поста (posts/cards.py). Правка поста меняет
+# ключ, но имя автора в карточке обновится только по истечении срока.
+POST_CARD_CACHE_TIMEOUT: int = 60 * 60
+
+# Общий для всех воркеров кеш в файле SQLite (см. core/cache.py)
+# Тесты (core/testing.py, conftest.py) кладут файлы кеша во временный
+# каталог, не трогая cache.sqlite3.
+TEST_RUNNER = 'core.testing.TestRunner'
+
 CACHES = {
     'default': {
-        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        'BACKEND': 'core.cache.SQLiteCache',
+        'LOCATION': os.path.join(BASE_DIR, 'cache.sqlite3'),
+        'OPTIONS': {
+            'MAX_ENTRIES': 10000,
+            'MAX_SIZE': 64 * 1024 * 1024,
+        },
     }
 }
 
@@ -66,10 +126,14 @@ INSTALLED_APPS = [
     'users.apps.UsersConfig',
     'core.apps.CoreConfig',
     'about.apps.AboutConfig',
+    'api.apps.ApiConfig',
     'sorl.thumbnail',
 ]
 
 MIDDLEWARE = [
+    # Первым, чтобы замер охватывал все остальные middleware
+    'core.middleware.ServerTimingMiddleware',
+    'core.middleware.ReplicaStickinessMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
@@ -85,13 +149,24 @@ CSRF_FAILURE_VIEW = 'core.views.csrf_failure'
 
 # Константа адреса директории шаблонов
 TEMPLATES_DIR = os.path.join(BASE_DIR, 'templates')
+# Хранить скомпилированные шаблоны в памяти процесса. Правки шаблонов
+# тогда видны только после перезапуска, поэтому в DEBUG выключено.
+TEMPLATES_CACHED: bool = not DEBUG
+TEMPLATE_LOADERS = [
+    'django.template.loaders.filesystem.Loader',
+    'django.template.loaders.app_directories.Loader',
+]
 TEMPLATES = [
     {
-        'BACKEND': 'django.template.backends.django.DjangoTemplates',
+        # DjangoTemplates с замером времени рендеринга (core/timing.py)
+        'BACKEND': 'core.timing.DjangoTemplates',
         # Искать шаблоны на уровне проекта
         'DIRS': [TEMPLATES_DIR],
-        'APP_DIRS': True,
         'OPTIONS': {
+            'loaders': (
+                [('django.template.loaders.cached.Loader', TEMPLATE_LOADERS)]
+                if TEMPLATES_CACHED else TEMPLATE_LOADERS
+            ),
             'context_processors': [
                 'django.template.context_processors.debug',
                 'django.template.context_processors.request',
@@ -104,6 +179,11 @@ TEMPLATES = [
 ]
 
 WSGI_APPLICATION = 'yatube.wsgi.application'
+# Прогревать шаблоны, URL и миниатюры при импорте yatube/wsgi.py
+# (core/warmup.py); с gunicorn --preload это происходит до fork
+WARMUP_ON_START: bool = not DEBUG
+# Для скольких свежих постов с картинками готовить миниатюры при прогреве
+WARMUP_THUMBNAILS: int = 50
 
 
 # Database
@@ -113,9 +193,50 @@ DATABASES = {
     'default': {
         'ENGINE': 'django.db.backends.sqlite3',
         'NAME': os.path.join(BASE_DIR, 'db.sqlite3'),
+        # Соединение переживает запрос, PRAGMA не выполняются каждый раз
+        'CONN_MAX_AGE': 60,
     }
 }
 
+# PRAGMA для каждого нового соединения SQLite (core/sqlite.py). База может
+# переопределить их ключом PRAGMAS в своих настройках.
+SQLITE_PRAGMAS = {
+    # Читатели не блокируют писателя, а писатель — читателей
+    'journal_mode': 'WAL',
+    # В WAL fsync только на checkpoint; сбой питания может потерять
+    # последние транзакции, но не испортить базу
+    'synchronous': 'NORMAL',
+    'mmap_size': 256 * 1024 * 1024,
+    # Отрицательное значение — в КиБ, то есть 64 МБ кеша страниц
+    'cache_size': -64 * 1024,
+    # Сколько мс ждать занятую базу вместо ошибки database is locked
+    'busy_timeout': 5000,
+    'temp_store': 'MEMORY',
+}
+
+# Реплики для чтения: копии db.sqlite3, которые обновляет refresh_replicas.
+# Например, ['replica1', 'replica2'] даст базы replica1.sqlite3 и т.д.
+DATABASE_REPLICAS: list = []
+for alias in DATABASE_REPLICAS:
+    DATABASES[alias] = {
+        'ENGINE': 'django.db.backends.sqlite3',
+        'NAME': os.path.join(BASE_DIR, f'{alias}.sqlite3'),
+        'CONN_MAX_AGE': 60,
+        'TEST': {'MIRROR': 'default'},
+        # Без WAL: refresh_replicas подменяет файл целиком. query_only
+        # страхует от случайной записи в копию.
+        'PRAGMAS': {
+            **{
+                name: value for name, value in SQLITE_PRAGMAS.items()
+                if name != 'journal_mode'
+            },
+            'query_only': 'ON',
+        },
+    }
+DATABASE_ROUTERS = ['core.db_router.ReplicaRouter']
+# Сколько секунд после записи пользователь читает из основной базы
+REPLICA_STICKY_SECONDS: int = 10
+
 
 # Password validation
 # https://docs.djangoproject.com/en/2.2/ref/settings/#auth-password-validators
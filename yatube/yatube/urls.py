@@ -1,5 +1,8 @@
+from core import media
+from django.conf import settings
 from django.contrib import admin
 from django.urls import include, path
+from posts import resize
 
 handler404 = 'core.views.page_not_found'
 handler500 = 'core.views.server_error'
@@ -8,6 +11,18 @@ urlpatterns = [
     path('admin/', admin.site.urls),
     path('auth/', include('users.urls', namespace='users')),
     path('auth/', include('django.contrib.auth.urls')),
+    path('api/v1/', include('api.urls', namespace='api')),
+    path(
+        f'{settings.MEDIA_URL.lstrip("/")}resize/'
+        '<int:width>x<int:height>/<path:path>',
+        resize.serve,
+        name='media_resize',
+    ),
+    path(
+        f'{settings.MEDIA_URL.lstrip("/")}<path:path>',
+        media.serve,
+        name='media',
+    ),
     path('', include('posts.urls', namespace='posts')),
     path('about/', include('about.urls', namespace='about')),
 ]
@@ -14,3 +14,9 @@ from django.core.wsgi import get_wsgi_application
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'yatube.settings')
 
 application = get_wsgi_application()
+
+# Шаблоны, URL и миниатюры прогреваются до первого запроса, а под
+# gunicorn --preload ещё и до fork воркеров (WARMUP_ON_START).
+from core import warmup  # noqa: E402
+
+warmup.on_start()